@@ -1,8 +1,53 @@
 from django.contrib import admin
-from .models import Cliente, Habitacion, Reserva, Pago, Administrador
+from .models import Cliente, GrupoReserva, Habitacion, Reserva, Pago, Administrador, Tarea, Temporada
+
+
+@admin.register(Cliente)
+class ClienteAdmin(admin.ModelAdmin):
+    # Filtro "RUT vacio": clientes que la migracion de RUT dejo por revisar
+    list_display = ("rut", "rut_por_revisar", "nombre", "email", "telefono")
+    list_filter = (("rut", admin.EmptyFieldListFilter),)
+    search_fields = ("nombre", "email", "rut_por_revisar")
+
+    def save_model(self, request, obj, form, change):
+        if obj.rut:
+            obj.rut_por_revisar = ""
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(Reserva)
+class ReservaAdmin(admin.ModelAdmin):
+    list_display = ("codigo", "cliente", "habitacion", "fecha_inicio", "fecha_fin", "estado")
+    list_filter = ("estado",)
+    list_select_related = ("cliente", "habitacion")
+    raw_id_fields = ("cliente", "habitacion", "grupo")
+
+
+@admin.register(Pago)
+class PagoAdmin(admin.ModelAdmin):
+    list_display = ("id_pago", "reserva", "grupo", "monto", "fecha", "metodo")
+    list_select_related = ("reserva__cliente", "grupo__cliente")
+    raw_id_fields = ("reserva", "grupo")
+
+
+@admin.register(GrupoReserva)
+class GrupoReservaAdmin(admin.ModelAdmin):
+    list_display = ("codigo", "cliente", "fecha_inicio", "fecha_fin", "created_at")
+    list_select_related = ("cliente",)
+    raw_id_fields = ("cliente",)
+
+
+@admin.register(Temporada)
+class TemporadaAdmin(admin.ModelAdmin):
+    list_display = ("nombre", "tipo", "fecha_inicio", "fecha_fin", "factor", "recargo_fin_de_semana", "prioridad")
+    list_filter = ("tipo",)
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ("nombre", "clave", "estado", "intentos", "ejecutar_desde", "updated_at")
+    list_filter = ("estado", "nombre")
+
 
-admin.site.register(Cliente)
 admin.site.register(Habitacion)
-admin.site.register(Reserva)
-admin.site.register(Pago)
 admin.site.register(Administrador)
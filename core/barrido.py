@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import cambios
+from .disponibilidad import invalidar_rango
+from .models import NocheOcupada, Reserva, Tarea
+from .tareas import REGISTRO
+
+# Transiciones de estado en lote: UPDATE por conjunto de ids, sin pasar por
+# Reserva.save(). Por eso cada lote borra aqui las noches que deja de ocupar,
+# anota sus rangos en el registro de cambios e invalida la cache de
+# disponibilidad al confirmar. Los resumenes diarios no cambian: pendiente ->
+# cancelada y confirmada -> completada no alteran lo vendido (ver
+# resumenes.ESTADOS_VENDIDOS).
+
+
+def _cambiar_estado(reservas, estado_nuevo, al_cambiar=None):
+    with transaction.atomic():
+        filas = list(reservas.values_list(
+            "pk", "codigo", "fecha_inicio", "fecha_fin", "estado", "habitacion__id_habitacion"
+        ))
+        if not filas:
+            return []
+        ids = [fila[0] for fila in filas]
+        estado_actual = filas[0][4]
+        Reserva.objects.filter(pk__in=ids, estado=estado_actual).update(
+            estado=estado_nuevo, updated_at=timezone.now()
+        )
+        NocheOcupada.objects.filter(reserva_id__in=ids).delete()
+        cambios.registrar([(id_habitacion, inicio, fin) for _, _, inicio, fin, _, id_habitacion in filas])
+        if al_cambiar:
+            al_cambiar(filas)
+        rangos = {(inicio, fin) for _, _, inicio, fin, *_ in filas}
+        transaction.on_commit(lambda: [invalidar_rango(inicio, fin) for inicio, fin in rangos])
+    return filas
+
+
+def _encolar_avisos(filas):
+    # Mismo efecto que la señal de cancelacion, que el UPDATE en lote no dispara
+    aviso = REGISTRO["enviar_aviso_cancelacion"]
+    Tarea.objects.bulk_create([
+        Tarea(
+            nombre=aviso.nombre_tarea,
+            argumentos={"codigo": codigo},
+            clave=f"cancelacion:{codigo}",
+            max_intentos=aviso.max_intentos,
+        )
+        for _, codigo, *_ in filas
+    ], ignore_conflicts=True)
+
+
+def expirar_pendientes(ttl, lote=500, ahora=None):
+    """Cancela, de a `lote`, las reservas pendientes creadas hace mas de `ttl`
+    (timedelta) y encola el aviso al cliente. Devuelve la cantidad cancelada."""
+    limite = (ahora or timezone.now()) - ttl
+    total = 0
+    while True:
+        vencidas = Reserva.objects.filter(estado="pendiente", created_at__lt=limite).order_by("created_at")[:lote]
+        filas = _cambiar_estado(vencidas, "cancelada", _encolar_avisos)
+        if not filas:
+            return total
+        total += len(filas)
+
+
+def completar_finalizadas(hoy=None, lote=500):
+    """Marca completadas, de a `lote`, las reservas confirmadas cuya salida ya
+    paso. Devuelve la cantidad actualizada."""
+    hoy = hoy or timezone.localdate()
+    total = 0
+    while True:
+        terminadas = Reserva.objects.filter(estado="confirmada", fecha_fin__lte=hoy).order_by("fecha_fin")[:lote]
+        filas = _cambiar_estado(terminadas, "completada")
+        if not filas:
+            return total
+        total += len(filas)
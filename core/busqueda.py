@@ -0,0 +1,108 @@
+from django.db.models import Count
+
+from .forms import BusquedaForm
+from .models import Habitacion
+from .tarifas import cotizar, temporadas_vigentes
+
+# Busqueda con facetas sobre el conjunto de habitaciones libres de un rango.
+# Una sola consulta agrupada por (tipo, capacidad, precio) alcanza para contar
+# todas las facetas en Python: cada faceta aplica los demas filtros pero no el
+# suyo, asi sus opciones muestran cuantas habitaciones quedarian al elegirlas.
+# Los resultados se ordenan por precio por noche y se paginan en la base.
+POR_PAGINA = 20
+
+
+def _cumple(grupo, filtros, omitir=None):
+    tipo, capacidad, precio = grupo
+    return (
+        (omitir == "tipo" or not filtros.get("tipo") or tipo == filtros["tipo"])
+        and (omitir == "huespedes" or not filtros.get("huespedes") or capacidad >= filtros["huespedes"])
+        and (omitir == "precio" or filtros.get("precio_min") is None or precio >= filtros["precio_min"])
+        and (omitir == "precio" or filtros.get("precio_max") is None or precio <= filtros["precio_max"])
+    )
+
+
+def _facetas(grupos, filtros):
+    tipos, capacidades, precios, total = {}, {}, [], 0
+    for grupo, n in grupos:
+        tipo, capacidad, precio = grupo
+        if _cumple(grupo, filtros, "tipo"):
+            tipos[tipo] = tipos.get(tipo, 0) + n
+        if _cumple(grupo, filtros, "huespedes"):
+            capacidades[capacidad] = capacidades.get(capacidad, 0) + n
+        if _cumple(grupo, filtros, "precio"):
+            precios.append(precio)
+        if _cumple(grupo, filtros):
+            total += n
+    # El filtro de huespedes es "capacidad minima": cada opcion cuenta las
+    # habitaciones con esa capacidad o mas
+    acumuladas, suma = [], 0
+    for capacidad, n in sorted(capacidades.items(), reverse=True):
+        suma += n
+        acumuladas.append((capacidad, suma))
+    return {
+        "tipos": sorted(tipos.items()),
+        "capacidades": acumuladas[::-1],
+        "precio_min": min(precios, default=None),
+        "precio_max": max(precios, default=None),
+    }, total
+
+
+def _consultas(ids, filtros, pagina):
+    disponibles = Habitacion.objects.filter(pk__in=ids)
+    grupos = disponibles.values_list("tipo", "capacidad", "precio").annotate(n=Count("pk")).order_by()
+    resultados = disponibles
+    if filtros.get("tipo"):
+        resultados = resultados.filter(tipo=filtros["tipo"])
+    if filtros.get("huespedes"):
+        resultados = resultados.filter(capacidad__gte=filtros["huespedes"])
+    if filtros.get("precio_min") is not None:
+        resultados = resultados.filter(precio__gte=filtros["precio_min"])
+    if filtros.get("precio_max") is not None:
+        resultados = resultados.filter(precio__lte=filtros["precio_max"])
+    inicio = (pagina - 1) * POR_PAGINA
+    return grupos, resultados.order_by("precio", "id_habitacion")[inicio:inicio + POR_PAGINA]
+
+
+def _filtros(datos):
+    form = BusquedaForm(datos)
+    filtros = form.cleaned_data if form.is_valid() else {}
+    return form, filtros, filtros.get("pagina") or 1
+
+
+def _resultado(form, filtros, pagina, grupos, habitaciones, precios):
+    facetas, total = _facetas(grupos, filtros)
+    for habitacion in habitaciones:
+        habitacion.precio_estadia = precios[habitacion.pk]
+    paginas = max(1, -(-total // POR_PAGINA))
+    return {
+        "form": form,
+        "habitaciones": habitaciones,
+        "facetas": facetas,
+        "total": total,
+        "pagina": pagina,
+        "paginas": paginas,
+        "anterior": pagina - 1 if pagina > 1 else None,
+        "siguiente": pagina + 1 if pagina < paginas else None,
+    }
+
+
+def buscar(ids, fecha_inicio, fecha_fin, datos):
+    """Pagina de habitaciones libres (de `ids`) que cumplen los filtros de
+    `datos` (request.GET), con sus facetas y el precio de la estadia."""
+    form, filtros, pagina = _filtros(datos)
+    grupos, resultados = _consultas(ids, filtros, pagina)
+    grupos = [((tipo, capacidad, precio), n) for tipo, capacidad, precio, n in grupos]
+    habitaciones = list(resultados)
+    return _resultado(form, filtros, pagina, grupos, habitaciones, cotizar(habitaciones, fecha_inicio, fecha_fin))
+
+
+async def abuscar(ids, fecha_inicio, fecha_fin, datos):
+    form, filtros, pagina = _filtros(datos)
+    grupos, resultados = _consultas(ids, filtros, pagina)
+    grupos = [((tipo, capacidad, precio), n) async for tipo, capacidad, precio, n in grupos]
+    habitaciones = [habitacion async for habitacion in resultados]
+    temporadas = [t async for t in temporadas_vigentes(fecha_inicio, fecha_fin)]
+    return _resultado(
+        form, filtros, pagina, grupos, habitaciones, cotizar(habitaciones, fecha_inicio, fecha_fin, temporadas)
+    )
@@ -0,0 +1,130 @@
+import functools
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .sesion_admin import COOKIE
+
+# Cache de paginas publicas completas para visitantes anonimos. La clave lleva
+# la version del catalogo de habitaciones: cualquier cambio en Habitacion la
+# sube (ver signals.py) y las paginas guardadas dejan de usarse sin borrarlas.
+# La version es un timestamp, asi sirve tambien como Last-Modified. Vive en una
+# cache compartida para que el cambio hecho en un worker valga en todos.
+ALIAS = "paginas"
+CLAVE_VERSION = "paginas:version"
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def version_catalogo():
+    cache = _cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, int(time.time()), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+async def aversion_catalogo():
+    cache = _cache()
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        await cache.aadd(CLAVE_VERSION, int(time.time()), timeout=None)
+        version = await cache.aget(CLAVE_VERSION)
+    return version
+
+
+def invalidar_paginas():
+    cache = _cache()
+    # Dos cambios en el mismo segundo deben dar versiones distintas
+    cache.set(CLAVE_VERSION, max(int(time.time()), (cache.get(CLAVE_VERSION) or 0) + 1), timeout=None)
+
+
+def _cacheable(request):
+    # Solo la vista "vacia" de una pagina publica: sin parametros, sin sesion de
+    # administrador y sin mensajes pendientes que mostrar
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.GET
+        and COOKIE not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def _clave(request, version):
+    return f"paginas:{request.path}:{version}"
+
+
+def _guardable(request, response):
+    # Si la vista pidio un token CSRF la pagina lleva un formulario propio del visitante
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+def _empaquetar(response):
+    return (response.content, response["Content-Type"], quote_etag(hashlib.md5(response.content).hexdigest()))
+
+
+def _responder(request, guardada, version):
+    contenido, tipo, etag = guardada
+    respuesta = get_conditional_response(request, etag=etag, last_modified=version)
+    if respuesta is None:
+        respuesta = HttpResponse(contenido, content_type=tipo)
+    respuesta["ETag"] = etag
+    respuesta["Last-Modified"] = http_date(version)
+    # El navegador revalida siempre; el 304 ahorra el cuerpo
+    patch_cache_control(respuesta, no_cache=True)
+    patch_vary_headers(respuesta, ["Cookie"])
+    return respuesta
+
+
+def cache_pagina_publica(timeout=300):
+    """Cachea la pagina completa para visitantes anonimos y responde GET
+    condicionales (ETag / Last-Modified) con 304."""
+
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @functools.wraps(vista)
+            async def envoltura(request, *args, **kwargs):
+                if not _cacheable(request):
+                    return await vista(request, *args, **kwargs)
+                version = await aversion_catalogo()
+                clave = _clave(request, version)
+                guardada = await _cache().aget(clave)
+                if guardada is None:
+                    response = await vista(request, *args, **kwargs)
+                    if not _guardable(request, response):
+                        return response
+                    guardada = _empaquetar(response)
+                    await _cache().aset(clave, guardada, timeout)
+                return _responder(request, guardada, version)
+        else:
+            @functools.wraps(vista)
+            def envoltura(request, *args, **kwargs):
+                if not _cacheable(request):
+                    return vista(request, *args, **kwargs)
+                version = version_catalogo()
+                clave = _clave(request, version)
+                guardada = _cache().get(clave)
+                if guardada is None:
+                    response = vista(request, *args, **kwargs)
+                    if not _guardable(request, response):
+                        return response
+                    guardada = _empaquetar(response)
+                    _cache().set(clave, guardada, timeout)
+                return _responder(request, guardada, version)
+        return envoltura
+
+    return decorador
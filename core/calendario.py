@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
+from .models import Habitacion, Reserva
+
+# Un caracter por habitacion y dia
+LIBRE = ord("0")
+CODIGOS_ESTADO = {"pendiente": ord("1"), "confirmada": ord("2")}
+FUERA_DE_SERVICIO = ord("9")
+LEYENDA = {"0": "libre", "1": "pendiente", "2": "confirmada", "9": "fuera de servicio"}
+
+
+def matriz_ocupacion(desde, dias):
+    hasta = desde + timedelta(days=dias)
+    habitaciones = list(Habitacion.objects.order_by("id_habitacion").values_list("pk", "id_habitacion", "estado"))
+
+    filas = {}
+    for pk, _, estado in habitaciones:
+        relleno = LIBRE if estado == "disponible" else FUERA_DE_SERVICIO
+        filas[pk] = bytearray([relleno]) * dias
+
+    # Una sola consulta por todas las reservas que tocan la ventana; cada una
+    # se marca con una asignacion de slice sobre la fila de su habitacion.
+    # Las fechas llegan como texto ISO para evitar los conversores del ORM.
+    reservas = Reserva.objects.filter(
+        estado__in=Reserva.ESTADOS_ACTIVOS, fecha_inicio__lt=hasta, fecha_fin__gt=desde
+    ).values_list(
+        "habitacion_id",
+        Cast("fecha_inicio", CharField()),
+        Cast("fecha_fin", CharField()),
+        "estado",
+    )
+    base = desde.toordinal()
+    marcas = {estado: bytes([codigo]) for estado, codigo in CODIGOS_ESTADO.items()}
+    for habitacion_id, fecha_inicio, fecha_fin, estado in reservas.iterator(chunk_size=2000):
+        fila = filas.get(habitacion_id)
+        if fila is None:
+            continue
+        inicio = max(date.fromisoformat(fecha_inicio).toordinal() - base, 0)
+        fin = min(date.fromisoformat(fecha_fin).toordinal() - base, dias)
+        if fin > inicio:
+            fila[inicio:fin] = marcas[estado] * (fin - inicio)
+
+    return {
+        "desde": desde.isoformat(),
+        "dias": dias,
+        "leyenda": LEYENDA,
+        "habitaciones": {id_habitacion: filas[pk].decode("ascii") for pk, id_habitacion, _ in habitaciones},
+    }
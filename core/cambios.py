@@ -0,0 +1,156 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .calendario import CODIGOS_ESTADO, FUERA_DE_SERVICIO, LEYENDA, LIBRE
+from .models import CambioDisponibilidad, Habitacion, Reserva
+
+# Feed de cambios de disponibilidad para el channel manager. Cada escritura que
+# altera el inventario agrega una fila (habitacion, rango de noches) al registro
+# en la misma transaccion; el feed lee el registro desde un cursor y devuelve el
+# estado actual solo de las noches tocadas. SQLite serializa las escrituras, asi
+# que los ids se asignan en orden de confirmacion y un cursor nunca salta una fila.
+LIMITE_MAXIMO = 1000
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+class CursorVencido(Exception):
+    """El cursor apunta a cambios ya podados: hay que resincronizar con el calendario."""
+
+
+def registrar(rangos, creado=None):
+    """Agrega al registro los cambios (id_habitacion, fecha_inicio, fecha_fin);
+    con fechas None el cambio es de la habitacion completa."""
+    creado = creado or timezone.now()
+    hoy = timezone.localdate()
+    # Las noches ya pasadas no interesan al feed
+    CambioDisponibilidad.objects.bulk_create([
+        CambioDisponibilidad(id_habitacion=id_habitacion, fecha_inicio=inicio, fecha_fin=fin, creado=creado)
+        for id_habitacion, inicio, fin in dict.fromkeys(rangos)
+        if fin is None or fin > hoy
+    ])
+
+
+def registrar_reservas(reservas):
+    # Para altas y cambios en lote, que no disparan las señales
+    registrar([
+        (reserva.habitacion.id_habitacion, reserva.fecha_inicio, reserva.fecha_fin) for reserva in reservas
+    ])
+
+
+def podar(antes_de):
+    # Se conserva siempre la ultima fila: el id mas bajo que queda marca hasta
+    # donde se podo y permite reconocer un cursor vencido
+    ultimo = CambioDisponibilidad.objects.aggregate(ultimo=Max("pk"))["ultimo"]
+    if ultimo is None:
+        return 0
+    return CambioDisponibilidad.objects.filter(creado__lt=antes_de, pk__lt=ultimo).delete()[0]
+
+
+def codificar_cursor(ultimo_id):
+    return urlsafe_base64_encode(f"c{ultimo_id}".encode())
+
+
+def decodificar_cursor(cursor):
+    try:
+        valor = urlsafe_base64_decode(cursor).decode()
+        if not valor.startswith("c"):
+            raise ValueError
+        return int(valor[1:])
+    except (ValueError, UnicodeDecodeError):
+        raise CursorInvalido(cursor)
+
+
+def cursor_actual():
+    return codificar_cursor(CambioDisponibilidad.objects.aggregate(ultimo=Max("pk"))["ultimo"] or 0)
+
+
+def _fusionar(rangos):
+    fusionados = []
+    for inicio, fin in sorted(rangos):
+        if fusionados and inicio <= fusionados[-1][1]:
+            fusionados[-1][1] = max(fusionados[-1][1], fin)
+        else:
+            fusionados.append([inicio, fin])
+    return fusionados
+
+
+def cambios_desde(cursor, limite=500, hoy=None):
+    """Pagina de cambios posteriores a `cursor`: estado actual de las noches
+    (desde hoy) y de las habitaciones tocadas, y el cursor para seguir."""
+    desde_id = decodificar_cursor(cursor)
+    hoy = hoy or timezone.localdate()
+    filas = list(
+        CambioDisponibilidad.objects.filter(pk__gt=desde_id).order_by("pk")
+        .values_list("pk", "id_habitacion", "fecha_inicio", "fecha_fin")[:limite + 1]
+    )
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if desde_id:
+        primero = CambioDisponibilidad.objects.aggregate(primero=Min("pk"))["primero"]
+        if primero is not None and primero > desde_id + 1:
+            raise CursorVencido(cursor)
+
+    rangos, completas = defaultdict(list), set()
+    for _, id_habitacion, inicio, fin in filas:
+        if inicio is None:
+            completas.add(id_habitacion)
+        elif fin > hoy:
+            rangos[id_habitacion].append((max(inicio, hoy), fin))
+    rangos = {id_habitacion: _fusionar(lista) for id_habitacion, lista in rangos.items()}
+
+    habitaciones = {
+        fila[1]: fila for fila in Habitacion.objects.filter(id_habitacion__in=completas | rangos.keys())
+        .values_list("pk", "id_habitacion", "estado", "tipo", "capacidad", "precio")
+    }
+    cambios = []
+    for id_habitacion in sorted(completas):
+        if id_habitacion not in habitaciones:
+            cambios.append({"habitacion": id_habitacion, "eliminada": True})
+            continue
+        _, _, estado, tipo, capacidad, precio = habitaciones[id_habitacion]
+        cambios.append({
+            "habitacion": id_habitacion, "estado": estado, "tipo": tipo, "capacidad": capacidad, "precio": str(precio),
+        })
+
+    # Una sola consulta por las reservas activas de las habitaciones tocadas
+    # entre el primer y el ultimo dia pedidos, marcadas con la misma codificacion
+    # que el calendario; el recorte a cada tramo se hace aca. Un OR por tramo
+    # supera la profundidad maxima de expresion de SQLite con ~1000 tramos.
+    tramos = defaultdict(list)
+    for id_habitacion, lista in sorted(rangos.items()):
+        if id_habitacion not in habitaciones:
+            continue
+        pk, _, estado, *_ = habitaciones[id_habitacion]
+        relleno = LIBRE if estado == "disponible" else FUERA_DE_SERVICIO
+        for inicio, fin in lista:
+            tramos[pk].append((id_habitacion, inicio, bytearray([relleno]) * (fin - inicio).days))
+    if tramos:
+        primero = min(inicio for lista in tramos.values() for _, inicio, _ in lista)
+        ultimo = max(inicio + timedelta(days=len(fila)) for lista in tramos.values() for _, inicio, fila in lista)
+        reservas = Reserva.objects.filter(
+            habitacion_id__in=tramos.keys(), fecha_inicio__lt=ultimo, fecha_fin__gt=primero,
+            estado__in=Reserva.ESTADOS_ACTIVOS,
+        ).values_list("habitacion_id", "fecha_inicio", "fecha_fin", "estado")
+        for habitacion_id, fecha_inicio, fecha_fin, estado in reservas:
+            for _, inicio, fila in tramos[habitacion_id]:
+                a = max((fecha_inicio - inicio).days, 0)
+                b = min((fecha_fin - inicio).days, len(fila))
+                if b > a:
+                    fila[a:b] = bytes([CODIGOS_ESTADO[estado]]) * (b - a)
+    for lista in tramos.values():
+        for id_habitacion, inicio, fila in lista:
+            cambios.append({"habitacion": id_habitacion, "desde": inicio.isoformat(), "ocupacion": fila.decode("ascii")})
+
+    return {
+        "cursor": codificar_cursor(filas[-1][0]) if filas else cursor,
+        "hay_mas": hay_mas,
+        "leyenda": LEYENDA,
+        "cambios": cambios,
+    }
@@ -0,0 +1,98 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cliente, Habitacion, NocheOcupada, Pago, Reserva
+from .resumenes import reconstruir
+from .rut import formatear_rut
+
+TIPOS = [
+    ("Simple", 1, Decimal("35000.00")),
+    ("Doble", 2, Decimal("50000.00")),
+    ("Suite", 2, Decimal("80000.00")),
+    ("Familiar", 4, Decimal("120000.00")),
+]
+LOTE = 2000
+
+
+def _duracion(rnd):
+    # La mayoria de las estadias son de 1 a 4 noches, con cola hasta 14
+    return min(14, 1 + int(rnd.expovariate(1 / 2.0)))
+
+
+def _estado(rnd, fecha_inicio, fecha_fin, hoy):
+    if fecha_fin <= hoy:
+        return "cancelada" if rnd.random() < 0.1 else "completada"
+    if fecha_inicio <= hoy:
+        return "confirmada"
+    return rnd.choices(["confirmada", "pendiente", "cancelada"], weights=[70, 20, 10])[0]
+
+
+def generar(habitaciones, clientes, reservas, semilla=0, hoy=None):
+    rnd = random.Random(semilla)
+    hoy = hoy or timezone.localdate()
+
+    with transaction.atomic():
+        nuevas = []
+        for i in range(habitaciones):
+            tipo, capacidad, precio = rnd.choice(TIPOS)
+            nuevas.append(Habitacion(id_habitacion=f"SIM{i:05d}", tipo=tipo, capacidad=capacidad, precio=precio))
+        Habitacion.objects.bulk_create(nuevas, batch_size=LOTE)
+        habitaciones_ids = list(Habitacion.objects.filter(id_habitacion__startswith="SIM").values_list("pk", "precio"))
+
+        base_rut = 10_000_000 + rnd.randrange(1_000_000)
+        Cliente.objects.bulk_create([
+            Cliente(
+                rut=formatear_rut(base_rut + i),
+                nombre=f"Cliente {i}",
+                email=f"cliente{i}@example.com",
+            )
+            for i in range(clientes)
+        ], batch_size=LOTE)
+        clientes_ids = list(Cliente.objects.order_by("-id").values_list("pk", flat=True)[:clientes])
+
+    # Las estadias de cada habitacion se encadenan sin solaparse, partiendo un
+    # año atras; los viernes y sabados son los dias de llegada mas frecuentes.
+    por_habitacion, sobrantes = divmod(reservas, len(habitaciones_ids)) if habitaciones_ids else (0, 0)
+    pendientes = []
+    for posicion, (habitacion_id, precio) in enumerate(habitaciones_ids):
+        fecha = hoy - timedelta(days=365 - rnd.randrange(7))
+        for _ in range(por_habitacion + (1 if posicion < sobrantes else 0)):
+            fecha += timedelta(days=rnd.choice([0, 0, 1, 2, 3, 5, 8]))
+            if rnd.random() < 0.4:
+                fecha += timedelta(days=(4 - fecha.weekday()) % 7)
+            fin = fecha + timedelta(days=_duracion(rnd))
+            estado = _estado(rnd, fecha, fin, hoy)
+            reserva = Reserva(
+                cliente_id=rnd.choice(clientes_ids),
+                habitacion_id=habitacion_id,
+                fecha_inicio=fecha,
+                fecha_fin=fin,
+                estado=estado,
+                precio_total=precio,
+            )
+            # Las confirmadas y completadas llevan pagado el deposito (ver _guardar_reservas)
+            if estado in ("confirmada", "completada"):
+                reserva.monto_pagado = reserva.deposito_requerido()
+            reserva.saldo = reserva.precio_total - reserva.monto_pagado
+            pendientes.append(reserva)
+            fecha = fin
+            if len(pendientes) >= LOTE:
+                _guardar_reservas(pendientes)
+                pendientes = []
+    if pendientes:
+        _guardar_reservas(pendientes)
+    reconstruir()
+
+
+def _guardar_reservas(reservas):
+    with transaction.atomic():
+        Reserva.objects.bulk_create(reservas)
+        NocheOcupada.objects.bulk_create([noche for reserva in reservas for noche in reserva.noches_ocupadas()])
+        Pago.objects.bulk_create([
+            Pago(reserva_id=reserva.pk, monto=reserva.monto_pagado, metodo="tarjeta")
+            for reserva in reservas if reserva.monto_pagado
+        ])
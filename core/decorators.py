@@ -1,8 +1,11 @@
 from django.shortcuts import redirect
 
+from .sesion_admin import administrador_actual
+
 def admin_required(view_func):
     def wrapper(request, *args, **kwargs):
-        if not request.session.get('admin_id'):
+        request.administrador = administrador_actual(request)
+        if request.administrador is None:
             return redirect('login_admin')
         return view_func(request, *args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
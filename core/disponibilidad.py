@@ -0,0 +1,136 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.core.cache import caches
+
+from .models import Habitacion
+
+# Cache de resultados de busqueda por (fecha_inicio, fecha_fin). Cada noche tiene
+# una version en la cache; la clave de un rango incluye las versiones de sus
+# noches, asi un cambio solo invalida los rangos que se solapan con el.
+ALIAS = "disponibilidad"
+CLAVE_GLOBAL = "disponibilidad:global"
+CLAVE_ACIERTOS = "disponibilidad:aciertos"
+CLAVE_FALLOS = "disponibilidad:fallos"
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def _clave_noche(fecha):
+    return f"disponibilidad:noche:{fecha.isoformat()}"
+
+
+def _rango(fecha_inicio, fecha_fin):
+    return [fecha_inicio + timedelta(days=i) for i in range((fecha_fin - fecha_inicio).days)]
+
+
+def _contar(clave):
+    cache = _cache()
+    if not cache.add(clave, 1, timeout=None):
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, 1, timeout=None)
+
+
+async def _acontar(clave):
+    cache = _cache()
+    if not await cache.aadd(clave, 1, timeout=None):
+        try:
+            await cache.aincr(clave)
+        except ValueError:
+            await cache.aset(clave, 1, timeout=None)
+
+
+def _claves_versiones(fecha_inicio, fecha_fin):
+    return [CLAVE_GLOBAL] + [_clave_noche(fecha) for fecha in _rango(fecha_inicio, fecha_fin)]
+
+
+def _clave_resultado(fecha_inicio, fecha_fin, claves, versiones):
+    firma = hashlib.md5(":".join(str(versiones.get(clave, "")) for clave in claves).encode()).hexdigest()
+    return f"disponibilidad:rango:{fecha_inicio.isoformat()}:{fecha_fin.isoformat()}:{firma}"
+
+
+def _versiones(claves):
+    cache = _cache()
+    versiones = cache.get_many(claves)
+    faltantes = [clave for clave in claves if clave not in versiones]
+    if faltantes:
+        # Una version perdida (expulsada de la cache) nunca vuelve a un valor anterior
+        for clave in faltantes:
+            cache.add(clave, time.time_ns(), timeout=None)
+        versiones.update(cache.get_many(faltantes))
+    return versiones
+
+
+async def _aversiones(claves):
+    cache = _cache()
+    versiones = await cache.aget_many(claves)
+    faltantes = [clave for clave in claves if clave not in versiones]
+    if faltantes:
+        for clave in faltantes:
+            await cache.aadd(clave, time.time_ns(), timeout=None)
+        versiones.update(await cache.aget_many(faltantes))
+    return versiones
+
+
+def habitaciones_disponibles_ids(fecha_inicio, fecha_fin):
+    cache = _cache()
+    claves = _claves_versiones(fecha_inicio, fecha_fin)
+    clave = _clave_resultado(fecha_inicio, fecha_fin, claves, _versiones(claves))
+
+    ids = cache.get(clave)
+    if ids is None:
+        _contar(CLAVE_FALLOS)
+        ids = list(Habitacion.objects.disponibles(fecha_inicio, fecha_fin).values_list("pk", flat=True))
+        cache.set(clave, ids)
+    else:
+        _contar(CLAVE_ACIERTOS)
+    return ids
+
+
+async def ahabitaciones_disponibles_ids(fecha_inicio, fecha_fin):
+    cache = _cache()
+    claves = _claves_versiones(fecha_inicio, fecha_fin)
+    clave = _clave_resultado(fecha_inicio, fecha_fin, claves, await _aversiones(claves))
+
+    ids = await cache.aget(clave)
+    if ids is None:
+        await _acontar(CLAVE_FALLOS)
+        disponibles = Habitacion.objects.disponibles(fecha_inicio, fecha_fin).values_list("pk", flat=True)
+        ids = [pk async for pk in disponibles]
+        await cache.aset(clave, ids)
+    else:
+        await _acontar(CLAVE_ACIERTOS)
+    return ids
+
+
+def invalidar_rango(fecha_inicio, fecha_fin):
+    cache = _cache()
+    for fecha in _rango(fecha_inicio, fecha_fin):
+        clave = _clave_noche(fecha)
+        if not cache.add(clave, time.time_ns(), timeout=None):
+            try:
+                cache.incr(clave)
+            except ValueError:
+                cache.set(clave, time.time_ns(), timeout=None)
+
+
+def invalidar_todo():
+    _cache().set(CLAVE_GLOBAL, time.time_ns(), timeout=None)
+
+
+def estadisticas():
+    cache = _cache()
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    aciertos = valores.get(CLAVE_ACIERTOS, 0)
+    fallos = valores.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {
+        "aciertos": aciertos,
+        "fallos": fallos,
+        "tasa_aciertos": round(aciertos / total, 4) if total else None,
+    }
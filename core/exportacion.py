@@ -0,0 +1,122 @@
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from .models import Pago, Reserva
+
+TAMANO_TROZO = 2000
+
+COLUMNAS_CSV = [
+    "codigo", "estado", "fecha_inicio", "fecha_fin", "precio_total", "monto_pagado", "saldo", "created_at", "grupo",
+    "rut", "nombre", "email", "telefono",
+    "id_habitacion", "tipo",
+    "id_pago", "monto", "fecha_pago", "metodo", "referencia",
+]
+
+
+class Eco:
+    # Buffer minimo para csv.writer: devuelve la linea en vez de guardarla
+    def write(self, valor):
+        return valor
+
+
+def reservas_exportables(desde=None, hasta=None, estado=None):
+    reservas = Reserva.objects.select_related("cliente", "habitacion", "grupo__cliente").prefetch_related(
+        Prefetch("pagos", queryset=Pago.objects.order_by("fecha")),
+        Prefetch("grupo__pagos", queryset=Pago.objects.order_by("fecha")),
+    ).order_by("fecha_inicio", "codigo")
+    if desde:
+        reservas = reservas.filter(fecha_inicio__gte=desde)
+    if hasta:
+        reservas = reservas.filter(fecha_inicio__lt=hasta)
+    if estado:
+        reservas = reservas.filter(estado=estado)
+    # Con chunk_size el prefetch de pagos se hace por trozo, no sobre todo el resultado
+    return reservas.iterator(chunk_size=TAMANO_TROZO)
+
+
+def _datos_reserva(reserva):
+    return {
+        "codigo": reserva.codigo,
+        "estado": reserva.estado,
+        "fecha_inicio": reserva.fecha_inicio.isoformat(),
+        "fecha_fin": reserva.fecha_fin.isoformat(),
+        "precio_total": str(reserva.precio_total),
+        "monto_pagado": str(reserva.monto_pagado),
+        "saldo": str(reserva.saldo),
+        "created_at": reserva.created_at.isoformat(),
+        "grupo": reserva.grupo.codigo if reserva.grupo_id else "",
+        "rut": reserva.cliente.rut,
+        "nombre": reserva.cliente.nombre,
+        "email": reserva.cliente.email,
+        "telefono": reserva.cliente.telefono,
+        "id_habitacion": reserva.habitacion.id_habitacion,
+        "tipo": reserva.habitacion.tipo,
+    }
+
+
+def _datos_grupo(grupo):
+    return {
+        "fecha_inicio": grupo.fecha_inicio.isoformat(),
+        "fecha_fin": grupo.fecha_fin.isoformat(),
+        "created_at": grupo.created_at.isoformat(),
+        "grupo": grupo.codigo,
+        "rut": grupo.cliente.rut,
+        "nombre": grupo.cliente.nombre,
+        "email": grupo.cliente.email,
+        "telefono": grupo.cliente.telefono,
+    }
+
+
+def _grupo_nuevo(reserva, vistos):
+    # El deposito de un grupo no es de ninguna reserva: sale una sola vez, en su
+    # propia fila despues de la primera reserva exportada del grupo
+    if reserva.grupo_id is None or reserva.grupo_id in vistos:
+        return None
+    vistos.add(reserva.grupo_id)
+    return reserva.grupo
+
+
+def _datos_pago(pago):
+    return {
+        "id_pago": str(pago.id_pago),
+        "monto": str(pago.monto),
+        "fecha_pago": pago.fecha.isoformat(),
+        "metodo": pago.metodo,
+        "referencia": pago.referencia,
+    }
+
+
+def filas_csv(reservas):
+    # Una fila por pago; las reservas sin pagos salen con las columnas de pago
+    # vacias y los depositos de grupo sin codigo de reserva
+    escritor = csv.DictWriter(Eco(), fieldnames=COLUMNAS_CSV)
+    yield escritor.writeheader()
+    vistos = set()
+    for reserva in reservas:
+        datos = _datos_reserva(reserva)
+        pagos = reserva.pagos.all()
+        if not pagos:
+            yield escritor.writerow(datos)
+        for pago in pagos:
+            yield escritor.writerow({**datos, **_datos_pago(pago)})
+        grupo = _grupo_nuevo(reserva, vistos)
+        if grupo is not None:
+            datos = _datos_grupo(grupo)
+            for pago in grupo.pagos.all():
+                yield escritor.writerow({**datos, **_datos_pago(pago)})
+
+
+def lineas_jsonl(reservas):
+    # Los grupos salen en su propia linea (sin "codigo") con el deposito en "pagos"
+    vistos = set()
+    for reserva in reservas:
+        datos = _datos_reserva(reserva)
+        datos["pagos"] = [_datos_pago(pago) for pago in reserva.pagos.all()]
+        yield json.dumps(datos, ensure_ascii=False) + "\n"
+        grupo = _grupo_nuevo(reserva, vistos)
+        if grupo is not None:
+            datos = _datos_grupo(grupo)
+            datos["pagos"] = [_datos_pago(pago) for pago in grupo.pagos.all()]
+            yield json.dumps(datos, ensure_ascii=False) + "\n"
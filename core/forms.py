@@ -1,36 +1,32 @@
-import re
+import hashlib
+import uuid
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Reserva, Cliente, Habitacion, Pago
-
-
-def validar_rut_chileno(rut):
-    rut = str(rut).replace(".", "").replace("-", "").upper()
-    if not re.match(r"^\d{7,8}[0-9K]$", rut):
-        raise ValidationError("RUT invalido. Debe ser 7 u 8 numeros y un digito verificador.")
-    return rut
+from .reservas import MAXIMO_HABITACIONES_GRUPO
+from .rut import RutFormField
 
 class ReservaForm(forms.Form):
-    rut = forms.CharField(label="RUT", max_length=12)
+    rut = RutFormField()
     nombre = forms.CharField(label="Nombre", max_length=150)
     email = forms.EmailField(label="Email")
     telefono = forms.CharField(label="Telefono", max_length=30)
     habitacion = forms.ModelChoiceField(queryset=Habitacion.objects.filter(estado="disponible"))
     fecha_inicio = forms.DateField(widget=forms.HiddenInput(), input_formats=['%Y-%m-%d'])
     fecha_fin = forms.DateField(widget=forms.HiddenInput(), input_formats=['%Y-%m-%d'])
-    
-    def clean_rut(self):
-        rut = self.cleaned_data.get('rut')
-        return validar_rut_chileno(rut)
+
+# Filtros de la busqueda de habitaciones (GET, ver core/busqueda.py)
+class BusquedaForm(forms.Form):
+    huespedes = forms.IntegerField(label="Huéspedes", min_value=1, required=False)
+    tipo = forms.CharField(label="Tipo", max_length=100, required=False)
+    precio_min = forms.DecimalField(label="Precio mínimo por noche", min_value=0, required=False)
+    precio_max = forms.DecimalField(label="Precio máximo por noche", min_value=0, required=False)
+    pagina = forms.IntegerField(min_value=1, required=False)
 
 class ConsultaReservaForm(forms.Form):
-    rut = forms.CharField(label="RUT", max_length=12)
+    rut = RutFormField()
     codigo = forms.CharField(label="Código de Reserva", max_length=16)
 
-    def clean_rut(self):
-        rut = self.cleaned_data.get('rut')
-        return validar_rut_chileno(rut)
-
 class AdminLoginForm(forms.Form):
     id_admin = forms.CharField(label="ID Administrador", max_length=64)
     email = forms.EmailField(label="Email")
@@ -40,7 +36,61 @@ class HabitacionForm(forms.ModelForm):
         model = Habitacion
         fields = ['tipo', 'capacidad', 'precio', 'estado']
 
+METODOS_PAGO = [('tarjeta', 'Tarjeta'), ('transferencia', 'Transferencia'), ('efectivo', 'Efectivo')]
+
+# Reserva grupal: una cantidad por cada tipo de habitacion
+class ReservaGrupoForm(forms.Form):
+    rut = RutFormField()
+    nombre = forms.CharField(label="Nombre", max_length=150)
+    email = forms.EmailField(label="Email")
+    telefono = forms.CharField(label="Telefono", max_length=30)
+    fecha_inicio = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), input_formats=['%Y-%m-%d'])
+    fecha_fin = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), input_formats=['%Y-%m-%d'])
+    metodo = forms.ChoiceField(choices=METODOS_PAGO)
+    referencia = forms.CharField(label="Referencia o comentario", max_length=120, required=False)
+    clave_idempotencia = forms.CharField(widget=forms.HiddenInput(), max_length=64, initial=lambda: uuid.uuid4().hex)
+
+    def __init__(self, *args, tipos=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        # El nombre del campo sale del tipo y no de su posicion: si la lista de
+        # tipos cambia entre el GET y el POST, cada cantidad sigue en su tipo
+        self.tipos = {}
+        for tipo in tipos:
+            campo = self.campo_de(tipo)
+            self.fields[campo] = forms.IntegerField(label=tipo, min_value=0, initial=0, required=False)
+            self.tipos[campo] = tipo
+
+    @staticmethod
+    def campo_de(tipo):
+        return f"cantidad_{hashlib.sha1(tipo.encode()).hexdigest()[:12]}"
+
+    def campos_cantidad(self):
+        return [self[campo] for campo in self.tipos]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        fecha_inicio = cleaned_data.get('fecha_inicio')
+        fecha_fin = cleaned_data.get('fecha_fin')
+        if fecha_inicio and fecha_fin and fecha_inicio >= fecha_fin:
+            raise ValidationError("La fecha de inicio debe ser anterior a la fecha de fin.")
+
+        retirados = [
+            campo for campo, valor in self.data.items()
+            if campo.startswith("cantidad_") and campo not in self.tipos and valor not in ("", "0")
+        ]
+        if retirados:
+            raise ValidationError("Alguno de los tipos pedidos ya no está disponible; revisa las cantidades.")
+        solicitud = {tipo: cleaned_data.get(campo) for campo, tipo in self.tipos.items() if cleaned_data.get(campo)}
+        if not solicitud:
+            raise ValidationError("Indica al menos una habitación.")
+        if sum(solicitud.values()) > MAXIMO_HABITACIONES_GRUPO:
+            raise ValidationError(f"Una reserva grupal admite hasta {MAXIMO_HABITACIONES_GRUPO} habitaciones.")
+        cleaned_data['solicitud'] = solicitud
+        return cleaned_data
+
 # Simulación de pago
 class PagoSimuladoForm(forms.Form):
-    metodo = forms.ChoiceField(choices=[('tarjeta', 'Tarjeta'), ('transferencia', 'Transferencia'), ('efectivo', 'Efectivo')])
+    metodo = forms.ChoiceField(choices=METODOS_PAGO)
+    # Nueva en cada render: un doble envio del mismo formulario llega con la misma clave
+    clave_idempotencia = forms.CharField(widget=forms.HiddenInput(), max_length=64, initial=lambda: uuid.uuid4().hex)
     referencia = forms.CharField(label="Referencia o comentario", max_length=120, required=False)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from core.barrido import completar_finalizadas, expirar_pendientes
+from core.cambios import podar
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancela las reservas pendientes sin pagar tras el TTL y marca completadas las "
+        "estadías terminadas, con UPDATE en lotes, y poda el registro de cambios de "
+        "disponibilidad. Sin --intervalo hace una pasada (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ttl", type=int, default=settings.RESERVA_PENDIENTE_TTL,
+                            help="Minutos que una reserva puede quedar pendiente de pago.")
+        parser.add_argument("--lote", type=int, default=500)
+        parser.add_argument("--retencion", type=int, default=settings.CAMBIOS_RETENCION,
+                            help="Días que se conserva el registro de cambios de disponibilidad.")
+        parser.add_argument("--intervalo", type=float,
+                            help="Repite el barrido cada N segundos en vez de terminar.")
+
+    def handle(self, *args, **options):
+        ttl = timedelta(minutes=options["ttl"])
+        while True:
+            inicio = time.monotonic()
+            expiradas = expirar_pendientes(ttl, lote=options["lote"])
+            completadas = completar_finalizadas(lote=options["lote"])
+            podados = podar(timezone.now() - timedelta(days=options["retencion"]))
+            self.stdout.write(
+                f"{expiradas} reservas pendientes expiradas, {completadas} completadas, "
+                f"{podados} cambios podados ({time.monotonic() - inicio:.2f}s)"
+            )
+            if options["intervalo"] is None:
+                break
+            connection.close()
+            time.sleep(options["intervalo"])
@@ -0,0 +1,124 @@
+import multiprocessing
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import closing
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from core.models import Habitacion
+from core.reservas import HabitacionNoDisponible, ReservaConflicto, crear_reserva
+
+# "sin_ajustes" reproduce la configuracion anterior: journal por defecto,
+# transacciones DEFERRED y el timeout por defecto de sqlite3 (5 s)
+PERFILES = {
+    "sin_ajustes": {},
+    "ajustado": settings.DATABASES["default"].get("OPTIONS", {}),
+}
+RUT = "123456785"
+
+
+def _trabajador(ruta, opciones, indice, procesos, escrituras, habitaciones, cola):
+    # Proceso hijo (fork): usa su propia conexion, persistente durante toda la prueba
+    base = connections["default"]
+    base.settings_dict["NAME"] = ruta
+    base.settings_dict["OPTIONS"] = dict(opciones)
+
+    exitosas, bloqueos, latencias = 0, 0, []
+    inicio_fechas = date(2040, 1, 1)
+    for i in range(escrituras):
+        # Cada escritura usa una (habitacion, fechas) distinta: los conflictos que
+        # queden son de bloqueo de la base, no de disponibilidad
+        n = i * procesos + indice
+        habitacion = habitaciones[n % len(habitaciones)]
+        fecha_inicio = inicio_fechas + timedelta(days=2 * (n // len(habitaciones)))
+        inicio = time.perf_counter()
+        try:
+            crear_reserva(habitacion, fecha_inicio, fecha_inicio + timedelta(days=2), rut=RUT)
+        except HabitacionNoDisponible:
+            continue
+        except ReservaConflicto:
+            bloqueos += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            bloqueos += 1
+        else:
+            exitosas += 1
+            latencias.append(time.perf_counter() - inicio)
+    base.close()
+    cola.put((exitosas, bloqueos, latencias))
+
+
+def _copiar_base(destino, journal):
+    origen = str(connections["default"].settings_dict["NAME"])
+    with closing(sqlite3.connect(origen)) as fuente, closing(sqlite3.connect(destino)) as copia:
+        fuente.backup(copia)
+        copia.execute(f"PRAGMA journal_mode={journal}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Lanza varios procesos que crean reservas en paralelo sobre una copia de la base, "
+        "con y sin el perfil de pragmas de hotel/sqlite.py, y compara escrituras por "
+        "segundo y tasa de errores 'database is locked'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--procesos", type=int, default=8)
+        parser.add_argument("--escrituras", type=int, default=200, help="Reservas por proceso.")
+        parser.add_argument("--perfil", choices=sorted(PERFILES), action="append",
+                            help="Limita la prueba a un perfil (se puede repetir).")
+
+    def handle(self, *args, **options):
+        habitaciones = list(Habitacion.objects.filter(estado="disponible"))
+        if not habitaciones:
+            raise CommandError("No hay habitaciones disponibles; ejecuta antes generar_datos.")
+        procesos = options["procesos"]
+        contexto = multiprocessing.get_context("fork")
+
+        resultados = {}
+        with tempfile.TemporaryDirectory() as directorio:
+            for nombre in options["perfil"] or sorted(PERFILES, reverse=True):
+                opciones = PERFILES[nombre]
+                ruta = str(Path(directorio) / f"{nombre}.sqlite3")
+                _copiar_base(ruta, "wal" if "wal" in opciones.get("init_command", "").lower() else "delete")
+
+                # Los hijos no deben heredar conexiones abiertas del padre
+                connections.close_all()
+                cola = contexto.Queue()
+                hijos = [
+                    contexto.Process(target=_trabajador, args=(
+                        ruta, opciones, indice, procesos, options["escrituras"], habitaciones, cola,
+                    ))
+                    for indice in range(procesos)
+                ]
+                inicio = time.perf_counter()
+                for hijo in hijos:
+                    hijo.start()
+                parciales = [cola.get() for _ in hijos]
+                for hijo in hijos:
+                    hijo.join()
+                duracion = time.perf_counter() - inicio
+
+                exitosas = sum(p[0] for p in parciales)
+                bloqueos = sum(p[1] for p in parciales)
+                latencias = sorted(latencia for p in parciales for latencia in p[2])
+                resultados[nombre] = {
+                    "escrituras_por_segundo": round(exitosas / duracion, 1),
+                    "errores_bloqueo": bloqueos,
+                    "tasa_bloqueo": round(bloqueos / max(1, exitosas + bloqueos), 4),
+                    "p50_ms": round(statistics.median(latencias) * 1000, 2) if latencias else None,
+                    "p95_ms": round(latencias[int(len(latencias) * 0.95)] * 1000, 2) if latencias else None,
+                }
+                self.stdout.write(f"{nombre}: {resultados[nombre]}")
+
+        if {"sin_ajustes", "ajustado"} <= resultados.keys() and resultados["sin_ajustes"]["escrituras_por_segundo"]:
+            relacion = (resultados["ajustado"]["escrituras_por_segundo"]
+                        / resultados["sin_ajustes"]["escrituras_por_segundo"])
+            self.stdout.write(self.style.SUCCESS(f"ajustado / sin_ajustes: {relacion:.2f}x escrituras por segundo"))
@@ -0,0 +1,207 @@
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.datos_sinteticos import generar
+from core.models import Habitacion, Pago, Reserva
+from core.reservas import ReservaConflicto, crear_reserva
+from core.rut import formatear_rut
+
+
+class ContadorPasos:
+    # SQLite no expone filas leidas; los pasos de su maquina virtual son el
+    # mejor indicador disponible del trabajo hecho por cada consulta.
+    INTERVALO = 100
+
+    def __enter__(self):
+        self.pasos = 0
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(self._paso, self.INTERVALO)
+        return self
+
+    def _paso(self):
+        self.pasos += self.INTERVALO
+        return 0
+
+    def __exit__(self, *exc):
+        connection.connection.set_progress_handler(None, self.INTERVALO)
+
+
+def medir(nombre, peticion, verificar=None):
+    caches["disponibilidad"].clear()
+    with CaptureQueriesContext(connection) as consultas, ContadorPasos() as contador:
+        inicio = time.perf_counter()
+        respuesta = peticion()
+        transcurrido = time.perf_counter() - inicio
+    if respuesta.status_code >= 400:
+        raise CommandError(f"{nombre}: la vista respondió {respuesta.status_code}")
+    # Un formulario rechazado responde 200 sin hacer el trabajo que se quiere medir
+    if verificar is not None and not verificar(respuesta):
+        raise CommandError(f"{nombre}: la vista respondió {respuesta.status_code} sin completar la operación")
+    return transcurrido * 1000, len(consultas), contador.pasos
+
+
+class Escenarios:
+    # Cada escenario devuelve (peticion, verificar); verificar corre fuera de la medicion
+
+    def __init__(self, rnd):
+        self.rnd = rnd
+        self.cliente = Client()
+        self.hoy = timezone.localdate()
+        self.habitaciones = list(Habitacion.objects.filter(estado="disponible"))
+
+    def _rango(self):
+        inicio = self.hoy + timedelta(days=self.rnd.randrange(30, 400))
+        return inicio, inicio + timedelta(days=self.rnd.randrange(1, 6))
+
+    def _rut(self):
+        numero = self.rnd.randrange(30_000_000, 40_000_000)
+        return formatear_rut(numero)
+
+    def _reserva_pendiente(self):
+        # Preparacion fuera de la medicion: una reserva nueva por repeticion
+        while True:
+            inicio, fin = self._rango()
+            inicio += timedelta(days=400)
+            fin += timedelta(days=400)
+            try:
+                return crear_reserva(self.rnd.choice(self.habitaciones), inicio, fin, rut=self._rut())
+            except ReservaConflicto:
+                continue
+
+    def reservar_busqueda(self):
+        inicio, fin = self._rango()
+        return lambda: self.cliente.get(reverse("reservar"), {"fecha_inicio": inicio, "fecha_fin": fin}), None
+
+    def reservar_crear(self):
+        inicio, fin = self._rango()
+        libres = list(Habitacion.objects.disponibles(inicio, fin).values_list("pk", flat=True)[:1])
+        datos = {
+            "rut": self._rut(), "nombre": "Benchmark", "email": "bench@example.com", "telefono": "123",
+            "habitacion": libres[0] if libres else "", "fecha_inicio": inicio, "fecha_fin": fin,
+        }
+        query = f"?fecha_inicio={inicio}&fecha_fin={fin}"
+        # Una reserva creada redirige al pago
+        return lambda: self.cliente.post(reverse("reservar") + query, datos), lambda r: r.status_code == 302
+
+    def mis_reservas(self):
+        reserva = Reserva.objects.select_related("cliente").order_by("?").first()
+        datos = {"rut": reserva.cliente.rut, "codigo": reserva.codigo}
+        return lambda: self.cliente.post(reverse("mis_reservas"), datos), lambda r: reserva.codigo in r.content.decode()
+
+    def simular_pago(self):
+        reserva = self._reserva_pendiente()
+        url = reverse("simular_pago", args=[reserva.codigo])
+        datos = {"metodo": "tarjeta", "referencia": "bench", "clave_idempotencia": uuid.uuid4().hex}
+        return (
+            lambda: self.cliente.post(url, datos),
+            lambda r: Pago.objects.filter(reserva=reserva, clave_idempotencia=datos["clave_idempotencia"]).exists(),
+        )
+
+
+VISTAS = ["reservar_busqueda", "reservar_crear", "mis_reservas", "simular_pago"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sinteticos en una base de prueba, ejecuta las vistas principales con el "
+        "cliente de pruebas y guarda tiempo, consultas y pasos de SQLite por vista."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habitaciones", type=int, default=100)
+        parser.add_argument("--clientes", type=int, default=1000)
+        parser.add_argument("--reservas", type=int, default=10000)
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--semilla", type=int, default=0)
+        parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument("--comparar", help="Resultados base (JSON) contra los que comparar.")
+        parser.add_argument("--tolerancia", type=float, default=0.25,
+                            help="Aumento relativo de la mediana de tiempo aceptado frente a la base.")
+
+    def handle(self, *args, **options):
+        # La base de prueba no debe leer ni escribir las caches compartidas con el servidor
+        caches_locales = {
+            alias: {**config, "BACKEND": settings.CACHE_LOCAL, "LOCATION": f"benchmark-{alias}"}
+            for alias, config in settings.CACHES.items()
+        }
+        setup_test_environment()
+        antiguas = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CACHES=caches_locales):
+                resultados = self.ejecutar(options)
+        finally:
+            teardown_databases(antiguas, verbosity=0)
+            teardown_test_environment()
+
+        texto = json.dumps(resultados, indent=2)
+        if options["salida"]:
+            with open(options["salida"], "w") as archivo:
+                archivo.write(texto + "\n")
+        self.stdout.write(texto)
+
+        if options["comparar"]:
+            with open(options["comparar"]) as archivo:
+                base = json.load(archivo)
+            regresiones = comparar(base, resultados, options["tolerancia"])
+            if regresiones:
+                raise CommandError("Regresiones:\n" + "\n".join(regresiones))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones frente a la base."))
+
+    def ejecutar(self, options):
+        inicio = time.perf_counter()
+        generar(options["habitaciones"], options["clientes"], options["reservas"], semilla=options["semilla"])
+        self.stderr.write(f"Datos generados en {time.perf_counter() - inicio:.1f}s")
+
+        escenarios = Escenarios(random.Random(options["semilla"]))
+        vistas = {}
+        for nombre in VISTAS:
+            tiempos, consultas, pasos = [], [], []
+            for _ in range(options["repeticiones"]):
+                peticion, verificar = getattr(escenarios, nombre)()
+                ms, n, p = medir(nombre, peticion, verificar)
+                tiempos.append(ms)
+                consultas.append(n)
+                pasos.append(p)
+            tiempos.sort()
+            vistas[nombre] = {
+                "mediana_ms": round(statistics.median(tiempos), 3),
+                "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 3),
+                "consultas": max(consultas),
+                "pasos_sqlite": int(statistics.median(pasos)),
+            }
+        return {
+            "escala": {clave: options[clave] for clave in ("habitaciones", "clientes", "reservas", "repeticiones")},
+            "vistas": vistas,
+        }
+
+
+def comparar(base, actual, tolerancia):
+    regresiones = []
+    if base.get("escala") != actual.get("escala"):
+        regresiones.append(f"Escalas distintas: base {base.get('escala')} / actual {actual.get('escala')}")
+    for nombre, previo in base.get("vistas", {}).items():
+        medido = actual["vistas"].get(nombre)
+        if medido is None:
+            continue
+        if medido["mediana_ms"] > previo["mediana_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: mediana {previo['mediana_ms']} ms -> {medido['mediana_ms']} ms")
+        if medido["consultas"] > previo["consultas"]:
+            regresiones.append(f"{nombre}: consultas {previo['consultas']} -> {medido['consultas']}")
+        if medido["pasos_sqlite"] > previo["pasos_sqlite"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: pasos SQLite {previo['pasos_sqlite']} -> {medido['pasos_sqlite']}")
+    return regresiones
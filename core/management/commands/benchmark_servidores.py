@@ -0,0 +1,130 @@
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+SERVIDORES = {
+    "wsgi": ["hotel.wsgi:application"],
+    "asgi": ["hotel.asgi:application", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def esperar_puerto(puerto, limite=20):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"El servidor no respondió en el puerto {puerto}.")
+
+
+def generar_carga(puerto, host, rutas, concurrencia, duracion):
+    latencias, errores = [], 0
+    lock = threading.Lock()
+    fin = time.monotonic() + duracion
+
+    def trabajador(desfase):
+        nonlocal errores
+        propias, fallidas, i = [], 0, desfase
+        conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+        while time.monotonic() < fin:
+            ruta = rutas[i % len(rutas)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                conexion.request("GET", ruta, headers={"Host": host})
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status >= 400:
+                    fallidas += 1
+                else:
+                    propias.append(time.perf_counter() - inicio)
+            except (OSError, http.client.HTTPException):
+                fallidas += 1
+                conexion.close()
+                conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+        conexion.close()
+        with lock:
+            latencias.extend(propias)
+            errores += fallidas
+
+    hilos = [threading.Thread(target=trabajador, args=(n,)) for n in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    latencias.sort()
+    return {
+        "peticiones_por_segundo": round(len(latencias) / duracion, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 2) if latencias else None,
+        "p95_ms": round(latencias[int(len(latencias) * 0.95)] * 1000, 2) if latencias else None,
+        "errores": errores,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta gunicorn con hotel.wsgi y con hotel.asgi (workers de uvicorn), genera la "
+        "misma carga concurrente de lectura contra ambos y compara peticiones por segundo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--concurrencia", type=int, default=32)
+        parser.add_argument("--duracion", type=float, default=10.0, help="Segundos de carga por servidor.")
+        parser.add_argument("--puerto", type=int, default=8765)
+        parser.add_argument("--servidor", choices=sorted(SERVIDORES), action="append",
+                            help="Limita la prueba a un punto de entrada (se puede repetir).")
+
+    def handle(self, *args, **options):
+        gunicorn = shutil.which("gunicorn")
+        if gunicorn is None:
+            raise CommandError("gunicorn no está instalado.")
+
+        hoy = timezone.localdate()
+        rutas = [
+            "/",
+            f"/reservar/?fecha_inicio={hoy + timedelta(days=30)}&fecha_fin={hoy + timedelta(days=32)}",
+            "/mis_reservas/",
+        ]
+        host = next((h for h in settings.ALLOWED_HOSTS if h != "*"), "localhost").lstrip(".")
+        entorno = {**os.environ, "PYTHONPATH": str(settings.BASE_DIR)}
+
+        resultados = {}
+        for nombre in options["servidor"] or sorted(SERVIDORES):
+            comando = [
+                gunicorn, *SERVIDORES[nombre],
+                "--workers", str(options["workers"]),
+                "--bind", f"127.0.0.1:{options['puerto']}",
+                "--log-level", "warning",
+            ]
+            proceso = subprocess.Popen(comando, cwd=settings.BASE_DIR, env=entorno,
+                                       stdout=subprocess.DEVNULL, stderr=sys.stderr)
+            try:
+                esperar_puerto(options["puerto"])
+                # Calentamiento: imports, conexiones y cache de plantillas
+                generar_carga(options["puerto"], host, rutas, 2, 1)
+                resultados[nombre] = generar_carga(
+                    options["puerto"], host, rutas, options["concurrencia"], options["duracion"]
+                )
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=30)
+            self.stdout.write(f"{nombre}: {resultados[nombre]}")
+
+        if {"wsgi", "asgi"} <= resultados.keys() and resultados["wsgi"]["peticiones_por_segundo"]:
+            relacion = resultados["asgi"]["peticiones_por_segundo"] / resultados["wsgi"]["peticiones_por_segundo"]
+            self.stdout.write(self.style.SUCCESS(f"ASGI / WSGI: {relacion:.2f}x peticiones por segundo"))
@@ -0,0 +1,325 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cambios import registrar
+from core.disponibilidad import invalidar_todo
+from core.resumenes import reconstruir
+from core.models import Cliente, Habitacion, NocheOcupada, Pago, Reserva
+from core.rut import rut_canonico
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+def _requerido(fila, campo):
+    valor = fila.get(campo)
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if valor in (None, ""):
+        raise FilaInvalida(f"falta '{campo}'")
+    return valor
+
+
+def _rut(fila):
+    valor = _requerido(fila, "rut")
+    try:
+        return rut_canonico(valor)
+    except ValidationError:
+        raise FilaInvalida(f"'rut' no es un RUT válido: {valor!r}")
+
+
+def _decimal(fila, campo, defecto=None):
+    valor = fila.get(campo)
+    if valor in (None, ""):
+        if defecto is None:
+            raise FilaInvalida(f"falta '{campo}'")
+        return defecto
+    try:
+        return Decimal(str(valor))
+    except InvalidOperation:
+        raise FilaInvalida(f"'{campo}' no es un número: {valor!r}")
+
+
+def _fecha(fila, campo):
+    try:
+        return date.fromisoformat(str(_requerido(fila, campo)))
+    except ValueError:
+        raise FilaInvalida(f"'{campo}' no es una fecha YYYY-MM-DD")
+
+
+def _fecha_hora(fila, campo):
+    valor = fila.get(campo)
+    if not valor:
+        return None
+    fecha = parse_datetime(str(valor))
+    if fecha is None:
+        try:
+            fecha = datetime.combine(date.fromisoformat(str(valor)), datetime.min.time())
+        except ValueError:
+            raise FilaInvalida(f"'{campo}' no es una fecha válida")
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def _estado(fila, opciones, defecto):
+    estado = fila.get("estado") or defecto
+    if estado not in dict(opciones):
+        raise FilaInvalida(f"estado desconocido: {estado!r}")
+    return estado
+
+
+class CargadorHabitaciones:
+    def preparar(self, filas):
+        pass
+
+    def construir(self, fila):
+        precio = _decimal(fila, "precio")
+        try:
+            capacidad = int(_requerido(fila, "capacidad"))
+        except ValueError:
+            raise FilaInvalida("'capacidad' no es un entero")
+        habitacion = Habitacion(
+            tipo=_requerido(fila, "tipo"),
+            capacidad=capacidad,
+            precio=precio,
+            estado=_estado(fila, Habitacion.ESTADO_CHOICES, "disponible"),
+        )
+        if fila.get("id_habitacion"):
+            habitacion.id_habitacion = fila["id_habitacion"]
+        return habitacion
+
+    def guardar(self, objetos):
+        Habitacion.objects.bulk_create(objetos)
+
+
+class CargadorClientes:
+    def __init__(self):
+        # Mapa RUT -> id para no consultar la base por cada fila
+        self.clientes = dict(Cliente.objects.values_list("rut", "id").iterator(chunk_size=5000))
+
+    def preparar(self, filas):
+        pass
+
+    def construir(self, fila):
+        rut = _rut(fila)
+        if rut in self.clientes:
+            return None
+        self.clientes[rut] = None
+        return Cliente(
+            rut=rut,
+            nombre=fila.get("nombre") or "",
+            email=fila.get("email") or "",
+            telefono=fila.get("telefono") or "",
+        )
+
+    def guardar(self, objetos):
+        Cliente.objects.bulk_create(objetos)
+        self.resolver_pendientes()
+
+    def resolver_pendientes(self):
+        pendientes = [rut for rut, pk in self.clientes.items() if pk is None]
+        for inicio in range(0, len(pendientes), 500):
+            trozo = pendientes[inicio:inicio + 500]
+            self.clientes.update(Cliente.objects.filter(rut__in=trozo).values_list("rut", "id"))
+
+
+class CargadorReservas:
+    def __init__(self):
+        self.clientes = CargadorClientes()
+        self.habitaciones = dict(Habitacion.objects.values_list("id_habitacion", "id"))
+        self.nuevos_clientes = []
+
+    def preparar(self, filas):
+        self.nuevos_clientes = []
+
+    def construir(self, fila):
+        id_habitacion = _requerido(fila, "id_habitacion")
+        habitacion_id = self.habitaciones.get(id_habitacion)
+        if habitacion_id is None:
+            raise FilaInvalida(f"habitación desconocida: {fila['id_habitacion']!r}")
+        fecha_inicio = _fecha(fila, "fecha_inicio")
+        fecha_fin = _fecha(fila, "fecha_fin")
+        if fecha_inicio >= fecha_fin:
+            raise FilaInvalida("fecha_inicio debe ser anterior a fecha_fin")
+
+        reserva = Reserva(
+            habitacion_id=habitacion_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            estado=_estado(fila, Reserva.ESTADO_RESERVA, "completada"),
+            precio_total=_decimal(fila, "precio_total", Decimal("0.00")),
+            monto_porcentaje=int(fila.get("monto_porcentaje") or 30),
+        )
+        # Los pagos se cargan despues y descuentan el saldo (ver CargadorPagos)
+        reserva.saldo = reserva.precio_total
+        if fila.get("codigo"):
+            reserva.codigo = fila["codigo"]
+        reserva._creada = _fecha_hora(fila, "created_at")
+
+        # El cliente se registra solo cuando la fila ya es valida
+        nuevo = self.clientes.construir(fila)
+        if nuevo is not None:
+            self.nuevos_clientes.append(nuevo)
+        reserva._rut = _rut(fila)
+        reserva._id_habitacion = id_habitacion
+        return reserva
+
+    def guardar(self, objetos):
+        if self.nuevos_clientes:
+            self.clientes.guardar(self.nuevos_clientes)
+        for reserva in objetos:
+            reserva.cliente_id = self.clientes.clientes[reserva._rut]
+        Reserva.objects.bulk_create(objetos)
+
+        # bulk_create no pasa por Reserva.save(): las noches se escriben aqui
+        NocheOcupada.objects.bulk_create([noche for reserva in objetos for noche in reserva.noches_ocupadas()])
+        registrar([
+            (reserva._id_habitacion, reserva.fecha_inicio, reserva.fecha_fin)
+            for reserva in objetos if reserva.estado in Reserva.ESTADOS_ACTIVOS
+        ])
+
+        historicas = [reserva for reserva in objetos if reserva._creada]
+        for reserva in historicas:
+            reserva.created_at = reserva._creada
+        if historicas:
+            Reserva.objects.bulk_update(historicas, ["created_at"])
+
+
+class CargadorPagos:
+    def __init__(self):
+        self.reservas = {}
+
+    def preparar(self, filas):
+        # Las reservas se resuelven por lote para no cargar todo el historial en memoria
+        codigos = {fila.get("codigo") for fila in filas if fila.get("codigo")}
+        self.reservas = dict(Reserva.objects.filter(codigo__in=codigos).values_list("codigo", "id_reserva"))
+
+    def construir(self, fila):
+        reserva_id = self.reservas.get(_requerido(fila, "codigo"))
+        if reserva_id is None:
+            raise FilaInvalida(f"reserva desconocida: {fila['codigo']!r}")
+        pago = Pago(
+            reserva_id=reserva_id,
+            monto=_decimal(fila, "monto"),
+            metodo=fila.get("metodo") or "",
+            referencia=fila.get("referencia") or "",
+        )
+        pago._fecha = _fecha_hora(fila, "fecha")
+        return pago
+
+    def guardar(self, objetos):
+        Pago.objects.bulk_create(objetos)
+        # bulk_create no pasa por Pago.save(): los contadores de la reserva se ajustan aqui
+        montos = defaultdict(Decimal)
+        for pago in objetos:
+            montos[pago.reserva_id] += pago.monto
+        for reserva_id, monto in montos.items():
+            Reserva.objects.filter(pk=reserva_id).update(
+                monto_pagado=F("monto_pagado") + monto, saldo=F("saldo") - monto
+            )
+        # auto_now_add pisa la fecha en el insert; se restaura la fecha historica
+        historicos = [pago for pago in objetos if pago._fecha]
+        for pago in historicos:
+            pago.fecha = pago._fecha
+        if historicos:
+            Pago.objects.bulk_update(historicos, ["fecha"])
+
+
+CARGADORES = {
+    "habitacion": CargadorHabitaciones,
+    "cliente": CargadorClientes,
+    "reserva": CargadorReservas,
+    "pago": CargadorPagos,
+}
+
+
+def leer_filas(ruta, formato):
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        if formato == "csv":
+            for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+                yield numero, fila
+        else:
+            for numero, linea in enumerate(archivo, start=1):
+                if linea.strip():
+                    try:
+                        yield numero, json.loads(linea)
+                    except json.JSONDecodeError as e:
+                        yield numero, e
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga habitaciones, clientes, reservas o pagos desde JSON Lines o CSV en lotes "
+        "con bulk_create. Cada lote se escribe en su propia transacción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument("--modelo", required=True, choices=sorted(CARGADORES))
+        parser.add_argument("--formato", choices=["jsonl", "csv"],
+                            help="Por defecto se deduce de la extensión del archivo.")
+        parser.add_argument("--lote", type=int, default=1000)
+        parser.add_argument("--omitir-invalidos", action="store_true",
+                            help="Informa y salta las filas inválidas en vez de abortar.")
+
+    def handle(self, *args, **options):
+        formato = options["formato"] or ("csv" if options["archivo"].lower().endswith(".csv") else "jsonl")
+        cargador = CARGADORES[options["modelo"]]()
+        filas = leer_filas(options["archivo"], formato)
+
+        cargadas = omitidas = 0
+        inicio = time.monotonic()
+        while True:
+            lote = list(islice(filas, options["lote"]))
+            if not lote:
+                break
+            cargador.preparar([fila for _, fila in lote if isinstance(fila, dict)])
+
+            objetos = []
+            for numero, fila in lote:
+                try:
+                    if not isinstance(fila, dict):
+                        raise FilaInvalida(f"JSON inválido: {fila}")
+                    objeto = cargador.construir(fila)
+                except FilaInvalida as e:
+                    if not options["omitir_invalidos"]:
+                        raise CommandError(f"Línea {numero}: {e}")
+                    self.stderr.write(f"Línea {numero} omitida: {e}")
+                    omitidas += 1
+                    continue
+                if objeto is not None:
+                    objetos.append(objeto)
+
+            try:
+                with transaction.atomic():
+                    cargador.guardar(objetos)
+            except IntegrityError as e:
+                raise CommandError(
+                    f"Lote entre las líneas {lote[0][0]} y {lote[-1][0]} rechazado: {e}. "
+                    f"Se mantienen las {cargadas} filas de lotes anteriores."
+                )
+
+            cargadas += len(objetos)
+            transcurrido = time.monotonic() - inicio
+            self.stdout.write(f"{cargadas} filas cargadas ({cargadas / transcurrido:.0f} filas/s)")
+
+        # bulk_create no emite señales: la cache de disponibilidad se descarta completa
+        invalidar_todo()
+        # ni actualiza los resumenes diarios: se recalculan desde las tablas
+        if options["modelo"] in ("reserva", "pago") and cargadas:
+            self.stdout.write(f"{reconstruir()} resúmenes diarios recalculados")
+        self.stdout.write(self.style.SUCCESS(f"Listo: {cargadas} filas cargadas, {omitidas} omitidas."))
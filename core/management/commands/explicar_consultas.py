@@ -0,0 +1,47 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Cliente, Habitacion, Pago, Reserva
+
+# Una linea "SCAN tabla" sin "USING ... INDEX" es un recorrido completo de la tabla
+SCAN_COMPLETO = re.compile(r"\bSCAN (?!.*\bUSING\b.*\bINDEX\b)(\w+)")
+
+
+def consultas_principales():
+    hoy = timezone.localdate()
+    fin = hoy + timedelta(days=3)
+    return {
+        "disponibilidad": Habitacion.objects.disponibles(hoy, fin),
+        "mis_reservas": Reserva.objects.filter(codigo="ABCD2345", cliente__rut="123456785"),
+        "cliente_por_rut": Cliente.objects.filter(rut="123456785"),
+        "reservas_habitacion": Reserva.objects.filter(
+            habitacion_id=1, fecha_inicio__lt=fin, fecha_fin__gt=hoy, estado__in=Reserva.ESTADOS_ACTIVOS
+        ),
+        "pagos_reserva": Pago.objects.filter(reserva_id="00000000000000000000000000000000").order_by("fecha"),
+        "pagos_listado": Pago.objects.order_by("reserva", "fecha"),
+    }
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN sobre las consultas principales y falla si alguna recorre una tabla completa."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--permitir", nargs="*", default=[],
+                            help="Tablas pequeñas en las que se acepta un recorrido completo.")
+
+    def handle(self, *args, **options):
+        problemas = []
+        for nombre, queryset in consultas_principales().items():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+            self.stdout.write(plan)
+            for tabla in SCAN_COMPLETO.findall(plan):
+                if tabla not in options["permitir"]:
+                    problemas.append(f"{nombre}: recorrido completo de {tabla}")
+
+        if problemas:
+            raise CommandError("\n".join(problemas))
+        self.stdout.write(self.style.SUCCESS("Todas las consultas usan indices."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.datos_sinteticos import generar
+
+
+class Command(BaseCommand):
+    help = "Genera habitaciones, clientes y reservas sinteticas con fechas realistas (para pruebas y benchmarks)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habitaciones", type=int, default=50)
+        parser.add_argument("--clientes", type=int, default=500)
+        parser.add_argument("--reservas", type=int, default=5000)
+        parser.add_argument("--semilla", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options["habitaciones"] < 1 or options["clientes"] < 1:
+            raise CommandError("Se necesita al menos una habitación y un cliente.")
+        generar(options["habitaciones"], options["clientes"], options["reservas"], semilla=options["semilla"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Generadas {options['habitaciones']} habitaciones, {options['clientes']} clientes "
+            f"y {options['reservas']} reservas."
+        ))
@@ -0,0 +1,67 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from core.tareas import ejecutar, tomar
+
+logger = logging.getLogger(__name__)
+
+
+def _ejecutar(tarea):
+    # Cada hilo del pool usa su propia conexion; se descartan las rotas o vencidas
+    close_old_connections()
+    try:
+        return ejecutar(tarea)
+    except DatabaseError:
+        # No se pudo registrar el resultado: la tarea se retoma tras TIEMPO_MAXIMO
+        logger.exception("No se pudo actualizar la tarea %s", tarea.pk)
+        return False
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de tareas: toma lotes de core_tarea y los ejecuta en un pool "
+        "de hilos, con reintentos y backoff exponencial para las que fallan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=4)
+        parser.add_argument("--intervalo", type=float, default=1.0,
+                            help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument("--una-vez", action="store_true",
+                            help="Procesa las tareas listas y termina.")
+
+    def handle(self, *args, **options):
+        trabajador = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        hilos = options["hilos"]
+        completadas = fallidas = 0
+
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="tarea") as pool:
+            try:
+                while True:
+                    tareas = tomar(trabajador, hilos * 2)
+                    if not tareas:
+                        if options["una_vez"]:
+                            break
+                        connection.close()
+                        time.sleep(options["intervalo"])
+                        continue
+                    for exito in pool.map(_ejecutar, tareas):
+                        if exito:
+                            completadas += 1
+                        else:
+                            fallidas += 1
+                    self.stdout.write(f"{completadas} tareas completadas, {fallidas} con error")
+            except KeyboardInterrupt:
+                # Las tareas ya tomadas terminan; las que no, se retoman tras TIEMPO_MAXIMO
+                self.stdout.write("Deteniendo worker...")
+
+        self.stdout.write(self.style.SUCCESS(f"Listo: {completadas} completadas, {fallidas} con error."))
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def copiar(origen, destino, paginas=-1):
+    # El backup escribe sobre el mismo archivo (no un rename): las conexiones
+    # persistentes abiertas sobre la replica ven la copia nueva en su proxima
+    # lectura. Mientras dura la copia esas lecturas esperan el lock (timeout).
+    with closing(sqlite3.connect(origen)) as fuente, closing(sqlite3.connect(destino, timeout=30)) as copia:
+        fuente.backup(copia, pages=paginas)
+        # El modo WAL viaja en la cabecera; la replica se abre en solo lectura y no puede usarlo
+        copia.execute("PRAGMA journal_mode=DELETE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base SQLite principal sobre la replica de solo lectura (DB_REPLICA_NAME) "
+        "con la API de backup de SQLite. Sin --intervalo hace una sola copia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--intervalo", type=float, help="Repite la copia cada N segundos.")
+        parser.add_argument("--paginas", type=int, default=-1,
+                            help="Páginas por paso del backup (-1 copia todo de una vez).")
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_RUTA:
+            raise CommandError("No hay replica configurada (DB_REPLICA_NAME).")
+        origen = str(connections["default"].settings_dict["NAME"])
+        while True:
+            inicio = time.monotonic()
+            copiar(origen, settings.REPLICA_RUTA, options["paginas"])
+            self.stdout.write(f"Replica actualizada en {time.monotonic() - inicio:.2f}s")
+            if options["intervalo"] is None:
+                break
+            time.sleep(options["intervalo"])
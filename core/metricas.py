@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# Limites (en segundos) de los buckets del histograma de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Registro:
+    """Acumula metricas por vista en memoria y las vuelca a un archivo SQLite
+    compartido por todos los workers de gunicorn."""
+
+    def __init__(self, ruta, intervalo):
+        self.ruta = str(ruta)
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendiente = defaultdict(float)
+        self._ultimo_volcado = time.monotonic()
+        self._conexion = None
+
+    def registrar(self, vista, segundos, consultas, segundos_db):
+        bucket = next((f"{limite}" for limite in BUCKETS if segundos <= limite), "+Inf")
+        with self._lock:
+            self._pendiente[(vista, f"bucket:{bucket}")] += 1
+            self._pendiente[(vista, "count")] += 1
+            self._pendiente[(vista, "sum")] += segundos
+            self._pendiente[(vista, "consultas")] += consultas
+            self._pendiente[(vista, "db_segundos")] += segundos_db
+            vencido = time.monotonic() - self._ultimo_volcado >= self.intervalo
+        if vencido:
+            self.volcar()
+
+    def _conectar(self):
+        if self._conexion is None:
+            self._conexion = sqlite3.connect(self.ruta, timeout=1, check_same_thread=False, isolation_level=None)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS metricas ("
+                "vista TEXT NOT NULL, serie TEXT NOT NULL, valor REAL NOT NULL, "
+                "PRIMARY KEY (vista, serie))"
+            )
+        return self._conexion
+
+    def volcar(self):
+        with self._lock:
+            pendiente, self._pendiente = self._pendiente, defaultdict(float)
+            self._ultimo_volcado = time.monotonic()
+            if not pendiente:
+                return
+            try:
+                conexion = self._conectar()
+                with conexion:
+                    conexion.execute("BEGIN IMMEDIATE")
+                    conexion.executemany(
+                        "INSERT INTO metricas (vista, serie, valor) VALUES (?, ?, ?) "
+                        "ON CONFLICT (vista, serie) DO UPDATE SET valor = valor + excluded.valor",
+                        [(vista, serie, valor) for (vista, serie), valor in pendiente.items()],
+                    )
+            except sqlite3.Error:
+                # Las metricas nunca deben romper una peticion: se reintenta en el proximo volcado
+                for clave, valor in pendiente.items():
+                    self._pendiente[clave] += valor
+
+    def leer(self):
+        self.volcar()
+        with self._lock:
+            filas = self._conectar().execute("SELECT vista, serie, valor FROM metricas").fetchall()
+        series = defaultdict(dict)
+        for vista, serie, valor in filas:
+            series[vista][serie] = valor
+        return series
+
+    def prometheus(self):
+        series = self.leer()
+        lineas = [
+            "# HELP hotel_vista_latencia_segundos Latencia de cada vista.",
+            "# TYPE hotel_vista_latencia_segundos histogram",
+        ]
+        for vista in sorted(series):
+            valores = series[vista]
+            acumulado = 0
+            for limite in [f"{limite}" for limite in BUCKETS] + ["+Inf"]:
+                acumulado += valores.get(f"bucket:{limite}", 0)
+                lineas.append(f'hotel_vista_latencia_segundos_bucket{{vista="{vista}",le="{limite}"}} {acumulado:.0f}')
+            lineas.append(f'hotel_vista_latencia_segundos_sum{{vista="{vista}"}} {valores.get("sum", 0):.6f}')
+            lineas.append(f'hotel_vista_latencia_segundos_count{{vista="{vista}"}} {valores.get("count", 0):.0f}')
+        for nombre, serie, formato, ayuda in (
+            ("hotel_vista_consultas_total", "consultas", ".0f", "Consultas SQL ejecutadas por la vista."),
+            ("hotel_vista_db_segundos_total", "db_segundos", ".6f", "Tiempo acumulado en la base de datos."),
+        ):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} counter")
+            for vista in sorted(series):
+                lineas.append(f'{nombre}{{vista="{vista}"}} {series[vista].get(serie, 0):{formato}}')
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro(
+    getattr(settings, "METRICAS_DB", settings.BASE_DIR / "metricas.sqlite3"),
+    getattr(settings, "METRICAS_INTERVALO", 5),
+)
@@ -0,0 +1,124 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metricas import registro
+from .routers import iniciar_peticion, replica_configurada, terminar_peticion
+
+
+class MedidorConsultas:
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+def _nombre_vista(request):
+    match = getattr(request, "resolver_match", None)
+    return match.url_name if match and match.url_name else "sin_ruta"
+
+
+class MetricasMiddleware:
+    """Mide latencia, numero de consultas y tiempo en base de datos por nombre de URL."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        # Todas las bases: con replica las lecturas no pasan por "default"
+        with ExitStack() as pila:
+            for alias in connections:
+                pila.enter_context(connections[alias].execute_wrapper(medidor))
+            response = self.get_response(request)
+        registro.registrar(_nombre_vista(request), time.perf_counter() - inicio, medidor.consultas, medidor.segundos)
+        return response
+
+    async def __acall__(self, request):
+        # Bajo ASGI el ORM corre en el hilo sync de la peticion; el wrapper se
+        # instala en la conexion de ese hilo, no en la del event loop.
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        await sync_to_async(lambda: [connections[alias].execute_wrappers.append(medidor) for alias in connections])()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(lambda: [connections[alias].execute_wrappers.remove(medidor) for alias in connections])()
+        registro.registrar(_nombre_vista(request), time.perf_counter() - inicio, medidor.consultas, medidor.segundos)
+        return response
+
+
+class FijacionPrimariaMiddleware:
+    """Tras una escritura, fija las lecturas de ese cliente a la base primaria
+    durante REPLICA_FIJACION segundos (ver core/routers.py)."""
+
+    sync_capable = True
+    async_capable = True
+    COOKIE = "fijar_primaria"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = iniciar_peticion(fijada=self.COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            escribio = terminar_peticion(token)
+        return self._fijar(response, escribio)
+
+    async def __acall__(self, request):
+        token = iniciar_peticion(fijada=self.COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            escribio = terminar_peticion(token)
+        return self._fijar(response, escribio)
+
+    def _fijar(self, response, escribio):
+        if escribio and replica_configurada():
+            response.set_cookie(self.COOKIE, "1", max_age=settings.REPLICA_FIJACION, httponly=True, samesite="Lax")
+        return response
+
+
+class WhiteNoiseAsyncMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise para hotel.asgi: solo los archivos estaticos pasan por un hilo."""
+
+    sync_capable = False
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        markcoroutinefunction(self)
+
+    async def __call__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
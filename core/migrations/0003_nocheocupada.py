@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:42
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def poblar_noches(apps, schema_editor):
+    Reserva = apps.get_model('core', 'Reserva')
+    NocheOcupada = apps.get_model('core', 'NocheOcupada')
+    noches = []
+    for reserva in Reserva.objects.filter(estado__in=['pendiente', 'confirmada']).iterator():
+        for i in range((reserva.fecha_fin - reserva.fecha_inicio).days):
+            noches.append(NocheOcupada(
+                reserva_id=reserva.pk,
+                habitacion_id=reserva.habitacion_id,
+                fecha=reserva.fecha_inicio + timedelta(days=i),
+            ))
+    NocheOcupada.objects.bulk_create(noches, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_reserva_fecha_fin_alter_reserva_fecha_inicio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NocheOcupada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('habitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='noches_ocupadas', to='core.habitacion')),
+                ('reserva', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='noches', to='core.reserva')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha', 'habitacion'], name='noche_fecha_habitacion_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_noches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:43
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, Min, OuterRef
+
+logger = logging.getLogger(__name__)
+
+
+def unificar_clientes(apps, schema_editor):
+    Cliente = apps.get_model('core', 'Cliente')
+    Reserva = apps.get_model('core', 'Reserva')
+    repetidos = Cliente.objects.values('rut').annotate(n=Count('id'), primero=Min('id')).filter(n__gt=1)
+    for fila in repetidos:
+        otros = Cliente.objects.filter(rut=fila['rut']).exclude(id=fila['primero'])
+        Reserva.objects.filter(cliente__in=otros).update(cliente_id=fila['primero'])
+        otros.delete()
+
+
+def cancelar_reservas_solapadas(apps, schema_editor):
+    # Reservas activas solapadas creadas antes del constraint: se conserva la
+    # mas antigua y las que chocan con ella se cancelan completas (liberando
+    # todas sus noches), para no dejar reservas activas a medio registrar.
+    NocheOcupada = apps.get_model('core', 'NocheOcupada')
+    Reserva = apps.get_model('core', 'Reserva')
+    otra_noche = NocheOcupada.objects.filter(
+        habitacion_id=OuterRef('habitacion_id'), fecha=OuterRef('fecha')
+    ).exclude(pk=OuterRef('pk'))
+    involucradas = NocheOcupada.objects.filter(Exists(otra_noche)).values('reserva_id')
+    noches = {}
+    for reserva_id, habitacion_id, fecha in NocheOcupada.objects.filter(reserva_id__in=involucradas).values_list(
+        'reserva_id', 'habitacion_id', 'fecha'
+    ):
+        noches.setdefault(reserva_id, set()).add((habitacion_id, fecha))
+
+    # Reserva usa UUID como pk: la antiguedad la da created_at
+    orden = Reserva.objects.filter(pk__in=list(noches)).order_by('created_at', 'codigo').values_list('pk', flat=True)
+    ocupadas, canceladas = set(), []
+    for reserva_id in orden:
+        if noches[reserva_id] & ocupadas:
+            canceladas.append(reserva_id)
+        else:
+            ocupadas |= noches[reserva_id]
+    NocheOcupada.objects.filter(reserva_id__in=canceladas).delete()
+    Reserva.objects.filter(pk__in=canceladas).update(estado='cancelada')
+    for reserva in Reserva.objects.filter(pk__in=canceladas).order_by('created_at', 'codigo'):
+        logger.warning(
+            "Reserva %s (habitacion %s, %s a %s) cancelada por solaparse con otra reserva activa; revisar a mano.",
+            reserva.codigo, reserva.habitacion_id, reserva.fecha_inicio, reserva.fecha_fin,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_nocheocupada'),
+    ]
+
+    operations = [
+        migrations.RunPython(unificar_clientes, migrations.RunPython.noop),
+        migrations.RunPython(cancelar_reservas_solapadas, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cliente',
+            name='rut',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='nocheocupada',
+            constraint=models.UniqueConstraint(fields=('habitacion', 'fecha'), name='noche_unica_habitacion_fecha'),
+        ),
+    ]
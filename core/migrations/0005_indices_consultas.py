@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+def normalizar_ruts(apps, schema_editor):
+    Cliente = apps.get_model('core', 'Cliente')
+    Reserva = apps.get_model('core', 'Reserva')
+    grupos = {}
+    for cliente_id, rut in Cliente.objects.order_by('id').values_list('id', 'rut'):
+        normalizado = rut.replace('.', '').replace('-', '').replace(' ', '').strip().upper()
+        grupos.setdefault(normalizado, []).append((cliente_id, rut))
+    for normalizado, filas in grupos.items():
+        # Filas con el mismo RUT normalizado se fusionan en la primera
+        principal_id, rut = filas[0]
+        otros = [cliente_id for cliente_id, _ in filas[1:]]
+        if otros:
+            Reserva.objects.filter(cliente_id__in=otros).update(cliente_id=principal_id)
+            Cliente.objects.filter(id__in=otros).delete()
+        if rut != normalizado:
+            Cliente.objects.filter(id=principal_id).update(rut=normalizado)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_cliente_rut_unico_noche_unica'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_ruts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='habitacion',
+            index=models.Index(fields=['estado', 'tipo'], name='habitacion_estado_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['reserva', 'fecha'], name='pago_reserva_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha'], name='pago_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['habitacion', 'fecha_inicio', 'fecha_fin', 'estado'], name='reserva_hab_fechas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'fecha_inicio'], name='reserva_estado_inicio_idx'),
+        ),
+    ]
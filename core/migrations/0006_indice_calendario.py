@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reserva',
+            name='reserva_estado_inicio_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'fecha_inicio', 'fecha_fin', 'habitacion'], name='reserva_estado_fechas_idx'),
+        ),
+    ]
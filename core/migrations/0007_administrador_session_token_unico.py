@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+def vaciar_tokens_en_blanco(apps, schema_editor):
+    Administrador = apps.get_model('core', 'Administrador')
+    Administrador.objects.filter(session_token='').update(session_token=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indice_calendario'),
+    ]
+
+    operations = [
+        migrations.RunPython(vaciar_tokens_en_blanco, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='administrador',
+            name='session_token',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:56
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_administrador_session_token_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Temporada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('tipo', models.CharField(blank=True, help_text='Tipo de habitación; vacío aplica a todos.', max_length=100)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField(help_text='Primera noche fuera de la temporada.')),
+                ('factor', models.DecimalField(decimal_places=3, default=Decimal('1.000'), max_digits=5)),
+                ('recargo_fin_de_semana', models.DecimalField(decimal_places=3, default=Decimal('0.000'), help_text='Fracción adicional para noches de viernes y sábado (0.2 = +20%).', max_digits=5)),
+                ('prioridad', models.PositiveSmallIntegerField(default=0, help_text='Si se solapan, gana la de mayor prioridad.')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha_inicio', 'fecha_fin'], name='temporada_fechas_idx')],
+            },
+        ),
+    ]
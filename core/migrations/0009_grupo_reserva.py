@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:01
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_temporada'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pago',
+            name='reserva',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='core.reserva'),
+        ),
+        migrations.CreateModel(
+            name='GrupoReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(default=core.models.generate_reservation_code, max_length=16, unique=True)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='grupos', to='core.cliente')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='pago',
+            name='grupo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='core.gruporeserva'),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='grupo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='reservas', to='core.gruporeserva'),
+        ),
+        migrations.AddConstraint(
+            model_name='pago',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('grupo__isnull', True), ('reserva__isnull', False)), models.Q(('grupo__isnull', False), ('reserva__isnull', True)), _connector='OR'), name='pago_reserva_o_grupo'),
+        ),
+    ]
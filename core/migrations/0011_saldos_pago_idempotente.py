@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:04
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_saldos(apps, schema_editor):
+    Pago = apps.get_model('core', 'Pago')
+    Reserva = apps.get_model('core', 'Reserva')
+    pagado = Pago.objects.filter(reserva=OuterRef('pk')).values('reserva').annotate(total=Sum('monto')).values('total')
+    Reserva.objects.update(monto_pagado=Coalesce(
+        Subquery(pagado, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        Value(Decimal('0.00')),
+    ))
+    Reserva.objects.update(saldo=F('precio_total') - F('monto_pagado'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pago',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='monto_pagado',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='saldo',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(calcular_saldos, migrations.RunPython.noop),
+    ]
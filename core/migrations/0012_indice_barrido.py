@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_saldos_pago_idempotente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'created_at'], name='reserva_estado_creada_idx'),
+        ),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:20
+
+import logging
+import re
+from collections import defaultdict
+
+import core.rut
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+# Copia de las reglas de core/rut.py a la fecha de esta migracion: si el modulo
+# cambia, la migracion sigue haciendo lo mismo
+FORMATO = re.compile(r"^(\d{7,8})([0-9K])$")
+CAMPOS = ('nombre', 'email', 'telefono')
+
+
+def digito_verificador(numero):
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: "0", 10: "K"}.get(resto, str(resto))
+
+
+def normalizar_rut(rut):
+    return str(rut).replace(".", "").replace("-", "").replace(" ", "").strip().upper()
+
+
+def motivo_invalido(rut):
+    match = FORMATO.match(normalizar_rut(rut))
+    if not match:
+        return "RUT mal formado"
+    if digito_verificador(match.group(1)) != match.group(2):
+        return "digito verificador invalido"
+    return None
+
+
+def en_conflicto(principal, otro):
+    for campo in CAMPOS:
+        a, b = getattr(principal, campo).strip().lower(), getattr(otro, campo).strip().lower()
+        if a and b and a != b:
+            return True
+    return False
+
+
+def fusionar_clientes(apps, schema_editor):
+    # Solo se fusionan clientes con el mismo RUT canonico (cuerpo y digito
+    # verificador valido) y datos de contacto compatibles: el sobreviviente es el
+    # mas antiguo, completa sus datos vacios con los de los demas y hereda sus
+    # reservas. Los RUT invalidos y los duplicados con datos distintos quedan sin
+    # RUT, con el texto original en rut_por_revisar (filtrable en el admin), para
+    # resolverlos a mano.
+    Cliente = apps.get_model('core', 'Cliente')
+    Reserva = apps.get_model('core', 'Reserva')
+    GrupoReserva = apps.get_model('core', 'GrupoReserva')
+
+    por_cuerpo, pendientes = defaultdict(list), []
+    for cliente in Cliente.objects.order_by('id'):
+        motivo = motivo_invalido(cliente.rut)
+        if motivo:
+            pendientes.append((cliente, motivo))
+        else:
+            por_cuerpo[int(normalizar_rut(cliente.rut)[:-1])].append(cliente)
+
+    for cuerpo, clientes in por_cuerpo.items():
+        principal, fusionados = clientes[0], []
+        for otro in clientes[1:]:
+            if en_conflicto(principal, otro):
+                pendientes.append((otro, f"mismo RUT que el cliente {principal.pk} con otros datos de contacto"))
+                continue
+            for campo in CAMPOS:
+                if not getattr(principal, campo):
+                    setattr(principal, campo, getattr(otro, campo))
+            fusionados.append(otro.pk)
+        if fusionados:
+            Reserva.objects.filter(cliente_id__in=fusionados).update(cliente_id=principal.pk)
+            GrupoReserva.objects.filter(cliente_id__in=fusionados).update(cliente_id=principal.pk)
+            Cliente.objects.filter(pk__in=fusionados).delete()
+        principal.rut_cuerpo = cuerpo
+        principal.save(update_fields=['rut_cuerpo', *CAMPOS])
+
+    for cliente, motivo in sorted(pendientes, key=lambda fila: fila[0].pk):
+        cliente.rut_por_revisar = cliente.rut
+        cliente.save(update_fields=['rut_por_revisar'])
+        logger.warning(
+            "Cliente %s (%r, %s): %s; corregir a mano.",
+            cliente.pk, cliente.rut, cliente.email or 'sin email', motivo,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_indice_barrido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_cuerpo',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_por_revisar',
+            field=models.CharField(blank=True, max_length=20, verbose_name='RUT por revisar'),
+        ),
+        migrations.RunPython(fusionar_clientes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='cliente',
+            name='rut',
+        ),
+        migrations.RenameField(
+            model_name='cliente',
+            old_name='rut_cuerpo',
+            new_name='rut',
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='rut',
+            field=core.rut.RutField(blank=True, null=True, unique=True, verbose_name='RUT'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:16
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_rut_canonico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo', models.CharField(max_length=100)),
+                ('noches_vendidas', models.IntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('cobrado', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'tipo'), name='resumen_fecha_tipo_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioDisponibilidad',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('id_habitacion', models.CharField(max_length=32)),
+                ('fecha_inicio', models.DateField(blank=True, null=True)),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['creado'], name='cambio_creado_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_registro_cambios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gruporeserva',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -1,8 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DateField, DurationField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from datetime import timedelta
 import uuid
 import secrets
 from decimal import Decimal
 
+from .rut import RutField
+
 def generate_reservation_code(length=8):
     alphabet = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
     return ''.join(secrets.choice(alphabet) for _ in range(length))
@@ -14,13 +20,53 @@ def generate_admin_id():
     return uuid.uuid4().hex
 
 class Cliente(models.Model):
-    rut = models.CharField(max_length=20)
+    # Sin RUT solo quedan clientes migrados con un RUT que no se pudo validar;
+    # el texto original queda en rut_por_revisar hasta corregirlo a mano
+    rut = RutField("RUT", unique=True, null=True, blank=True)
+    rut_por_revisar = models.CharField("RUT por revisar", max_length=20, blank=True)
     nombre = models.CharField(max_length=150, blank=True)
     email = models.EmailField(blank=True)
     telefono = models.CharField(max_length=30, blank=True)
 
     def __str__(self):
-        return f"{self.rut} - {self.nombre or 'Cliente'}"
+        return f"{self.rut or self.rut_por_revisar} - {self.nombre or 'Cliente'}"
+
+class HabitacionQuerySet(models.QuerySet):
+    def disponibles(self, fecha_inicio, fecha_fin):
+        # Una sola busqueda por rango sobre el inventario de noches (indice fecha, habitacion)
+        ocupadas = NocheOcupada.objects.filter(
+            fecha__gte=fecha_inicio, fecha__lt=fecha_fin
+        ).values("habitacion_id")
+        return self.filter(estado="disponible").exclude(pk__in=ocupadas)
+
+    def con_resumen(self, hoy):
+        # Huesped actual, proxima llegada y noches vendidas en el mes, todo como
+        # subconsultas correlacionadas: una pagina cuesta una sola consulta.
+        mes_inicio = hoy.replace(day=1)
+        mes_fin = (mes_inicio + timedelta(days=32)).replace(day=1)
+        activas = Reserva.objects.filter(habitacion=OuterRef("pk"), estado__in=Reserva.ESTADOS_ACTIVOS)
+        actual = activas.filter(fecha_inicio__lte=hoy, fecha_fin__gt=hoy)
+        proxima = activas.filter(fecha_inicio__gt=hoy).order_by("fecha_inicio")
+        noches_mes = Reserva.objects.filter(
+            habitacion=OuterRef("pk"),
+            estado__in=Reserva.ESTADOS_ACTIVOS + ("completada",),
+            fecha_inicio__lt=mes_fin,
+            fecha_fin__gt=mes_inicio,
+        ).annotate(
+            noches_en_mes=ExpressionWrapper(
+                Least("fecha_fin", Value(mes_fin, output_field=DateField()))
+                - Greatest("fecha_inicio", Value(mes_inicio, output_field=DateField())),
+                output_field=DurationField(),
+            )
+        ).values("habitacion").annotate(total=Sum("noches_en_mes")).values("total")
+        return self.annotate(
+            huesped_actual=Subquery(actual.values("cliente__nombre")[:1]),
+            huesped_rut=Subquery(actual.values("cliente__rut")[:1]),
+            huesped_saldo=Subquery(actual.values("saldo")[:1]),
+            proxima_llegada=Subquery(proxima.values("fecha_inicio")[:1]),
+            ocupacion_mes=Subquery(noches_mes, output_field=DurationField()),
+            dias_mes=Value((mes_fin - mes_inicio).days),
+        )
 
 class Habitacion(models.Model):
     ESTADO_CHOICES = [
@@ -34,9 +80,29 @@ class Habitacion(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="disponible")
 
+    objects = HabitacionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado", "tipo"], name="habitacion_estado_tipo_idx"),
+        ]
+
     def __str__(self):
         return f"{self.id_habitacion} - {self.tipo}"
 
+class GrupoReserva(models.Model):
+    # Reserva de varias habitaciones para las mismas fechas (operadores de turismo)
+    codigo = models.CharField(max_length=16, unique=True, default=generate_reservation_code)
+    cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name="grupos")
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+    # Un doble envio del formulario llega con la misma clave y no duplica el grupo
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Grupo {self.codigo} ({self.cliente.rut})"
+
 class Reserva(models.Model):
     ESTADO_RESERVA = [
         ("pendiente", "Pendiente"),
@@ -44,40 +110,239 @@ class Reserva(models.Model):
         ("cancelada", "Cancelada"),
         ("completada", "Completada"),
     ]
+    # Estados que bloquean noches en el inventario
+    ESTADOS_ACTIVOS = ("pendiente", "confirmada")
     id_reserva = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     codigo = models.CharField(max_length=16, unique=True, default=generate_reservation_code)
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name="reservas")
     habitacion = models.ForeignKey(Habitacion, on_delete=models.PROTECT, related_name="reservas")
+    grupo = models.ForeignKey(GrupoReserva, on_delete=models.PROTECT, null=True, blank=True, related_name="reservas")
     fecha_inicio = models.DateField()
     fecha_fin = models.DateField()
     estado = models.CharField(max_length=20, choices=ESTADO_RESERVA, default="pendiente")
     precio_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
     monto_porcentaje = models.PositiveSmallIntegerField(default=30)
+    # Contadores mantenidos por Pago.save() con expresiones F(); no se escriben desde la instancia
+    monto_pagado = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    saldo = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["habitacion", "fecha_inicio", "fecha_fin", "estado"], name="reserva_hab_fechas_idx"),
+            # Cubre la consulta del calendario sin leer la tabla
+            models.Index(fields=["estado", "fecha_inicio", "fecha_fin", "habitacion"], name="reserva_estado_fechas_idx"),
+            # Barrido de pendientes vencidas (barrer_reservas)
+            models.Index(fields=["estado", "created_at"], name="reserva_estado_creada_idx"),
+        ]
+
+    def fechas_noches(self):
+        return [self.fecha_inicio + timedelta(days=i) for i in range((self.fecha_fin - self.fecha_inicio).days)]
+
+    def noches_ocupadas(self):
+        # Filas de inventario (sin guardar) que corresponden al estado actual
+        if self.estado not in self.ESTADOS_ACTIVOS:
+            return []
+        return [
+            NocheOcupada(reserva_id=self.pk, habitacion_id=self.habitacion_id, fecha=fecha)
+            for fecha in self.fechas_noches()
+        ]
+
+    def sincronizar_noches(self):
+        NocheOcupada.objects.filter(reserva=self).delete()
+        NocheOcupada.objects.bulk_create(self.noches_ocupadas())
+
+    CONTADORES = ("monto_pagado", "saldo")
+    # Campos de los que dependen las noches del inventario
+    INVENTARIO = ("habitacion", "fecha_inicio", "fecha_fin", "estado")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        attnames = [cls._meta.get_field(campo).attname for campo in cls.INVENTARIO]
+        if all(attname in field_names for attname in attnames):
+            instancia._inventario_cargado = instancia._inventario()
+        return instancia
+
+    def _inventario(self):
+        return (self.habitacion_id, self.fecha_inicio, self.fecha_fin, self.estado)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                self.saldo = self.precio_total - self.monto_pagado
+                super().save(*args, **kwargs)
+                NocheOcupada.objects.bulk_create(self.noches_ocupadas())
+            else:
+                # Una instancia cargada antes de un pago tiene los contadores viejos:
+                # no se sobrescriben y el saldo se recalcula en la base. Lo mismo con
+                # los campos del inventario si no cambiaron desde que se cargo: las
+                # noches quedan como estan y no se pisa un cambio hecho entre medio
+                cambia_inventario = getattr(self, "_inventario_cargado", None) != self._inventario()
+                omitidos = self.CONTADORES + (() if cambia_inventario else self.INVENTARIO)
+                campos = kwargs.pop("update_fields", None) or [
+                    campo.name for campo in self._meta.concrete_fields if not campo.primary_key
+                ]
+                super().save(*args, update_fields=[c for c in campos if c not in omitidos], **kwargs)
+                Reserva.objects.filter(pk=self.pk).update(saldo=F("precio_total") - F("monto_pagado"))
+                if cambia_inventario:
+                    self.sincronizar_noches()
+            self._inventario_cargado = self._inventario()
+
     def deposito_requerido(self):
         return (self.precio_total * Decimal(self.monto_porcentaje)) / Decimal(100)
 
     def __str__(self):
         return f"{self.codigo} ({self.cliente.rut})"
 
+class NocheOcupada(models.Model):
+    # Inventario por habitacion y noche, mantenido desde Reserva.save()
+    habitacion = models.ForeignKey(Habitacion, on_delete=models.CASCADE, related_name="noches_ocupadas")
+    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, related_name="noches")
+    fecha = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["fecha", "habitacion"], name="noche_fecha_habitacion_idx"),
+        ]
+        constraints = [
+            # La base de datos garantiza que una noche no se venda dos veces
+            models.UniqueConstraint(fields=["habitacion", "fecha"], name="noche_unica_habitacion_fecha"),
+        ]
+
+    def __str__(self):
+        return f"{self.habitacion_id} {self.fecha} ({self.reserva_id})"
+
 class Pago(models.Model):
     id_pago = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, related_name="pagos")
+    # Un pago corresponde a una reserva o, para los grupos, al deposito consolidado del grupo
+    reserva = models.ForeignKey(Reserva, on_delete=models.CASCADE, null=True, blank=True, related_name="pagos")
+    grupo = models.ForeignKey(GrupoReserva, on_delete=models.CASCADE, null=True, blank=True, related_name="pagos")
     monto = models.DecimalField(max_digits=12, decimal_places=2)
     fecha = models.DateTimeField(auto_now_add=True)
     metodo = models.CharField(max_length=20, blank=True)
     referencia = models.CharField(max_length=120, blank=True)
+    # Enviada por el formulario: un POST repetido encuentra el pago original
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["reserva", "fecha"], name="pago_reserva_fecha_idx"),
+            models.Index(fields=["fecha"], name="pago_fecha_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(reserva__isnull=False, grupo__isnull=True)
+                | models.Q(reserva__isnull=True, grupo__isnull=False),
+                name="pago_reserva_o_grupo",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            nuevo = self._state.adding
+            super().save(*args, **kwargs)
+            if nuevo and self.reserva_id:
+                Reserva.objects.filter(pk=self.reserva_id).update(
+                    monto_pagado=F("monto_pagado") + self.monto,
+                    saldo=F("saldo") - self.monto,
+                )
+
+    def __str__(self):
+        return f"Pago {self.id_pago} - {self.monto} for {(self.reserva or self.grupo).codigo}"
+
+class Temporada(models.Model):
+    # Calendario de tarifas: el precio de una noche es Habitacion.precio por el
+    # factor de la temporada vigente, con recargo las noches de viernes y sabado.
+    nombre = models.CharField(max_length=100)
+    tipo = models.CharField(max_length=100, blank=True, help_text="Tipo de habitación; vacío aplica a todos.")
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField(help_text="Primera noche fuera de la temporada.")
+    factor = models.DecimalField(max_digits=5, decimal_places=3, default=Decimal("1.000"))
+    recargo_fin_de_semana = models.DecimalField(
+        max_digits=5, decimal_places=3, default=Decimal("0.000"),
+        help_text="Fracción adicional para noches de viernes y sábado (0.2 = +20%).",
+    )
+    prioridad = models.PositiveSmallIntegerField(default=0, help_text="Si se solapan, gana la de mayor prioridad.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["fecha_inicio", "fecha_fin"], name="temporada_fechas_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.tipo or 'todos'}) {self.fecha_inicio} - {self.fecha_fin}"
+
+class ResumenDiario(models.Model):
+    # Agregado por dia y tipo de habitacion, mantenido por core/resumenes.py;
+    # los reportes leen solo esta tabla
+    fecha = models.DateField()
+    tipo = models.CharField(max_length=100)
+    noches_vendidas = models.IntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    cobrado = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "tipo"], name="resumen_fecha_tipo_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.tipo}: {self.noches_vendidas} noches"
+
+class CambioDisponibilidad(models.Model):
+    # Registro de solo agregado para el feed de cambios (core/cambios.py): el id
+    # es el cursor. Sin rango de fechas, el cambio es de la habitacion completa.
+    id = models.BigAutoField(primary_key=True)
+    id_habitacion = models.CharField(max_length=32)
+    fecha_inicio = models.DateField(null=True, blank=True)
+    fecha_fin = models.DateField(null=True, blank=True)
+    creado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["creado"], name="cambio_creado_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.pk}: {self.id_habitacion} {self.fecha_inicio or ''} - {self.fecha_fin or ''}"
+
+class Tarea(models.Model):
+    # Cola de trabajo en segundo plano (ver core/tareas.py)
+    ESTADO_TAREA = [
+        ("pendiente", "Pendiente"),
+        ("en_curso", "En curso"),
+        ("completada", "Completada"),
+        ("fallida", "Fallida"),
+    ]
+    nombre = models.CharField(max_length=100)
+    argumentos = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_TAREA, default="pendiente")
+    # Una misma clave solo se encola una vez (p. ej. "confirmacion:<codigo>")
+    clave = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    ejecutar_desde = models.DateTimeField(default=timezone.now)
+    trabajador = models.CharField(max_length=64, blank=True)
+    tomada_en = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado", "ejecutar_desde"], name="tarea_estado_desde_idx"),
+        ]
 
     def __str__(self):
-        return f"Pago {self.id_pago} - {self.monto} for {self.reserva.codigo}"
+        return f"{self.nombre} [{self.estado}] {self.clave or self.pk}"
 
 class Administrador(models.Model):
     id_admin = models.CharField(max_length=64, unique=True, default=generate_admin_id)
     nombre = models.CharField(max_length=150)
     email = models.EmailField(unique=True)
-    session_token = models.CharField(max_length=64, blank=True, null=True)
+    session_token = models.CharField(max_length=64, blank=True, null=True, unique=True)
 
     def __str__(self):
         return f"{self.id_admin} - {self.nombre}"
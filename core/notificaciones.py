@@ -0,0 +1,36 @@
+from django.core.mail import send_mail
+
+from .models import Pago, Reserva
+from .tareas import tarea
+
+# Tareas en segundo plano disparadas por eventos de Reserva y Pago (ver signals.py)
+
+
+@tarea()
+def enviar_comprobante_pago(pago_id):
+    pago = Pago.objects.select_related("reserva__cliente", "grupo__cliente").get(pk=pago_id)
+    origen = pago.reserva or pago.grupo
+    if not origen.cliente.email:
+        return
+    send_mail(
+        f"Hotel Pacific Reef - Reserva {origen.codigo} confirmada",
+        f"Hola {origen.cliente.nombre},\n\n"
+        f"Recibimos tu pago de ${pago.monto} ({pago.metodo or 'sin método'}).\n"
+        f"Tu reserva {origen.codigo} del {origen.fecha_inicio} al {origen.fecha_fin} está confirmada.\n",
+        None,
+        [origen.cliente.email],
+    )
+
+
+@tarea()
+def enviar_aviso_cancelacion(codigo):
+    reserva = Reserva.objects.select_related("cliente").get(codigo=codigo)
+    if not reserva.cliente.email:
+        return
+    send_mail(
+        f"Hotel Pacific Reef - Reserva {reserva.codigo} cancelada",
+        f"Hola {reserva.cliente.nombre},\n\n"
+        f"Tu reserva {reserva.codigo} del {reserva.fecha_inicio} al {reserva.fecha_fin} fue cancelada.\n",
+        None,
+        [reserva.cliente.email],
+    )
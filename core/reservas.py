@@ -0,0 +1,182 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+from . import cambios, resumenes
+from .disponibilidad import invalidar_rango
+from .models import Cliente, GrupoReserva, Habitacion, NocheOcupada, Pago, Reserva
+from .tarifas import cotizar
+
+# Tope de habitaciones por reserva grupal
+MAXIMO_HABITACIONES_GRUPO = 40
+
+
+class ReservaConflicto(Exception):
+    """La reserva no se pudo confirmar por concurrencia; se puede reintentar."""
+
+
+class HabitacionNoDisponible(ReservaConflicto):
+    """Alguna de las noches pedidas ya fue tomada por otra reserva."""
+
+
+def crear_reserva(habitacion, fecha_inicio, fecha_fin, rut, nombre="", email="", telefono=""):
+    try:
+        return _crear_reserva(habitacion, fecha_inicio, fecha_fin, rut, nombre, email, telefono)
+    except OperationalError as e:
+        # SQLite responde "database is locked" en vez de esperar cuando hay otra escritura en curso
+        if "locked" in str(e):
+            raise ReservaConflicto("El sistema está ocupado, intenta nuevamente.") from e
+        raise
+
+
+def _crear_reserva(habitacion, fecha_inicio, fecha_fin, rut, nombre, email, telefono):
+    # Cliente, reserva y noches se escriben en una sola transaccion. El constraint
+    # unico (habitacion, fecha) de NocheOcupada rechaza la segunda reserva solapada
+    # sin necesidad de bloqueos en la aplicacion.
+    try:
+        with transaction.atomic():
+            cliente, _ = Cliente.objects.get_or_create(
+                rut=rut,
+                defaults={'nombre': nombre, 'email': email, 'telefono': telefono},
+            )
+            return Reserva.objects.create(
+                cliente=cliente,
+                habitacion=habitacion,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                precio_total=cotizar([habitacion], fecha_inicio, fecha_fin)[habitacion.pk],
+            )
+    except IntegrityError:
+        ocupada = NocheOcupada.objects.filter(
+            habitacion=habitacion, fecha__gte=fecha_inicio, fecha__lt=fecha_fin
+        ).exists()
+        if ocupada:
+            raise HabitacionNoDisponible("La habitación ya no está disponible para esas fechas.")
+        raise
+
+
+def crear_reserva_grupo(solicitud, fecha_inicio, fecha_fin, rut, nombre="", email="", telefono="",
+                        metodo="", referencia="", clave_idempotencia=None):
+    """Reserva varias habitaciones para las mismas fechas, con solicitud = {tipo: cantidad}.
+
+    Todo o nada: las habitaciones salen de una sola consulta de disponibilidad y
+    las reservas, sus noches y el deposito consolidado del grupo se escriben en
+    una transaccion. Si otra reserva toma alguna noche entre medio, el constraint
+    de NocheOcupada hace fallar el bloque completo. Con la misma clave de
+    idempotencia se devuelve el grupo ya creado en vez de crear otro.
+    """
+    if clave_idempotencia:
+        grupo = GrupoReserva.objects.filter(clave_idempotencia=clave_idempotencia).first()
+        if grupo is not None:
+            return grupo
+    try:
+        return _crear_reserva_grupo(solicitud, fecha_inicio, fecha_fin, rut, nombre, email, telefono,
+                                    metodo, referencia, clave_idempotencia)
+    except OperationalError as e:
+        if "locked" in str(e):
+            raise ReservaConflicto("El sistema está ocupado, intenta nuevamente.") from e
+        raise
+
+
+def _asignar(solicitud, fecha_inicio, fecha_fin):
+    libres = defaultdict(list)
+    for habitacion in (
+        Habitacion.objects.disponibles(fecha_inicio, fecha_fin)
+        .filter(tipo__in=solicitud)
+        .order_by("precio", "id_habitacion")
+    ):
+        libres[habitacion.tipo].append(habitacion)
+
+    faltantes = {tipo: cantidad - len(libres[tipo]) for tipo, cantidad in solicitud.items() if len(libres[tipo]) < cantidad}
+    if faltantes:
+        detalle = ", ".join(f"{cantidad} {tipo}" for tipo, cantidad in sorted(faltantes.items()))
+        raise HabitacionNoDisponible(f"No hay suficientes habitaciones disponibles para esas fechas (faltan: {detalle}).")
+    return [habitacion for tipo, cantidad in solicitud.items() for habitacion in libres[tipo][:cantidad]]
+
+
+def _crear_reserva_grupo(solicitud, fecha_inicio, fecha_fin, rut, nombre, email, telefono, metodo, referencia,
+                         clave_idempotencia):
+    try:
+        with transaction.atomic():
+            habitaciones = _asignar(solicitud, fecha_inicio, fecha_fin)
+            precios = cotizar(habitaciones, fecha_inicio, fecha_fin)
+            cliente, _ = Cliente.objects.get_or_create(
+                rut=rut,
+                defaults={'nombre': nombre, 'email': email, 'telefono': telefono},
+            )
+            grupo = GrupoReserva.objects.create(
+                cliente=cliente, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, clave_idempotencia=clave_idempotencia
+            )
+
+            # El deposito del grupo confirma todas las reservas; a cada una se le
+            # abona su parte para que monto_pagado y saldo cuadren con el Pago
+            reservas = []
+            for habitacion in habitaciones:
+                reserva = Reserva(
+                    cliente=cliente,
+                    habitacion=habitacion,
+                    grupo=grupo,
+                    fecha_inicio=fecha_inicio,
+                    fecha_fin=fecha_fin,
+                    estado="confirmada",
+                    precio_total=precios[habitacion.pk],
+                )
+                reserva.monto_pagado = reserva.deposito_requerido()
+                reserva.saldo = reserva.precio_total - reserva.monto_pagado
+                reservas.append(reserva)
+            Reserva.objects.bulk_create(reservas)
+            # bulk_create no pasa por Reserva.save() ni emite señales
+            NocheOcupada.objects.bulk_create([noche for reserva in reservas for noche in reserva.noches_ocupadas()])
+            resumenes.sumar_reservas(reservas)
+            cambios.registrar_reservas(reservas)
+            Pago.objects.create(
+                grupo=grupo,
+                monto=sum((reserva.monto_pagado for reserva in reservas), Decimal("0.00")),
+                metodo=metodo,
+                referencia=referencia,
+            )
+            transaction.on_commit(lambda: invalidar_rango(fecha_inicio, fecha_fin))
+    except IntegrityError:
+        # Un envio simultaneo con la misma clave pudo ganar la carrera: es el mismo grupo
+        if clave_idempotencia:
+            grupo = GrupoReserva.objects.filter(clave_idempotencia=clave_idempotencia).first()
+            if grupo is not None:
+                return grupo
+        raise HabitacionNoDisponible("Otra reserva tomó alguna de las habitaciones; intenta nuevamente.")
+    return grupo
+
+
+def registrar_pago(reserva, metodo, referencia, clave_idempotencia):
+    """Paga el deposito de una reserva pendiente y la confirma.
+
+    Idempotente por clave: si la reserva ya no esta pendiente porque este mismo
+    envio (u otro con la misma clave) la pago, se devuelve ese Pago. Devuelve
+    None si la reserva ya no admite pago.
+    """
+    try:
+        with transaction.atomic():
+            # El UPDATE condicional decide entre dos envios simultaneos: solo uno
+            # encuentra la reserva pendiente
+            if Reserva.objects.filter(pk=reserva.pk, estado="pendiente").update(
+                estado="confirmada", updated_at=timezone.now()
+            ):
+                # El UPDATE no emite señales: resumen y registro de cambios se actualizan aqui
+                reserva.estado = "confirmada"
+                resumenes.sumar_reservas([reserva])
+                cambios.registrar_reservas([reserva])
+                return Pago.objects.create(
+                    reserva=reserva,
+                    monto=reserva.deposito_requerido(),
+                    metodo=metodo,
+                    referencia=referencia,
+                    clave_idempotencia=clave_idempotencia,
+                )
+    except IntegrityError:
+        # El bloque se deshizo: la reserva en memoria no debe quedar como pagada
+        reserva.refresh_from_db(fields=["estado", "monto_pagado", "saldo"])
+    except OperationalError as e:
+        if "locked" in str(e):
+            raise ReservaConflicto("El sistema está ocupado, intenta nuevamente.") from e
+        raise
+    return Pago.objects.filter(reserva=reserva, clave_idempotencia=clave_idempotencia).first()
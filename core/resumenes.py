@@ -0,0 +1,210 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import Habitacion, Pago, Reserva, ResumenDiario
+
+# Resumen diario por tipo de habitacion (ResumenDiario). Se actualiza en la
+# misma transaccion que el cambio que lo afecta, sumando diferencias con F():
+# - una reserva aporta sus noches mientras esta confirmada o completada, con el
+#   precio repartido en partes iguales entre ellas (la pendiente aun no es venta);
+# - un pago se suma al dia en que se recibe.
+# reconstruir() recalcula un rango desde Reserva y Pago (backfills, cargas masivas).
+ESTADOS_VENDIDOS = ("confirmada", "completada")
+CENTAVO = Decimal("0.01")
+LOTE = 2000
+MAXIMO_DIAS_REPORTE = 366
+
+
+def _deltas():
+    # (fecha, tipo) -> [noches, ingresos, cobrado]
+    return defaultdict(lambda: [0, Decimal("0.00"), Decimal("0.00")])
+
+
+def _sumar_estadia(deltas, tipo, fecha_inicio, fecha_fin, precio, signo=1, desde=None, hasta=None):
+    noches = (fecha_fin - fecha_inicio).days
+    if noches <= 0:
+        return
+    # Los centavos que no se reparten en partes iguales van a la primera noche
+    por_noche = (precio / noches).quantize(CENTAVO, rounding=ROUND_DOWN)
+    resto = precio - por_noche * noches
+    for i in range(noches):
+        fecha = fecha_inicio + timedelta(days=i)
+        if (desde and fecha < desde) or (hasta and fecha >= hasta):
+            continue
+        delta = deltas[(fecha, tipo)]
+        delta[0] += signo
+        delta[1] += signo * (por_noche + resto if i == 0 else por_noche)
+
+
+def venta(reserva):
+    """Lo que una reserva aporta al resumen, o None si no es una venta."""
+    if reserva.estado not in ESTADOS_VENDIDOS:
+        return None
+    return (reserva.habitacion.tipo, reserva.fecha_inicio, reserva.fecha_fin, reserva.precio_total)
+
+
+def aplicar(deltas):
+    cambios = {clave: delta for clave, delta in deltas.items() if any(delta)}
+    if not cambios:
+        return
+    with transaction.atomic():
+        ResumenDiario.objects.bulk_create(
+            [ResumenDiario(fecha=fecha, tipo=tipo) for fecha, tipo in cambios], ignore_conflicts=True
+        )
+        for (fecha, tipo), (noches, ingresos, cobrado) in sorted(cambios.items()):
+            ResumenDiario.objects.filter(fecha=fecha, tipo=tipo).update(
+                noches_vendidas=F("noches_vendidas") + noches,
+                ingresos=F("ingresos") + ingresos,
+                cobrado=F("cobrado") + cobrado,
+            )
+
+
+def actualizar_venta(anterior, nueva):
+    """Reemplaza la venta `anterior` por `nueva` (tuplas de venta() o None)."""
+    deltas = _deltas()
+    if anterior:
+        _sumar_estadia(deltas, *anterior, signo=-1)
+    if nueva:
+        _sumar_estadia(deltas, *nueva)
+    aplicar(deltas)
+
+
+def sumar_reservas(reservas):
+    # Para altas en lote (bulk_create), que no disparan las señales
+    deltas = _deltas()
+    for reserva in reservas:
+        aporte = venta(reserva)
+        if aporte:
+            _sumar_estadia(deltas, *aporte)
+    aplicar(deltas)
+
+
+def _cobros_grupos(grupo_ids):
+    # El deposito de un grupo se reparte por tipo segun lo abonado a cada reserva
+    cobros = defaultdict(list)
+    filas = (
+        Reserva.objects.filter(grupo_id__in=grupo_ids)
+        .values("grupo_id", "habitacion__tipo")
+        .annotate(monto=Sum("monto_pagado"))
+        .values_list("grupo_id", "habitacion__tipo", "monto")
+    )
+    for grupo_id, tipo, monto in filas:
+        cobros[grupo_id].append((tipo, monto))
+    return cobros
+
+
+def sumar_pago(pago):
+    deltas = _deltas()
+    fecha = timezone.localdate(pago.fecha)
+    if pago.reserva_id:
+        cobros = [(pago.reserva.habitacion.tipo, pago.monto)]
+    else:
+        cobros = _cobros_grupos([pago.grupo_id])[pago.grupo_id]
+    for tipo, monto in cobros:
+        deltas[(fecha, tipo)][2] += monto
+    aplicar(deltas)
+
+
+def _inicio_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def reconstruir(desde=None, hasta=None):
+    """Recalcula los resumenes de [desde, hasta) (todos si no se indica) a
+    partir de Reserva y Pago. Devuelve la cantidad de filas escritas."""
+    deltas = _deltas()
+    reservas = Reserva.objects.filter(estado__in=ESTADOS_VENDIDOS)
+    pagos = Pago.objects.all()
+    resumenes = ResumenDiario.objects.all()
+    if desde:
+        reservas = reservas.filter(fecha_fin__gt=desde)
+        pagos = pagos.filter(fecha__gte=_inicio_dia(desde))
+        resumenes = resumenes.filter(fecha__gte=desde)
+    if hasta:
+        reservas = reservas.filter(fecha_inicio__lt=hasta)
+        pagos = pagos.filter(fecha__lt=_inicio_dia(hasta))
+        resumenes = resumenes.filter(fecha__lt=hasta)
+
+    with transaction.atomic():
+        filas = reservas.values_list("habitacion__tipo", "fecha_inicio", "fecha_fin", "precio_total")
+        for tipo, fecha_inicio, fecha_fin, precio in filas.iterator(chunk_size=LOTE):
+            _sumar_estadia(deltas, tipo, fecha_inicio, fecha_fin, precio, desde=desde, hasta=hasta)
+
+        filas = pagos.filter(reserva__isnull=False).values_list("fecha", "reserva__habitacion__tipo", "monto")
+        for fecha, tipo, monto in filas.iterator(chunk_size=LOTE):
+            deltas[(timezone.localdate(fecha), tipo)][2] += monto
+
+        de_grupos = list(pagos.filter(grupo__isnull=False).values_list("fecha", "grupo_id"))
+        for inicio in range(0, len(de_grupos), 500):
+            trozo = de_grupos[inicio:inicio + 500]
+            cobros = _cobros_grupos([grupo_id for _, grupo_id in trozo])
+            for fecha, grupo_id in trozo:
+                for tipo, monto in cobros[grupo_id]:
+                    deltas[(timezone.localdate(fecha), tipo)][2] += monto
+
+        resumenes.delete()
+        ResumenDiario.objects.bulk_create([
+            ResumenDiario(fecha=fecha, tipo=tipo, noches_vendidas=noches, ingresos=ingresos, cobrado=cobrado)
+            for (fecha, tipo), (noches, ingresos, cobrado) in sorted(deltas.items())
+            if any((noches, ingresos, cobrado))
+        ], batch_size=LOTE)
+    return sum(1 for delta in deltas.values() if any(delta))
+
+
+def reconstruir_habitacion(habitacion):
+    """Recalcula el rango que abarcan las ventas y cobros de `habitacion`, para
+    que pasen a su tipo actual cuando este cambia."""
+    estadias = Reserva.objects.filter(habitacion=habitacion, estado__in=ESTADOS_VENDIDOS).aggregate(
+        desde=Min("fecha_inicio"), hasta=Max("fecha_fin")
+    )
+    cobros = Pago.objects.filter(
+        Q(reserva__habitacion=habitacion) | Q(grupo__reservas__habitacion=habitacion)
+    ).aggregate(desde=Min("fecha"), hasta=Max("fecha"))
+    rangos = []
+    if estadias["desde"]:
+        rangos.append((estadias["desde"], estadias["hasta"]))
+    if cobros["desde"]:
+        rangos.append((timezone.localdate(cobros["desde"]), timezone.localdate(cobros["hasta"]) + timedelta(days=1)))
+    if not rangos:
+        return 0
+    return reconstruir(min(desde for desde, _ in rangos), max(hasta for _, hasta in rangos))
+
+
+def _indicadores(fila, capacidad):
+    noches = fila["noches"] or 0
+    fila["ocupacion"] = round(100 * noches / capacidad, 1) if capacidad else None
+    fila["adr"] = (fila["ingresos"] / noches).quantize(CENTAVO) if noches else None
+    return fila
+
+
+def reporte(desde, hasta, tipo=None):
+    """Ocupacion, ADR e ingresos de [desde, hasta] por dia y por tipo, leyendo
+    solo ResumenDiario. La capacidad se toma del inventario actual de habitaciones."""
+    resumenes = ResumenDiario.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+    habitaciones = Habitacion.objects.all()
+    if tipo:
+        resumenes = resumenes.filter(tipo=tipo)
+        habitaciones = habitaciones.filter(tipo=tipo)
+    inventario = dict(habitaciones.values("tipo").annotate(n=Count("pk")).values_list("tipo", "n"))
+    totales = {"noches": Sum("noches_vendidas"), "ingresos": Sum("ingresos"), "cobrado": Sum("cobrado")}
+    cero = {"noches": 0, "ingresos": Decimal("0.00"), "cobrado": Decimal("0.00")}
+
+    por_fecha = {fila["fecha"]: fila for fila in resumenes.values("fecha").annotate(**totales)}
+    dias = []
+    for i in range((hasta - desde).days + 1):
+        fecha = desde + timedelta(days=i)
+        dias.append(_indicadores(por_fecha.get(fecha) or {"fecha": fecha, **cero}, sum(inventario.values())))
+
+    n_dias = len(dias)
+    por_tipo = [
+        _indicadores(fila, inventario.get(fila["tipo"], 0) * n_dias)
+        for fila in resumenes.values("tipo").annotate(**totales).order_by("tipo")
+    ]
+    total = {clave: cero[clave] if valor is None else valor for clave, valor in resumenes.aggregate(**totales).items()}
+    total = _indicadores(total, sum(inventario.values()) * n_dias)
+    return {"dias": dias, "por_tipo": por_tipo, "total": total}
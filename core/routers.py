@@ -0,0 +1,62 @@
+import contextvars
+
+from django.db import connections
+
+# Enrutamiento lectura/escritura: las lecturas van a la replica (alias
+# "replica", si esta configurada) y las escrituras a la primaria. Una peticion
+# que escribio, o que llega dentro de la ventana de fijacion de una escritura
+# anterior (cookie, ver FijacionPrimariaMiddleware), lee solo de la primaria
+# para que el cliente vea sus propios cambios aunque la replica vaya atrasada.
+PRIMARIA = "default"
+REPLICA = "replica"
+
+
+class EstadoPeticion:
+    __slots__ = ("fijada", "escribio")
+
+    def __init__(self, fijada):
+        self.fijada = fijada
+        self.escribio = False
+
+
+# Objeto mutable: los hilos de sync_to_async ven la misma instancia que el middleware
+_estado = contextvars.ContextVar("estado_replica", default=None)
+
+
+def replica_configurada():
+    return REPLICA in connections.settings
+
+
+def iniciar_peticion(fijada):
+    return _estado.set(EstadoPeticion(fijada))
+
+
+def terminar_peticion(token):
+    estado = _estado.get()
+    _estado.reset(token)
+    return estado.escribio
+
+
+class RouterLecturaEscritura:
+    def db_for_read(self, model, **hints):
+        if not replica_configurada():
+            return PRIMARIA
+        estado = _estado.get()
+        if estado is not None and (estado.fijada or estado.escribio):
+            return PRIMARIA
+        # Dentro de una transaccion se lee lo que la transaccion ve
+        if connections[PRIMARIA].in_atomic_block:
+            return PRIMARIA
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escribio = True
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARIA
@@ -0,0 +1,95 @@
+import re
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+
+# RUT canonico: cuerpo de 7 u 8 digitos seguido del digito verificador
+# (modulo 11), sin puntos ni guion. En la base se guarda solo el cuerpo como
+# entero: el digito verificador se deriva de el, asi que dos formas de escribir
+# el mismo RUT ("12.345.678-5", "123456785") son la misma clave del indice.
+FORMATO = re.compile(r"^(\d{7,8})([0-9K])$")
+
+
+def digito_verificador(numero):
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: "0", 10: "K"}.get(resto, str(resto))
+
+
+def normalizar_rut(rut):
+    return str(rut).replace(".", "").replace("-", "").replace(" ", "").strip().upper()
+
+
+def cuerpo_rut(rut):
+    """Cuerpo numerico de `rut`; ValidationError si el formato o el digito
+    verificador no son validos."""
+    match = FORMATO.match(normalizar_rut(rut))
+    if not match:
+        raise ValidationError("RUT invalido. Debe ser 7 u 8 numeros y un digito verificador.", code="formato")
+    cuerpo, digito = match.groups()
+    if digito_verificador(cuerpo) != digito:
+        raise ValidationError("RUT invalido: el digito verificador no corresponde.", code="digito")
+    return int(cuerpo)
+
+
+def formatear_rut(cuerpo):
+    return f"{cuerpo}{digito_verificador(cuerpo)}"
+
+
+def rut_canonico(rut):
+    return formatear_rut(cuerpo_rut(rut))
+
+
+class RutField(models.Field):
+    """Columna entera con el cuerpo del RUT; en Python el valor es el RUT
+    canonico (str). Las busquedas por RUT comparan enteros."""
+
+    description = "RUT chileno"
+
+    def get_internal_type(self):
+        return "PositiveIntegerField"
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else formatear_rut(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str) and not value.strip():
+            return None
+        if isinstance(value, int):
+            return formatear_rut(value)
+        return rut_canonico(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return cuerpo_rut(value)
+        except ValidationError:
+            raise ValueError(f"El campo '{self.name}' espera un RUT valido y recibio {value!r}.")
+
+    def pre_save(self, model_instance, add):
+        # Tambien corre en bulk_create: el objeto queda con la forma canonica
+        valor = self.to_python(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, valor)
+        return valor
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{"form_class": RutFormField, **kwargs})
+
+
+class RutFormField(forms.CharField):
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_length", 12)
+        kwargs.setdefault("label", "RUT")
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if value in self.empty_values:
+            return value
+        return rut_canonico(value)
@@ -0,0 +1,80 @@
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Administrador
+
+# Sesion de administrador sin django_session: una cookie firmada con el
+# session_token del administrador y una cache token -> datos del admin. El
+# token en la base de datos es la fuente de verdad; borrarlo revoca la sesion.
+COOKIE = "admin_sesion"
+SAL = "core.sesion_admin"
+ALIAS = "sesiones_admin"
+CAMPOS = ("id", "id_admin", "nombre", "email", "session_token")
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def _clave(token):
+    return f"sesion_admin:{token}"
+
+
+def _guardar_en_cache(admin):
+    _cache().set(_clave(admin.session_token), {campo: getattr(admin, campo) for campo in CAMPOS})
+
+
+def iniciar_sesion(response, admin):
+    if not admin.session_token:
+        admin.session_token = secrets.token_hex(32)
+        admin.save(update_fields=["session_token"])
+    _guardar_en_cache(admin)
+    response.set_signed_cookie(
+        COOKIE, admin.session_token, salt=SAL,
+        max_age=settings.ADMIN_SESION_DURACION,
+        httponly=True, samesite="Lax", secure=settings.SESSION_COOKIE_SECURE,
+    )
+    return response
+
+
+def administrador_actual(request):
+    # Se resuelve una sola vez por peticion
+    if not hasattr(request, "_administrador"):
+        request._administrador = _resolver(request)
+    return request._administrador
+
+
+def _resolver(request):
+    token = request.get_signed_cookie(COOKIE, default=None, salt=SAL, max_age=settings.ADMIN_SESION_DURACION)
+    if not token:
+        return None
+    datos = _cache().get(_clave(token))
+    if datos is None:
+        admin = Administrador.objects.filter(session_token=token).first()
+        if admin is None:
+            return None
+        _guardar_en_cache(admin)
+        return admin
+    return Administrador(**datos)
+
+
+def cerrar_sesion(request, response):
+    admin = administrador_actual(request)
+    if admin is not None:
+        revocar(admin)
+    response.delete_cookie(COOKIE, samesite="Lax")
+    return response
+
+
+def descartar(token):
+    if token:
+        _cache().delete(_clave(token))
+
+
+def revocar(admin):
+    # Invalida todas las sesiones abiertas del administrador
+    descartar(admin.session_token)
+    Administrador.objects.filter(pk=admin.pk).update(session_token=None)
+    admin.session_token = None
@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cambios, resumenes, sesion_admin
+from .cache_paginas import invalidar_paginas
+from .disponibilidad import invalidar_rango, invalidar_todo
+from .models import Administrador, Habitacion, Pago, Reserva
+from .tareas import encolar
+
+
+@receiver(pre_save, sender=Reserva)
+def recordar_rango_anterior(sender, instance, **kwargs):
+    # Si cambian las fechas hay que invalidar tambien el rango que se libera
+    instance._rango_anterior = None
+    instance._estado_anterior = None
+    instance._venta_anterior = None
+    instance._inventario_anterior = None
+    if not instance._state.adding:
+        anterior = Reserva.objects.filter(pk=instance.pk).values_list(
+            "fecha_inicio", "fecha_fin", "estado", "precio_total", "habitacion__tipo", "habitacion__id_habitacion"
+        ).first()
+        if anterior:
+            fecha_inicio, fecha_fin, estado, precio, tipo, id_habitacion = anterior
+            instance._rango_anterior = (fecha_inicio, fecha_fin)
+            instance._estado_anterior = estado
+            instance._inventario_anterior = (id_habitacion, fecha_inicio, fecha_fin, estado)
+            if estado in resumenes.ESTADOS_VENDIDOS:
+                instance._venta_anterior = (tipo, fecha_inicio, fecha_fin, precio)
+
+
+@receiver(post_save, sender=Reserva)
+@receiver(post_delete, sender=Reserva)
+def invalidar_disponibilidad_reserva(sender, instance, **kwargs):
+    rangos = {(instance.fecha_inicio, instance.fecha_fin)}
+    if getattr(instance, "_rango_anterior", None):
+        rangos.add(instance._rango_anterior)
+
+    def invalidar():
+        for fecha_inicio, fecha_fin in rangos:
+            invalidar_rango(fecha_inicio, fecha_fin)
+
+    transaction.on_commit(invalidar)
+
+
+# Los resumenes diarios se corrigen en la misma transaccion que la reserva o el pago
+@receiver(post_save, sender=Reserva)
+def actualizar_resumen_reserva(sender, instance, **kwargs):
+    resumenes.actualizar_venta(getattr(instance, "_venta_anterior", None), resumenes.venta(instance))
+
+
+@receiver(post_delete, sender=Reserva)
+def descontar_resumen_reserva(sender, instance, **kwargs):
+    resumenes.actualizar_venta(resumenes.venta(instance), None)
+
+
+@receiver(post_save, sender=Pago)
+def sumar_pago_resumen(sender, instance, created, **kwargs):
+    if created:
+        resumenes.sumar_pago(instance)
+
+
+# Registro de cambios para el feed del channel manager, en la misma transaccion
+@receiver(post_save, sender=Reserva)
+def registrar_cambio_reserva(sender, instance, **kwargs):
+    anterior = getattr(instance, "_inventario_anterior", None)
+    actual = (instance.habitacion.id_habitacion, instance.fecha_inicio, instance.fecha_fin, instance.estado)
+    if anterior == actual:
+        return
+    rangos = [inventario[:3] for inventario in (anterior, actual)
+              if inventario and inventario[3] in Reserva.ESTADOS_ACTIVOS]
+    if rangos:
+        cambios.registrar(rangos, creado=instance.updated_at)
+
+
+@receiver(post_delete, sender=Reserva)
+def registrar_baja_reserva(sender, instance, **kwargs):
+    if instance.estado in Reserva.ESTADOS_ACTIVOS:
+        cambios.registrar([(instance.habitacion.id_habitacion, instance.fecha_inicio, instance.fecha_fin)])
+
+
+@receiver(post_save, sender=Habitacion)
+@receiver(post_delete, sender=Habitacion)
+def registrar_cambio_habitacion(sender, instance, **kwargs):
+    cambios.registrar([(instance.id_habitacion, None, None)])
+
+
+@receiver(pre_save, sender=Habitacion)
+def recordar_tipo_anterior(sender, instance, **kwargs):
+    instance._tipo_anterior = None
+    if not instance._state.adding:
+        instance._tipo_anterior = Habitacion.objects.filter(pk=instance.pk).values_list("tipo", flat=True).first()
+
+
+@receiver(post_save, sender=Habitacion)
+def reasignar_resumen_habitacion(sender, instance, created, **kwargs):
+    # Los resumenes van por tipo: si la habitacion cambia de tipo, sus ventas y
+    # cobros se mueven al nuevo para que las ediciones siguientes cuadren
+    anterior = getattr(instance, "_tipo_anterior", None)
+    if not created and anterior is not None and anterior != instance.tipo:
+        resumenes.reconstruir_habitacion(instance)
+
+
+@receiver(post_save, sender=Habitacion)
+@receiver(post_delete, sender=Habitacion)
+def invalidar_disponibilidad_habitacion(sender, instance, **kwargs):
+    transaction.on_commit(invalidar_todo)
+    transaction.on_commit(invalidar_paginas)
+
+
+# Los efectos secundarios (correos, avisos) se encolan en la misma transaccion
+# que el cambio y los ejecuta el worker de procesar_tareas.
+@receiver(post_save, sender=Reserva)
+def encolar_aviso_cancelacion(sender, instance, created, **kwargs):
+    if instance.estado == "cancelada" and getattr(instance, "_estado_anterior", None) not in (None, "cancelada"):
+        encolar("enviar_aviso_cancelacion", clave=f"cancelacion:{instance.codigo}", codigo=instance.codigo)
+
+
+@receiver(post_save, sender=Pago)
+def encolar_comprobante_pago(sender, instance, created, **kwargs):
+    if created:
+        encolar("enviar_comprobante_pago", clave=f"pago:{instance.pk}", pago_id=str(instance.pk))
+
+
+@receiver(post_delete, sender=Administrador)
+def revocar_sesiones_administrador(sender, instance, **kwargs):
+    # Sin la fila el token ya no valida, pero la cache lo aceptaria hasta su TTL
+    sesion_admin.descartar(instance.session_token)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Sin Pillow se publican solo las imagenes originales
+    Image = None
+
+EXTENSIONES = (".jpg", ".jpeg", ".png")
+INDICE = "imagenes.json"
+
+
+def ancho_maximo():
+    return max(settings.IMAGENES_ANCHOS)
+
+
+def formatos_disponibles():
+    if Image is None:
+        return []
+    return [formato for formato in settings.IMAGENES_FORMATOS if features.check(formato)]
+
+
+def nombre_variante(nombre, ancho, formato):
+    base, _ = os.path.splitext(nombre)
+    return f"{base}.{ancho}w.{formato}"
+
+
+def _codificar(contenido, ancho, formato):
+    with Image.open(BytesIO(contenido)) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.width > ancho:
+            imagen = imagen.resize((ancho, round(imagen.height * ancho / imagen.width)), Image.LANCZOS)
+        salida = BytesIO()
+        imagen.save(salida, format=formato.upper(), quality=settings.IMAGENES_CALIDAD)
+        return salida.getvalue()
+
+
+class ImagenesResponsivasStorage(CompressedManifestStaticFilesStorage):
+    """Storage de collectstatic que, antes de aplicar hashes y compresion,
+    genera variantes redimensionadas en WebP/AVIF de cada imagen.
+
+    Las variantes codificadas se guardan en IMAGENES_CACHE_DIR indexadas por el
+    hash del original, asi un collectstatic solo recodifica las imagenes que
+    cambiaron. La lista de variantes queda en imagenes.json para el template
+    tag imagen_responsiva.
+    """
+
+    def stored_name(self, name):
+        # Sin manifiesto (desarrollo y tests, sin collectstatic) se usa el nombre original
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            variantes = self.generar_variantes(paths)
+            self._guardar(INDICE, json.dumps(variantes, sort_keys=True).encode())
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def _guardar(self, nombre, contenido):
+        if self.exists(nombre):
+            self.delete(nombre)
+        self._save(nombre, ContentFile(contenido))
+
+    def generar_variantes(self, paths):
+        formatos = formatos_disponibles()
+        cache = Path(settings.IMAGENES_CACHE_DIR)
+        cache.mkdir(parents=True, exist_ok=True)
+
+        variantes = {}
+        for nombre, (storage, ruta) in list(paths.items()):
+            if not nombre.lower().endswith(EXTENSIONES) or not formatos:
+                continue
+            with storage.open(ruta) as archivo:
+                contenido = archivo.read()
+            huella = hashlib.sha256(contenido).hexdigest()[:16]
+            with Image.open(BytesIO(contenido)) as imagen:
+                ancho_original = imagen.width
+            anchos = sorted({min(ancho, ancho_original) for ancho in settings.IMAGENES_ANCHOS})
+
+            variantes[nombre] = {}
+            for formato in formatos:
+                for ancho in anchos:
+                    guardada = cache / f"{huella}-{ancho}-q{settings.IMAGENES_CALIDAD}.{formato}"
+                    if not guardada.exists():
+                        guardada.write_bytes(_codificar(contenido, ancho, formato))
+                    destino = nombre_variante(nombre, ancho, formato)
+                    self._guardar(destino, guardada.read_bytes())
+                    paths[destino] = (self, destino)
+                    variantes[nombre].setdefault(formato, []).append([ancho, destino])
+        return variantes
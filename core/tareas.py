@@ -0,0 +1,102 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+# Cola de tareas persistida en la tabla core_tarea: no necesita broker, solo la
+# base de datos. encolar() escribe en la transaccion en curso, asi la tarea
+# existe si y solo si el cambio que la origino se confirmo.
+REGISTRO = {}
+# El reintento n espera BACKOFF_BASE * 2**(n-1) segundos, con tope BACKOFF_MAXIMO
+BACKOFF_BASE = 10
+BACKOFF_MAXIMO = 3600
+# Una tarea en curso por mas tiempo se da por abandonada (worker caido) y se vuelve a tomar
+TIEMPO_MAXIMO = 600
+
+
+class TareaDesconocida(Exception):
+    pass
+
+
+def tarea(nombre=None, max_intentos=5):
+    def registrar(funcion):
+        funcion.nombre_tarea = nombre or funcion.__name__
+        funcion.max_intentos = max_intentos
+        REGISTRO[funcion.nombre_tarea] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(nombre, clave=None, retraso=0, **argumentos):
+    funcion = REGISTRO.get(nombre)
+    if funcion is None:
+        raise TareaDesconocida(nombre)
+    try:
+        # Savepoint: una clave repetida no debe romper la transaccion del llamador
+        with transaction.atomic():
+            return Tarea.objects.create(
+                nombre=nombre,
+                argumentos=argumentos,
+                clave=clave,
+                max_intentos=funcion.max_intentos,
+                ejecutar_desde=timezone.now() + timedelta(seconds=retraso),
+            )
+    except IntegrityError:
+        if clave is None:
+            raise
+        return Tarea.objects.get(clave=clave)
+
+
+def _disponibles(ahora):
+    return Q(estado="pendiente", ejecutar_desde__lte=ahora) | Q(
+        estado="en_curso", tomada_en__lt=ahora - timedelta(seconds=TIEMPO_MAXIMO)
+    )
+
+
+def tomar(trabajador, cantidad):
+    """Reserva hasta `cantidad` tareas para `trabajador` con un UPDATE condicional;
+    si otro worker tomo alguna entre medio, simplemente no se devuelve."""
+    ahora = timezone.now()
+    ids = list(
+        Tarea.objects.filter(_disponibles(ahora)).order_by("ejecutar_desde").values_list("pk", flat=True)[:cantidad]
+    )
+    if not ids:
+        return []
+    Tarea.objects.filter(_disponibles(ahora), pk__in=ids).update(
+        estado="en_curso", trabajador=trabajador, tomada_en=ahora, intentos=F("intentos") + 1, updated_at=ahora
+    )
+    return list(Tarea.objects.filter(pk__in=ids, estado="en_curso", trabajador=trabajador, tomada_en=ahora))
+
+
+def espera(intentos):
+    return timedelta(seconds=min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** (intentos - 1)))
+
+
+def ejecutar(tarea):
+    propia = Tarea.objects.filter(pk=tarea.pk, trabajador=tarea.trabajador, tomada_en=tarea.tomada_en)
+    try:
+        funcion = REGISTRO.get(tarea.nombre)
+        if funcion is None:
+            raise TareaDesconocida(tarea.nombre)
+        funcion(**tarea.argumentos)
+    except Exception:
+        ahora = timezone.now()
+        if tarea.intentos >= tarea.max_intentos:
+            propia.update(estado="fallida", ultimo_error=traceback.format_exc(), updated_at=ahora)
+            logger.error("Tarea %s (%s) fallida tras %s intentos", tarea.nombre, tarea.pk, tarea.intentos)
+        else:
+            propia.update(
+                estado="pendiente", ejecutar_desde=ahora + espera(tarea.intentos),
+                ultimo_error=traceback.format_exc(), updated_at=ahora,
+            )
+            logger.warning("Tarea %s (%s) falló, se reintentará", tarea.nombre, tarea.pk, exc_info=True)
+        return False
+    propia.update(estado="completada", ultimo_error="", updated_at=timezone.now())
+    return True
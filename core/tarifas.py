@@ -0,0 +1,50 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import Temporada
+
+CENTAVOS = Decimal("0.01")
+NOCHES_FIN_DE_SEMANA = (4, 5)  # viernes y sabado
+
+
+def _factores_por_noche(temporadas, tipo, noches):
+    # Para cada noche se queda la temporada de mayor prioridad que aplica al tipo
+    base = Decimal(str(getattr(settings, "TARIFA_RECARGO_FIN_DE_SEMANA", 0)))
+    factores = []
+    for noche in noches:
+        vigente = next(
+            (t for t in temporadas if t.fecha_inicio <= noche < t.fecha_fin and t.tipo in ("", tipo)),
+            None,
+        )
+        factor, recargo = (vigente.factor, vigente.recargo_fin_de_semana) if vigente else (Decimal(1), base)
+        if noche.weekday() in NOCHES_FIN_DE_SEMANA:
+            factor = factor * (1 + recargo)
+        factores.append(factor)
+    return factores
+
+
+def temporadas_vigentes(fecha_inicio, fecha_fin):
+    return Temporada.objects.filter(fecha_inicio__lt=fecha_fin, fecha_fin__gt=fecha_inicio)
+
+
+def cotizar(habitaciones, fecha_inicio, fecha_fin, temporadas=None):
+    """Precio total de la estadia para cada habitacion, como {pk: Decimal}.
+
+    Una consulta trae las temporadas de la ventana (o se reciben ya cargadas);
+    los factores por noche se calculan una vez por tipo de habitacion y cada
+    habitacion solo multiplica su precio base por la suma de su tipo.
+    """
+    if temporadas is None:
+        temporadas = temporadas_vigentes(fecha_inicio, fecha_fin)
+    noches = [fecha_inicio + timedelta(days=i) for i in range((fecha_fin - fecha_inicio).days)]
+    temporadas = sorted(temporadas, key=lambda t: (-t.prioridad, t.tipo == ""))
+
+    suma_por_tipo = {}
+    totales = {}
+    for habitacion in habitaciones:
+        if habitacion.tipo not in suma_por_tipo:
+            suma_por_tipo[habitacion.tipo] = sum(_factores_por_noche(temporadas, habitacion.tipo, noches), Decimal(0))
+        totales[habitacion.pk] = (habitacion.precio * suma_por_tipo[habitacion.tipo]).quantize(CENTAVOS)
+    return totales
@@ -0,0 +1,43 @@
+import json
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.storage import INDICE
+
+register = template.Library()
+
+TIPOS = {"avif": "image/avif", "webp": "image/webp"}
+
+
+@lru_cache(maxsize=1)
+def _variantes():
+    # imagenes.json lo escribe collectstatic; sin el se sirven los originales
+    try:
+        with staticfiles_storage.open(INDICE) as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+
+@register.simple_tag
+def imagen_responsiva(nombre, sizes="100vw", **atributos):
+    """<picture> con un <source> por formato (srcset con las variantes de
+    cada ancho) y el original como <img> de respaldo."""
+    imagen = format_html('<img src="{}"{}>', static(nombre), flatatt(atributos))
+    fuentes = _variantes().get(nombre)
+    if not fuentes:
+        return imagen
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (TIPOS.get(formato, f"image/{formato}"), ", ".join(f"{static(variante)} {ancho}w" for ancho, variante in anchos), sizes)
+            for formato, anchos in fuentes.items()
+        ),
+    )
+    return format_html("<picture>{}{}</picture>", sources, imagen)
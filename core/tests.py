@@ -1,3 +1,915 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from hotel import settings_asgi
+
+from . import barrido, busqueda, cache_paginas, cambios, disponibilidad, metricas, resumenes, routers, storage, tareas
+from .forms import ConsultaReservaForm, ReservaGrupoForm
+from .models import Administrador, Cliente, GrupoReserva, Habitacion, NocheOcupada, Pago, Reserva, ResumenDiario, Tarea, Temporada
+from .reservas import crear_reserva, crear_reserva_grupo, registrar_pago, HabitacionNoDisponible, ReservaConflicto
+from .tarifas import cotizar
+from .templatetags import imagenes
+
+# Los tests no deben leer ni escribir las caches compartidas con el servidor
+CACHES_LOCALES = override_settings(CACHES={
+    alias: {**config, "BACKEND": settings.CACHE_LOCAL, "LOCATION": f"tests-{alias}"}
+    for alias, config in settings.CACHES.items()
+})
+
+
+def setUpModule():
+    CACHES_LOCALES.enable()
+
+
+def tearDownModule():
+    CACHES_LOCALES.disable()
+
+
+class InventarioNochesTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+
+    def test_reserva_bloquea_y_cancelacion_libera(self):
+        cliente = Cliente.objects.create(rut="123456785", nombre="Cliente")
+        reserva = Reserva.objects.create(
+            cliente=cliente, habitacion=self.habitacion, fecha_inicio=date(2030, 1, 10), fecha_fin=date(2030, 1, 13)
+        )
+        self.assertEqual(reserva.noches.count(), 3)
+        self.assertFalse(Habitacion.objects.disponibles(date(2030, 1, 12), date(2030, 1, 14)).exists())
+        self.assertTrue(Habitacion.objects.disponibles(date(2030, 1, 13), date(2030, 1, 14)).exists())
+
+        # Mover las fechas reemplaza las noches
+        reserva.fecha_inicio, reserva.fecha_fin = date(2030, 1, 20), date(2030, 1, 22)
+        reserva.save()
+        self.assertEqual(sorted(reserva.noches.values_list("fecha", flat=True)), [date(2030, 1, 20), date(2030, 1, 21)])
+        self.assertTrue(Habitacion.objects.disponibles(date(2030, 1, 10), date(2030, 1, 13)).exists())
+
+        reserva.estado = "cancelada"
+        reserva.save()
+        self.assertEqual(reserva.noches.count(), 0)
+        self.assertTrue(Habitacion.objects.disponibles(date(2030, 1, 20), date(2030, 1, 22)).exists())
+
+    def test_solo_sincroniza_si_cambia_el_inventario(self):
+        cliente = Cliente.objects.create(rut="123456785", nombre="Cliente")
+        with CaptureQueriesContext(connection) as consultas:
+            Reserva.objects.create(
+                cliente=cliente, habitacion=self.habitacion, fecha_inicio=date(2030, 1, 10), fecha_fin=date(2030, 1, 13)
+            )
+        self.assertFalse([q for q in consultas if q["sql"].startswith("DELETE")])
+
+        reserva = Reserva.objects.get()
+        # Otro proceso mueve la reserva despues de que esta instancia se cargo
+        otra = Reserva.objects.get()
+        otra.fecha_inicio, otra.fecha_fin = date(2030, 2, 1), date(2030, 2, 3)
+        otra.save()
+        reserva.monto_porcentaje = 50
+        with CaptureQueriesContext(connection) as consultas:
+            reserva.save()
+        self.assertNotIn("core_nocheocupada", " ".join(q["sql"] for q in consultas))
+        reserva.refresh_from_db()
+        self.assertEqual((reserva.fecha_inicio, reserva.monto_porcentaje), (date(2030, 2, 1), 50))
+        self.assertEqual(reserva.noches.count(), 2)
+
+    def test_reserva_solapada_rechazada(self):
+        crear_reserva(self.habitacion, date(2030, 1, 10), date(2030, 1, 13), rut="123456785")
+        with self.assertRaises(HabitacionNoDisponible):
+            crear_reserva(self.habitacion, date(2030, 1, 12), date(2030, 1, 15), rut="987654325")
+        self.assertEqual(Reserva.objects.count(), 1)
+
+
+class CotizacionTests(TestCase):
+    def test_temporadas_y_fin_de_semana(self):
+        doble = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("100.00"))
+        suite = Habitacion.objects.create(tipo="Suite", capacidad=2, precio=Decimal("200.00"))
+        Temporada.objects.create(nombre="Verano", fecha_inicio=date(2030, 1, 1), fecha_fin=date(2030, 3, 1),
+                                 factor=Decimal("1.5"), recargo_fin_de_semana=Decimal("0.2"))
+        Temporada.objects.create(nombre="Suites", tipo="Suite", prioridad=1, fecha_inicio=date(2030, 1, 1),
+                                 fecha_fin=date(2030, 3, 1), factor=Decimal("1.0"))
+
+        # 2030-01-03 es jueves: noches de jueves, viernes y sabado
+        with self.assertNumQueries(1):
+            precios = cotizar([doble, suite], date(2030, 1, 3), date(2030, 1, 6))
+        self.assertEqual(precios[doble.pk], Decimal("150.00") + 2 * Decimal("180.00"))
+        self.assertEqual(precios[suite.pk], Decimal("600.00"))
+
+        reserva = crear_reserva(doble, date(2030, 1, 3), date(2030, 1, 6), rut="123456785")
+        self.assertEqual(reserva.precio_total, Decimal("510.00"))
+
+
+class CacheDisponibilidadTests(TestCase):
+    def setUp(self):
+        caches["disponibilidad"].clear()
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+
+    def test_invalida_solo_rangos_solapados(self):
+        buscar = disponibilidad.habitaciones_disponibles_ids
+        self.assertEqual(buscar(date(2030, 3, 1), date(2030, 3, 3)), [self.habitacion.pk])
+        buscar(date(2030, 3, 10), date(2030, 3, 12))
+        self.assertEqual(buscar(date(2030, 3, 1), date(2030, 3, 3)), [self.habitacion.pk])
+        self.assertEqual(disponibilidad.estadisticas()["aciertos"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_reserva(self.habitacion, date(2030, 3, 2), date(2030, 3, 4), rut="123456785")
+
+        self.assertEqual(buscar(date(2030, 3, 1), date(2030, 3, 3)), [])
+        self.assertEqual(buscar(date(2030, 3, 10), date(2030, 3, 12)), [self.habitacion.pk])
+        self.assertEqual(disponibilidad.estadisticas(), {"aciertos": 2, "fallos": 3, "tasa_aciertos": 0.4})
+
+
+class CalendarioTests(TestCase):
+    def setUp(self):
+        self.doble = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.suite = Habitacion.objects.create(tipo="Suite", capacidad=4, precio=Decimal("90000.00"), estado="mantenimiento")
+
+    def calendario(self, **extra):
+        return self.client.get(reverse("calendario_disponibilidad"), {"desde": "2030-04-01", "dias": 5}, **extra)
+
+    def test_codifica_ocupacion_y_responde_304(self):
+        crear_reserva(self.doble, date(2030, 3, 30), date(2030, 4, 3), rut="123456785")
+        respuesta = self.calendario()
+        datos = respuesta.json()
+        self.assertEqual(datos["habitaciones"], {self.doble.id_habitacion: "11000", self.suite.id_habitacion: "99999"})
+        self.assertEqual(self.calendario(HTTP_IF_NONE_MATCH=respuesta["ETag"]).status_code, 304)
+
+        # Un cambio en la ventana cambia el ETag
+        crear_reserva(self.doble, date(2030, 4, 4), date(2030, 4, 8), rut="123456785")
+        respuesta = self.calendario(HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["habitaciones"][self.doble.id_habitacion], "11011")
+
+    def test_parametros_invalidos(self):
+        url = reverse("calendario_disponibilidad")
+        self.assertEqual(self.client.get(url, {"dias": 0}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"dias": "x"}).status_code, 400)
+
+
+class ExportacionTests(TestCase):
+    def setUp(self):
+        admin = Administrador.objects.create(nombre="Admin", email="admin@example.com")
+        self.client.post(reverse("login_admin"), {"id_admin": admin.id_admin, "email": admin.email})
+        habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.pagada = crear_reserva(habitacion, date(2030, 5, 1), date(2030, 5, 3), rut="123456785")
+        registrar_pago(self.pagada, "tarjeta", "REF-1", "clave-1")
+        self.pendiente = crear_reserva(habitacion, date(2030, 6, 1), date(2030, 6, 2), rut="987654325")
+
+    def exportar(self, **parametros):
+        respuesta = self.client.get(reverse("exportar_reservas"), parametros)
+        self.assertTrue(respuesta.streaming)
+        return b"".join(respuesta.streaming_content).decode()
+
+    def test_csv_una_fila_por_pago_y_filtros(self):
+        lineas = self.exportar().splitlines()
+        self.assertTrue(lineas[0].startswith("codigo,estado,"))
+        self.assertEqual(len(lineas), 3)
+        self.assertIn("REF-1", lineas[1])
+        self.assertTrue(lineas[2].startswith(f"{self.pendiente.codigo},pendiente,"))
+
+        self.assertEqual(len(self.exportar(estado="pendiente").splitlines()), 2)
+        self.assertEqual(len(self.exportar(desde="2030-05-15", hasta="2030-07-01").splitlines()), 2)
+
+    def test_jsonl_anida_pagos(self):
+        filas = [json.loads(linea) for linea in self.exportar(formato="jsonl").splitlines()]
+        self.assertEqual([fila["codigo"] for fila in filas], [self.pagada.codigo, self.pendiente.codigo])
+        self.assertEqual([pago["referencia"] for pago in filas[0]["pagos"]], ["REF-1"])
+        self.assertEqual(filas[1]["pagos"], [])
+
+    def test_deposito_de_grupo_en_su_propia_fila(self):
+        grupo = crear_reserva_grupo({"Doble": 1}, date(2030, 7, 1), date(2030, 7, 3), rut="123456785")
+        deposito = grupo.pagos.get()
+        filas = list(csv.DictReader(StringIO(self.exportar())))
+        self.assertEqual(len(filas), 4)
+        self.assertEqual((filas[2]["codigo"], filas[2]["grupo"], filas[2]["monto"]), (grupo.reservas.get().codigo, grupo.codigo, ""))
+        self.assertEqual((filas[3]["codigo"], filas[3]["grupo"]), ("", grupo.codigo))
+        self.assertEqual((filas[3]["id_pago"], filas[3]["monto"]), (str(deposito.id_pago), str(deposito.monto)))
+
+        filas = [json.loads(linea) for linea in self.exportar(formato="jsonl").splitlines()]
+        self.assertEqual(filas[2]["grupo"], grupo.codigo)
+        self.assertNotIn("codigo", filas[3])
+        self.assertEqual([pago["monto"] for pago in filas[3]["pagos"]], [str(deposito.monto)])
+
+    def test_parametros_invalidos(self):
+        url = reverse("exportar_reservas")
+        self.assertEqual(self.client.get(url, {"formato": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"desde": "2030-02-30"}).status_code, 400)
+
+
+class CargarDatosTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+
+    def archivo(self, nombre, contenido):
+        ruta = os.path.join(self.directorio, nombre)
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            archivo.write(contenido)
+        return ruta
+
+    def reserva(self, codigo, inicio, fin, **extra):
+        return {
+            "codigo": codigo, "id_habitacion": self.habitacion.id_habitacion, "rut": "12.345.678-5",
+            "fecha_inicio": inicio, "fecha_fin": fin, "estado": "confirmada", "precio_total": "100000.00",
+            **extra,
+        }
+
+    def cargar(self, ruta, modelo, *argumentos):
+        salida, errores = StringIO(), StringIO()
+        call_command("cargar_datos", ruta, "--modelo", modelo, *argumentos, stdout=salida, stderr=errores)
+        return salida.getvalue(), errores.getvalue()
+
+    def test_jsonl_de_reservas_escribe_noches_y_resumenes(self):
+        filas = [self.reserva("CARGA-1", "2032-03-01", "2032-03-03"), self.reserva("CARGA-2", "2032-03-05", "2032-03-06")]
+        ruta = self.archivo("reservas.jsonl", "".join(json.dumps(fila) + "\n" for fila in filas))
+        salida, _ = self.cargar(ruta, "reserva")
+        self.assertIn("Listo: 2 filas cargadas, 0 omitidas.", salida)
+
+        self.assertEqual(Cliente.objects.get().rut, "123456785")
+        self.assertEqual(NocheOcupada.objects.filter(habitacion=self.habitacion).count(), 3)
+        noches = ResumenDiario.objects.filter(tipo="Doble").values_list("fecha", "noches_vendidas")
+        self.assertEqual(sorted(noches), [(date(2032, 3, 1), 1), (date(2032, 3, 2), 1), (date(2032, 3, 5), 1)])
+
+    def test_csv_de_pagos_descuenta_el_saldo(self):
+        ruta = self.archivo("reservas.jsonl", json.dumps(self.reserva("CARGA-1", "2032-03-01", "2032-03-03")) + "\n")
+        self.cargar(ruta, "reserva")
+        ruta = self.archivo("pagos.csv", "codigo,monto,metodo,fecha\nCARGA-1,30000,tarjeta,2032-02-01\nCARGA-1,20000,efectivo,\n")
+        salida, _ = self.cargar(ruta, "pago")
+        self.assertIn("Listo: 2 filas cargadas, 0 omitidas.", salida)
+
+        reserva = Reserva.objects.get(codigo="CARGA-1")
+        self.assertEqual((reserva.monto_pagado, reserva.saldo), (Decimal("50000.00"), Decimal("50000.00")))
+        self.assertEqual(reserva.pagos.get(metodo="tarjeta").fecha.date(), date(2032, 2, 1))
+        self.assertEqual(sum(ResumenDiario.objects.values_list("cobrado", flat=True)), Decimal("50000.00"))
+
+    def test_fila_invalida_aborta_u_omite(self):
+        filas = [self.reserva("CARGA-1", "2032-03-01", "2032-03-03"), self.reserva("CARGA-2", "2032-03-05", "2032-03-04")]
+        ruta = self.archivo("reservas.jsonl", "".join(json.dumps(fila) + "\n" for fila in filas))
+        with self.assertRaisesMessage(CommandError, "Línea 2: fecha_inicio debe ser anterior a fecha_fin"):
+            self.cargar(ruta, "reserva")
+        self.assertFalse(Reserva.objects.exists())
+
+        salida, errores = self.cargar(ruta, "reserva", "--omitir-invalidos")
+        self.assertIn("Línea 2 omitida", errores)
+        self.assertIn("Listo: 1 filas cargadas, 1 omitidas.", salida)
+        self.assertEqual(list(Reserva.objects.values_list("codigo", flat=True)), ["CARGA-1"])
+
+
+class GestionReservasTests(TestCase):
+    def setUp(self):
+        admin = Administrador.objects.create(nombre="Admin", email="admin@example.com")
+        self.client.post(reverse("login_admin"), {"id_admin": admin.id_admin, "email": admin.email})
+        for i in range(30):
+            habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2 + i % 2, precio=Decimal("50000.00"))
+            crear_reserva(habitacion, date(2030, 7, 1), date(2030, 7, 3), rut="123456785")
+        self.ids = sorted(Habitacion.objects.values_list("id_habitacion", flat=True))
+
+    def pagina(self, **parametros):
+        respuesta = self.client.get(reverse("gestion_reservas"), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.context
+
+    def test_paginacion_por_clave_con_consultas_acotadas(self):
+        with CaptureQueriesContext(connection) as primera:
+            contexto = self.pagina()
+        self.assertEqual([h.id_habitacion for h in contexto["habitaciones"]], self.ids[:25])
+        self.assertIsNone(contexto["anterior"])
+
+        with CaptureQueriesContext(connection) as segunda:
+            contexto = self.pagina(despues=contexto["siguiente"])
+        self.assertEqual([h.id_habitacion for h in contexto["habitaciones"]], self.ids[25:])
+        self.assertIsNone(contexto["siguiente"])
+        # El numero de consultas no depende de la pagina ni de las reservas
+        self.assertEqual(len(primera), len(segunda))
+        self.assertLessEqual(len(primera), 3)
+
+        contexto = self.pagina(antes=contexto["anterior"])
+        self.assertEqual([h.id_habitacion for h in contexto["habitaciones"]], self.ids[:25])
+
+    def test_filtro_de_capacidad(self):
+        self.assertEqual(len(self.pagina(capacidad="3")["habitaciones"]), 15)
+        self.assertEqual(len(self.pagina(capacidad="²")["habitaciones"]), 25)
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.registro = metricas.Registro(os.path.join(directorio.name, "metricas.sqlite3"), intervalo=0)
+        for modulo in ("core.middleware", "core.views"):
+            parche = mock.patch(f"{modulo}.registro", self.registro)
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.addCleanup(lambda: self.registro._conexion and self.registro._conexion.close())
+        Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+
+    def test_middleware_registra_latencia_y_consultas(self):
+        self.client.get(reverse("calendario_disponibilidad"))
+        self.client.get(reverse("calendario_disponibilidad"))
+        serie = self.registro.leer()["calendario_disponibilidad"]
+        self.assertEqual(serie["count"], 2)
+        self.assertEqual(serie["consultas"], 4)
+        self.assertGreater(serie["sum"], 0)
+
+    def test_endpoint_prometheus(self):
+        self.client.get(reverse("calendario_disponibilidad"))
+        self.assertEqual(self.client.get(reverse("metricas")).status_code, 302)
+
+        admin = Administrador.objects.create(nombre="Admin", email="admin@example.com")
+        self.client.post(reverse("login_admin"), {"id_admin": admin.id_admin, "email": admin.email})
+        respuesta = self.client.get(reverse("metricas"))
+        self.assertTrue(respuesta["Content-Type"].startswith("text/plain; version=0.0.4"))
+        texto = respuesta.content.decode()
+        self.assertIn("# TYPE hotel_vista_latencia_segundos histogram", texto)
+        self.assertIn('hotel_vista_latencia_segundos_bucket{vista="calendario_disponibilidad",le="+Inf"} 1', texto)
+        self.assertIn('hotel_vista_latencia_segundos_count{vista="calendario_disponibilidad"} 1', texto)
+        self.assertIn('hotel_vista_consultas_total{vista="calendario_disponibilidad"} 2', texto)
+
+
+class SesionAdminTests(TestCase):
+    def setUp(self):
+        self.admin = Administrador.objects.create(nombre="Admin", email="admin@example.com")
+        self.client.post(reverse("login_admin"), {"id_admin": self.admin.id_admin, "email": self.admin.email})
+
+    def test_paginas_admin_sin_consultas_de_sesion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse("gestion_reservas"))
+        self.assertEqual(respuesta.status_code, 200)
+        sql = " ".join(consulta["sql"] for consulta in consultas)
+        self.assertNotIn("django_session", sql)
+        self.assertNotIn("core_administrador", sql)
+
+    def test_logout_revoca_el_token(self):
+        cookie = self.client.cookies["admin_sesion"].value
+        self.client.get(reverse("logout_admin"))
+        self.admin.refresh_from_db()
+        self.assertIsNone(self.admin.session_token)
+
+        self.client.cookies["admin_sesion"] = cookie
+        respuesta = self.client.get(reverse("gestion_reservas"))
+        self.assertRedirects(respuesta, reverse("login_admin"), fetch_redirect_response=False)
+
+    def test_baja_del_administrador_revoca_la_sesion(self):
+        self.assertEqual(self.client.get(reverse("gestion_reservas")).status_code, 200)
+        Administrador.objects.filter(pk=self.admin.pk).delete()
+        respuesta = self.client.get(reverse("gestion_reservas"))
+        self.assertRedirects(respuesta, reverse("login_admin"), fetch_redirect_response=False)
+
+
+class CachePaginasTests(TestCase):
+    def setUp(self):
+        caches["paginas"].clear()
+
+    def test_get_condicional_responde_304(self):
+        respuesta = self.client.get(reverse("landing_page"))
+        self.assertEqual(respuesta.status_code, 200)
+        respuesta = self.client.get(reverse("landing_page"), HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_cambio_de_habitacion_cambia_la_version(self):
+        respuesta = self.client.get(reverse("reservar"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        respuesta = self.client.get(reverse("reservar"), HTTP_IF_MODIFIED_SINCE=respuesta["Last-Modified"])
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_version_compartida_entre_procesos(self):
+        # Otro worker lee la misma cache de archivos con su propia instancia
+        with tempfile.TemporaryDirectory() as directorio:
+            config = {"BACKEND": settings.CACHE_COMPARTIDA, "LOCATION": directorio}
+            with override_settings(CACHES={**settings.CACHES, "paginas": config}):
+                version = cache_paginas.version_catalogo()
+                cache_paginas.invalidar_paginas()
+                otro_worker = FileBasedCache(directorio, {})
+                self.assertGreater(otro_worker.get(cache_paginas.CLAVE_VERSION), version)
+                self.assertIsNone(caches["default"].get(cache_paginas.CLAVE_VERSION))
+
+
+@override_settings(ROOT_URLCONF=settings_asgi.ROOT_URLCONF, MIDDLEWARE=settings_asgi.MIDDLEWARE)
+class VistasAsyncTests(TestCase):
+    def setUp(self):
+        cache_paginas._cache().clear()
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.reserva = crear_reserva(self.habitacion, date(2031, 9, 1), date(2031, 9, 3), rut="123456785")
+
+    async def test_landing_cacheada_responde_304(self):
+        respuesta = await self.async_client.get(reverse("landing_page"))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.resolver_match.func.__module__, "core.views_async")
+        self.assertEqual(respuesta["Last-Modified"], http_date(await cache_paginas.aversion_catalogo()))
+
+        respuesta = await self.async_client.get(reverse("landing_page"), headers={"if-none-match": respuesta["ETag"]})
+        self.assertEqual(respuesta.status_code, 304)
+
+    async def test_reservar_busca_y_delega_el_post(self):
+        url = reverse("reservar")
+        respuesta = await self.async_client.get(url, {"fecha_inicio": "2031-09-02", "fecha_fin": "2031-09-04"})
+        self.assertNotContains(respuesta, 'name="habitacion"')
+        respuesta = await self.async_client.get(url, {"fecha_inicio": "2031-09-03", "fecha_fin": "2031-09-05"})
+        self.assertContains(respuesta, 'name="habitacion"', count=1)
+        respuesta = await self.async_client.get(url, {"fecha_inicio": "2031-09-05", "fecha_fin": "2031-09-03"})
+        self.assertContains(respuesta, "La fecha de inicio debe ser anterior a la fecha de fin.")
+
+        respuesta = await self.async_client.post(f"{url}?fecha_inicio=2031-09-03&fecha_fin=2031-09-05", {
+            "rut": "12.345.678-5", "nombre": "Ana", "email": "ana@example.com", "telefono": "123",
+            "habitacion": self.habitacion.pk, "fecha_inicio": "2031-09-03", "fecha_fin": "2031-09-05",
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(await Reserva.objects.filter(habitacion=self.habitacion).acount(), 2)
+
+    async def test_mis_reservas(self):
+        url = reverse("mis_reservas")
+        respuesta = await self.async_client.post(url, {"rut": "12.345.678-5", "codigo": self.reserva.codigo})
+        self.assertEqual(respuesta.context["reserva"], self.reserva)
+        respuesta = await self.async_client.post(url, {"rut": "98.765.432-5", "codigo": self.reserva.codigo})
+        self.assertIsNone(respuesta.context["reserva"])
+        self.assertContains(respuesta, "Reserva no encontrada.")
+
+
+class ImagenesResponsivasTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.origen = os.path.join(directorio.name, "origen")
+        self.static_root = os.path.join(directorio.name, "static")
+        ajustes = override_settings(
+            STATIC_ROOT=self.static_root,
+            IMAGENES_CACHE_DIR=os.path.join(directorio.name, "cache"),
+            IMAGENES_ANCHOS=(480, 960),
+            IMAGENES_FORMATOS=("webp",),
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        imagenes._variantes.cache_clear()
+        self.addCleanup(imagenes._variantes.cache_clear)
+
+    def renderizar(self):
+        return Template("{% load imagenes %}{% imagen_responsiva 'img/foto.png' sizes='50vw' alt='Foto' %}").render(Context())
+
+    @skipIf(storage.Image is None, "requiere Pillow")
+    def test_variantes_hasta_el_ancho_original_y_reutiliza_las_codificadas(self):
+        os.makedirs(os.path.join(self.origen, "img"))
+        storage.Image.new("RGB", (600, 300), "navy").save(os.path.join(self.origen, "img", "foto.png"))
+        destino = storage.ImagenesResponsivasStorage(location=self.static_root)
+
+        def generar():
+            return destino.generar_variantes({"img/foto.png": (FileSystemStorage(location=self.origen), "img/foto.png")})
+
+        with mock.patch("core.storage._codificar", wraps=storage._codificar) as codificar:
+            variantes = generar()
+            self.assertEqual(codificar.call_count, 2)
+            self.assertEqual(generar(), variantes)
+            self.assertEqual(codificar.call_count, 2)
+
+        self.assertEqual(variantes, {"img/foto.png": {"webp": [[480, "img/foto.480w.webp"], [600, "img/foto.600w.webp"]]}})
+        with storage.Image.open(destino.path("img/foto.600w.webp")) as variante:
+            self.assertEqual(variante.size, (600, 300))
+
+    def test_picture_con_indice_e_img_sin_el(self):
+        self.assertHTMLEqual(self.renderizar(), '<img src="/static/img/foto.png" alt="Foto">')
+
+        os.makedirs(self.static_root)
+        with open(os.path.join(self.static_root, storage.INDICE), "w") as indice:
+            json.dump({"img/foto.png": {"webp": [[480, "img/foto.480w.webp"], [600, "img/foto.600w.webp"]]}}, indice)
+        imagenes._variantes.cache_clear()
+        self.assertHTMLEqual(self.renderizar(), (
+            '<picture><source type="image/webp" srcset="/static/img/foto.480w.webp 480w, '
+            '/static/img/foto.600w.webp 600w" sizes="50vw"><img src="/static/img/foto.png" alt="Foto"></picture>'
+        ))
+
+
+class ReservaGrupoTests(TestCase):
+    def setUp(self):
+        for _ in range(3):
+            Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        Habitacion.objects.create(tipo="Suite", capacidad=2, precio=Decimal("80000.00"))
+
+    def test_crea_reservas_y_un_deposito(self):
+        grupo = crear_reserva_grupo({"Doble": 2, "Suite": 1}, date(2031, 3, 1), date(2031, 3, 3), rut="123456785")
+        self.assertEqual(grupo.reservas.filter(estado="confirmada").count(), 3)
+        self.assertEqual(NocheOcupada.objects.filter(reserva__grupo=grupo).count(), 6)
+        deposito = Pago.objects.get(grupo=grupo)
+        self.assertEqual(deposito.monto, Decimal("108000.00"))
+
+    def test_sin_cupo_no_crea_nada(self):
+        with self.assertRaises(HabitacionNoDisponible):
+            crear_reserva_grupo({"Doble": 2, "Suite": 2}, date(2031, 3, 1), date(2031, 3, 3), rut="123456785")
+        self.assertFalse(GrupoReserva.objects.exists())
+        self.assertFalse(Reserva.objects.exists())
+        self.assertFalse(Pago.objects.exists())
+
+    def datos_formulario(self, cantidades, clave="grupo-1"):
+        datos = {
+            "rut": "12.345.678-5", "nombre": "Operador", "email": "op@example.com", "telefono": "123",
+            "fecha_inicio": "2031-03-01", "fecha_fin": "2031-03-03", "metodo": "tarjeta", "clave_idempotencia": clave,
+        }
+        for tipo, cantidad in cantidades.items():
+            datos[ReservaGrupoForm.campo_de(tipo)] = cantidad
+        return datos
+
+    def test_cantidades_siguen_a_su_tipo(self):
+        # Un tipo nuevo que se ordena antes que los del GET no corre las cantidades
+        datos = self.datos_formulario({"Doble": 1, "Suite": 1})
+        form = ReservaGrupoForm(datos, tipos=["Cabaña", "Doble", "Suite"])
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["solicitud"], {"Doble": 1, "Suite": 1})
+        # Un tipo que ya no se ofrece no se descarta en silencio
+        self.assertFalse(ReservaGrupoForm(datos, tipos=["Doble"]).is_valid())
+
+    def test_doble_envio_crea_un_solo_grupo(self):
+        datos = self.datos_formulario({"Doble": 2})
+        primera = self.client.post(reverse("reservar_grupo"), datos)
+        segunda = self.client.post(reverse("reservar_grupo"), datos)
+        self.assertEqual(GrupoReserva.objects.count(), 1)
+        self.assertEqual(Pago.objects.count(), 1)
+        self.assertEqual(primera.context["grupo"], segunda.context["grupo"])
+
+
+class TareasTests(TestCase):
+    def setUp(self):
+        habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.reserva = crear_reserva(habitacion, date(2031, 4, 1), date(2031, 4, 3), rut="123456785",
+                                     email="cliente@example.com")
+
+    def test_pago_encola_comprobante_y_se_envia_al_procesarlo(self):
+        self.client.post(reverse("simular_pago", args=[self.reserva.codigo]), {"metodo": "tarjeta", "clave_idempotencia": "k1"})
+        self.assertEqual(Tarea.objects.filter(nombre="enviar_comprobante_pago").count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+        for tarea in tareas.tomar("test", 10):
+            tareas.ejecutar(tarea)
+        self.assertEqual(Tarea.objects.get().estado, "completada")
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_clave_repetida_no_duplica(self):
+        tareas.encolar("enviar_aviso_cancelacion", clave="cancelacion:X", codigo="X")
+        tareas.encolar("enviar_aviso_cancelacion", clave="cancelacion:X", codigo="X")
+        self.assertEqual(Tarea.objects.filter(clave="cancelacion:X").count(), 1)
+
+    def test_fallo_reintenta_con_backoff_y_luego_falla(self):
+        tarea = tareas.encolar("enviar_aviso_cancelacion", codigo="NOEXISTE")
+        Tarea.objects.filter(pk=tarea.pk).update(max_intentos=2)
+
+        tareas.ejecutar(tareas.tomar("t", 10)[0])
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ("pendiente", 1))
+        self.assertGreater(tarea.ejecutar_desde, tarea.tomada_en)
+
+        Tarea.objects.filter(pk=tarea.pk).update(ejecutar_desde=tarea.tomada_en)
+        tareas.ejecutar(tareas.tomar("t", 10)[0])
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ("fallida", 2))
+        self.assertIn("DoesNotExist", tarea.ultimo_error)
+
+
+class PagoIdempotenteTests(TestCase):
+    def setUp(self):
+        habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.reserva = crear_reserva(habitacion, date(2031, 4, 1), date(2031, 4, 3), rut="123456785")
+
+    def test_reenvio_con_la_misma_clave_no_duplica_el_pago(self):
+        datos = {"metodo": "tarjeta", "clave_idempotencia": "abc123"}
+        primera = self.client.post(reverse("simular_pago", args=[self.reserva.codigo]), datos)
+        segunda = self.client.post(reverse("simular_pago", args=[self.reserva.codigo]), datos)
+        self.assertEqual(primera.status_code, 200)
+        self.assertContains(segunda, "Reserva confirmada correctamente")
+        self.assertEqual(self.reserva.pagos.count(), 1)
+
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.monto_pagado, Decimal("30000.00"))
+        self.assertEqual(self.reserva.saldo, Decimal("70000.00"))
+
+    def test_pago_rechazado_no_deja_la_reserva_como_pagada(self):
+        otra = crear_reserva(self.reserva.habitacion, date(2031, 5, 1), date(2031, 5, 2), rut="123456785")
+        registrar_pago(otra, "tarjeta", "", "repetida")
+        # La clave ya es de otro pago: el INSERT falla y el bloque se deshace
+        self.assertIsNone(registrar_pago(self.reserva, "tarjeta", "", "repetida"))
+        self.assertEqual(self.reserva.estado, "pendiente")
+        self.assertEqual(self.reserva.monto_pagado, Decimal("0.00"))
+        respuesta = self.client.post(
+            reverse("simular_pago", args=[self.reserva.codigo]), {"metodo": "tarjeta", "clave_idempotencia": "repetida"}
+        )
+        self.assertNotContains(respuesta, "ya fue pagada")
+
+    def test_guardar_una_instancia_vieja_no_pisa_los_contadores(self):
+        vieja = Reserva.objects.get(pk=self.reserva.pk)
+        Pago.objects.create(reserva=self.reserva, monto=Decimal("10000.00"))
+        vieja.precio_total = Decimal("120000.00")
+        vieja.save()
+        vieja.refresh_from_db()
+        self.assertEqual((vieja.monto_pagado, vieja.saldo), (Decimal("10000.00"), Decimal("110000.00")))
+
+
+class BarridoTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+
+    def test_expira_pendientes_vencidas_y_libera_noches(self):
+        vencida = crear_reserva(self.habitacion, date(2031, 6, 1), date(2031, 6, 3), rut="123456785")
+        Reserva.objects.filter(pk=vencida.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        reciente = crear_reserva(self.habitacion, date(2031, 6, 5), date(2031, 6, 6), rut="123456785")
+
+        self.assertEqual(barrido.expirar_pendientes(timedelta(hours=1), lote=1), 1)
+        vencida.refresh_from_db()
+        reciente.refresh_from_db()
+        self.assertEqual((vencida.estado, reciente.estado), ("cancelada", "pendiente"))
+        self.assertFalse(NocheOcupada.objects.filter(reserva=vencida).exists())
+        self.assertTrue(Tarea.objects.filter(clave=f"cancelacion:{vencida.codigo}").exists())
+
+    def test_completa_estadias_terminadas(self):
+        for inicio in (date(2030, 1, 1), date(2030, 1, 5), date(2031, 1, 1)):
+            reserva = crear_reserva(self.habitacion, inicio, inicio + timedelta(days=2), rut="123456785")
+            reserva.estado = "confirmada"
+            reserva.save()
+
+        self.assertEqual(barrido.completar_finalizadas(hoy=date(2030, 6, 1), lote=1), 2)
+        self.assertEqual(Reserva.objects.filter(estado="completada").count(), 2)
+        self.assertEqual(NocheOcupada.objects.count(), 2)
+
+
+class ResumenDiarioTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.reserva = crear_reserva(self.habitacion, date(2031, 8, 4), date(2031, 8, 7), rut="123456785")
+
+    def resumen(self):
+        return list(ResumenDiario.objects.order_by("fecha", "tipo").values_list("fecha", "noches_vendidas", "ingresos", "cobrado"))
+
+    def test_se_mantiene_con_pagos_y_cambios_de_estado(self):
+        self.assertEqual(ResumenDiario.objects.count(), 0)
+        registrar_pago(self.reserva, "tarjeta", "", "clave-resumen")
+        filas = self.resumen()
+        noches = [fila for fila in filas if fila[0] >= date(2031, 8, 4)]
+        self.assertEqual([fila[1:3] for fila in noches], [(1, Decimal("50000.00"))] * 3)
+        self.assertEqual(sum(fila[3] for fila in filas), Decimal("45000.00"))
+
+        # El recalculo completo coincide con lo mantenido de forma incremental
+        resumenes.reconstruir()
+        self.assertEqual(self.resumen(), filas)
+
+        self.reserva.refresh_from_db()
+        self.reserva.estado = "cancelada"
+        self.reserva.save()
+        self.assertEqual(sum(fila[1] for fila in self.resumen()), 0)
+
+    def test_cambio_de_tipo_mueve_ventas_y_cobros(self):
+        registrar_pago(self.reserva, "tarjeta", "", "clave-tipo")
+        self.habitacion.tipo = "Suite"
+        self.habitacion.save()
+        totales = ResumenDiario.objects.values("tipo").annotate(noches=Sum("noches_vendidas"), cobrado=Sum("cobrado"))
+        self.assertEqual(list(totales.values_list("tipo", "noches", "cobrado")), [("Suite", 3, Decimal("45000.00"))])
+
+        # Editar la reserva despues descuenta del tipo nuevo, sin dejar negativos
+        self.reserva.refresh_from_db()
+        self.reserva.estado = "cancelada"
+        self.reserva.save()
+        self.assertFalse(ResumenDiario.objects.filter(noches_vendidas__lt=0).exists())
+        self.assertEqual(list(totales.values_list("tipo", "noches", "cobrado")), [("Suite", 0, Decimal("45000.00"))])
+
+    def test_reporte_lee_solo_los_resumenes(self):
+        registrar_pago(self.reserva, "tarjeta", "", "clave-reporte")
+        admin = Administrador.objects.create(nombre="Admin", email="admin@example.com")
+        self.client.post(reverse("login_admin"), {"id_admin": admin.id_admin, "email": admin.email})
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse("reporte_ocupacion"), {"desde": "2031-08-01", "hasta": "2031-08-10"})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn("core_reserva", " ".join(consulta["sql"] for consulta in consultas))
+        total = respuesta.context["total"]
+        self.assertEqual((total["noches"], total["adr"]), (3, Decimal("50000.00")))
+        self.assertEqual(total["ocupacion"], 30.0)
+
+        respuesta = self.client.get(reverse("reporte_ocupacion"), {"desde": "2031-02-30", "hasta": "2031-08-10"})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "Fecha inválida.")
+        self.assertEqual(respuesta.context["hasta"], timezone.localdate())
+
+
+class CambiosDisponibilidadTests(TestCase):
+    def setUp(self):
+        self.habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        self.cursor = self.client.get(reverse("cambios_disponibilidad")).json()["cursor"]
+
+    def feed(self, **parametros):
+        return self.client.get(reverse("cambios_disponibilidad"), {"cursor": self.cursor, **parametros})
+
+    def test_devuelve_solo_lo_cambiado_desde_el_cursor(self):
+        reserva = crear_reserva(self.habitacion, date(2031, 9, 1), date(2031, 9, 4), rut="123456785")
+        datos = self.feed().json()
+        self.assertEqual(datos["cambios"], [
+            {"habitacion": self.habitacion.id_habitacion, "desde": "2031-09-01", "ocupacion": "111"},
+        ])
+        self.cursor = datos["cursor"]
+        self.assertEqual(self.feed().json()["cambios"], [])
+
+        reserva.estado = "cancelada"
+        reserva.save()
+        self.assertEqual(self.feed().json()["cambios"][0]["ocupacion"], "000")
+
+    def test_paginado_y_cursor_vencido(self):
+        for dia in (1, 5, 9):
+            crear_reserva(self.habitacion, date(2031, 10, dia), date(2031, 10, dia + 2), rut="123456785")
+        datos = self.feed(limite=2).json()
+        self.assertTrue(datos["hay_mas"])
+        self.assertEqual(len(datos["cambios"]), 2)
+        self.assertEqual(self.feed(cursor="no-es-un-cursor").status_code, 400)
+
+        # Se conserva la ultima fila: el cursor de la pagina sigue valido, el inicial no
+        cambios.podar(timezone.now() + timedelta(days=1))
+        self.assertEqual(self.feed().status_code, 410)
+        self.assertEqual(self.feed(cursor=datos["cursor"]).json()["cambios"][0]["desde"], "2031-10-09")
+
+
+    def test_pagina_completa_de_habitaciones_distintas(self):
+        # Un tramo por habitacion en toda la pagina: una sola consulta de reservas
+        Habitacion.objects.bulk_create([
+            Habitacion(tipo="Doble", capacidad=2, precio=Decimal("50000.00")) for _ in range(cambios.LIMITE_MAXIMO)
+        ])
+        habitaciones = list(Habitacion.objects.exclude(pk=self.habitacion.pk).order_by("id_habitacion"))
+        ocupada = habitaciones[-1]
+        crear_reserva(ocupada, date(2031, 11, 2), date(2031, 11, 3), rut="123456785")
+        self.cursor = cambios.cursor_actual()
+        cambios.registrar([(habitacion.id_habitacion, date(2031, 11, 1), date(2031, 11, 4)) for habitacion in habitaciones])
+
+        with self.assertNumQueries(4):
+            datos = cambios.cambios_desde(self.cursor, cambios.LIMITE_MAXIMO)
+        self.assertFalse(datos["hay_mas"])
+        self.assertEqual(len(datos["cambios"]), cambios.LIMITE_MAXIMO)
+        self.assertEqual(datos["cambios"][-1], {"habitacion": ocupada.id_habitacion, "desde": "2031-11-01", "ocupacion": "010"})
+        self.assertEqual(datos["cambios"][0]["ocupacion"], "000")
+
+class BusquedaFacetasTests(TestCase):
+    def setUp(self):
+        for i in range(25):
+            Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal(40000 + i * 1000))
+        for _ in range(3):
+            Habitacion.objects.create(tipo="Suite", capacidad=4, precio=Decimal("90000.00"))
+        ocupada = Habitacion.objects.create(tipo="Suite", capacidad=4, precio=Decimal("95000.00"))
+        crear_reserva(ocupada, date(2031, 11, 1), date(2031, 11, 4), rut="123456785")
+        self.ids = disponibilidad.habitaciones_disponibles_ids(date(2031, 11, 1), date(2031, 11, 3))
+
+    def buscar(self, **filtros):
+        return busqueda.buscar(self.ids, date(2031, 11, 1), date(2031, 11, 3), filtros)
+
+    def test_facetas_con_una_consulta_agrupada(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = self.buscar(huespedes=3)
+        self.assertEqual(len([q for q in consultas if "GROUP BY" in q["sql"]]), 1)
+        # Cada faceta ignora su propio filtro
+        self.assertEqual(resultado["facetas"]["capacidades"], [(2, 28), (4, 3)])
+        self.assertEqual(resultado["facetas"]["tipos"], [("Suite", 3)])
+        self.assertEqual(resultado["total"], 3)
+        self.assertEqual(resultado["habitaciones"][0].precio_estadia, Decimal("180000.00"))
+
+    def test_filtra_ordena_por_precio_y_pagina(self):
+        resultado = self.buscar(tipo="Doble", precio_max="70000")
+        self.assertEqual(resultado["total"], 25)
+        self.assertEqual(len(resultado["habitaciones"]), busqueda.POR_PAGINA)
+        self.assertEqual(resultado["habitaciones"][0].precio, Decimal("40000.00"))
+        self.assertEqual((resultado["paginas"], resultado["siguiente"]), (2, 2))
+        segunda = self.buscar(tipo="Doble", precio_max="70000", pagina="2")["habitaciones"]
+        self.assertEqual([h.precio for h in segunda], [Decimal(60000 + i * 1000) for i in range(5)])
+        self.assertEqual(self.buscar(precio_min="85000")["facetas"]["tipos"], [("Suite", 3)])
+
+        respuesta = self.client.get(reverse("reservar"), {
+            "fecha_inicio": "2031-11-01", "fecha_fin": "2031-11-03", "tipo": "Suite",
+        })
+        self.assertContains(respuesta, 'name="habitacion"', count=3)
+        self.assertContains(respuesta, "Doble (25)")
+
+
+class RutTests(TestCase):
+    def test_formulario_valida_digito_verificador(self):
+        form = ConsultaReservaForm({"rut": "12.345.678-5", "codigo": "X"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["rut"], "123456785")
+        self.assertFalse(ConsultaReservaForm({"rut": "12.345.678-9", "codigo": "X"}).is_valid())
+
+    def test_variantes_del_mismo_rut_son_un_cliente(self):
+        habitacion = Habitacion.objects.create(tipo="Doble", capacidad=2, precio=Decimal("50000.00"))
+        crear_reserva(habitacion, date(2031, 7, 1), date(2031, 7, 3), rut="12.345.678-5")
+        reserva = crear_reserva(habitacion, date(2031, 7, 5), date(2031, 7, 6), rut="123456785")
+        self.assertEqual(Cliente.objects.count(), 1)
+        self.assertEqual(reserva.cliente.rut, "123456785")
+        respuesta = self.client.post(reverse("mis_reservas"), {"rut": "12345678-5", "codigo": reserva.codigo})
+        self.assertEqual(respuesta.context["reserva"], reserva)
+
+
+class ConexionSqliteTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, "prueba.sqlite3")
+        # Conexion nueva con los settings reales pero sobre un archivo: la base de
+        # tests es en memoria y no admite WAL
+        base = connections["default"]
+        self.conexion = connections["pragmas"] = base.__class__({**base.settings_dict, "NAME": self.ruta}, alias="pragmas")
+        self.addCleanup(connections.__delitem__, "pragmas")
+        self.addCleanup(self.conexion.close)
+
+    def test_pragmas_al_conectar(self):
+        with self.conexion.cursor() as cursor:
+            valores = {
+                pragma: cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "temp_store")
+            }
+        # synchronous=1 es NORMAL y temp_store=2 es MEMORY
+        self.assertEqual(valores, {
+            "journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "cache_size": -20000, "temp_store": 2,
+        })
+
+    def test_atomic_toma_el_lock_de_escritura_al_empezar(self):
+        with self.conexion.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+        otra = sqlite3.connect(self.ruta, timeout=0, isolation_level=None)
+        self.addCleanup(otra.close)
+        with transaction.atomic(using="pragmas"):
+            # Aun sin escribir, el BEGIN IMMEDIATE ya bloquea a otro escritor
+            self.conexion.cursor().execute("SELECT count(*) FROM t")
+            with self.assertRaises(sqlite3.OperationalError):
+                otra.execute("BEGIN IMMEDIATE")
+        otra.execute("BEGIN IMMEDIATE")
+        otra.execute("ROLLBACK")
+
+
+class RouterReplicaTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.RouterLecturaEscritura()
+        parche = mock.patch.object(routers, "replica_configurada", return_value=True)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_lee_de_la_replica_hasta_que_la_peticion_escribe(self):
+        token = routers.iniciar_peticion(fijada=False)
+        self.assertEqual(self.router.db_for_read(Reserva), "replica")
+        self.assertEqual(self.router.db_for_write(Reserva), "default")
+        self.assertEqual(self.router.db_for_read(Reserva), "default")
+        self.assertTrue(routers.terminar_peticion(token))
+
+    def test_cliente_fijado_lee_de_la_primaria(self):
+        token = routers.iniciar_peticion(fijada=True)
+        self.assertEqual(self.router.db_for_read(Reserva), "default")
+        self.assertFalse(routers.terminar_peticion(token))
+
+
+class ReservasConcurrentesTests(TransactionTestCase):
+    HILOS = 12
+
+    def test_solo_una_reserva_gana(self):
+        habitacion = Habitacion.objects.create(tipo="Suite", capacidad=2, precio=Decimal("80000.00"))
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+        lock = threading.Lock()
+
+        def reservar():
+            barrera.wait()
+            resultado = None
+            try:
+                for _ in range(50):
+                    try:
+                        crear_reserva(habitacion, date(2030, 2, 1), date(2030, 2, 4), rut="123456785")
+                        resultado = "ok"
+                        break
+                    except HabitacionNoDisponible:
+                        resultado = "rechazada"
+                        break
+                    except ReservaConflicto:
+                        time.sleep(0.01)
+            finally:
+                connection.close()
+            with lock:
+                resultados.append(resultado)
+
+        hilos = [threading.Thread(target=reservar) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(resultados.count("ok"), 1)
+        self.assertEqual(resultados.count("rechazada"), self.HILOS - 1)
+        self.assertEqual(Reserva.objects.filter(habitacion=habitacion).count(), 1)
+        self.assertEqual(NocheOcupada.objects.filter(habitacion=habitacion).count(), 3)
+        self.assertEqual(Cliente.objects.filter(rut="123456785").count(), 1)
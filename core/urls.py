@@ -7,13 +7,20 @@ urlpatterns = [
 
 # ---------------------- Reservas ----------------------
     path('reservar/', views.reservar, name='reservar'),
+    path('reservar/grupo/', views.reservar_grupo, name='reservar_grupo'),
     path('mis_reservas/', views.mis_reservas, name='mis_reservas'),
+    path('calendario/', views.calendario_disponibilidad, name='calendario_disponibilidad'),
+    path('calendario/cambios/', views.cambios_disponibilidad, name='cambios_disponibilidad'),
 
 # ---------------------- Admin ----------------------
     path('login_admin/', views.login_admin, name='login_admin'),
     path('gestion_reservas/', views.gestion_reservas, name='gestion_reservas'),
     path('logout_admin/', views.logout_admin, name='logout_admin'),
     path('eliminar_admin/', views.eliminar_admin, name='eliminar_admin'),
+    path('gestion_reservas/cache/', views.estadisticas_cache, name='estadisticas_cache'),
+    path('gestion_reservas/exportar/', views.exportar_reservas, name='exportar_reservas'),
+    path('gestion_reservas/metricas/', views.metricas, name='metricas'),
+    path('gestion_reservas/reporte/', views.reporte_ocupacion, name='reporte_ocupacion'),
 
 # ---------------------- Habitaciones ----------------------
     path('habitacion/agregar/', views.agregar_habitacion, name='agregar_habitacion'),
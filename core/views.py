@@ -1,21 +1,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from .models import Cliente, Habitacion, Reserva, Administrador, Pago
-from .forms import ReservaForm, ConsultaReservaForm, AdminLoginForm, HabitacionForm, PagoSimuladoForm
+from .forms import ReservaForm, ReservaGrupoForm, ConsultaReservaForm, AdminLoginForm, HabitacionForm, PagoSimuladoForm
 from .decorators import admin_required
-from django.db.models import Q
+from .cache_paginas import cache_pagina_publica
+from .sesion_admin import iniciar_sesion, cerrar_sesion
+from .reservas import crear_reserva, crear_reserva_grupo, registrar_pago, ReservaConflicto
+from .disponibilidad import habitaciones_disponibles_ids, estadisticas
+from .calendario import LEYENDA, matriz_ocupacion
+from .cambios import LIMITE_MAXIMO, CursorInvalido, CursorVencido, cambios_desde, cursor_actual
+from .busqueda import buscar
+from .metricas import registro
+from .exportacion import reservas_exportables, filas_csv, lineas_jsonl
+from .resumenes import reporte, MAXIMO_DIAS_REPORTE
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.utils.dateparse import parse_date
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import json
 
 # ---------------------- Index ----------------------
+@cache_pagina_publica()
 def landing_page(request):
     return render(request, 'landing_page.html')
 
 # ---------------------- Reservas ----------------------
+@cache_pagina_publica()
 def reservar(request):
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
     habitaciones_disponibles = None
+    disponibles_ids = []
 
     # Validar fechas
     if fecha_inicio and fecha_fin:
@@ -30,54 +48,120 @@ def reservar(request):
                 "fecha_fin": None,
             })
 
-        habitaciones_disponibles = Habitacion.objects.filter(
-            estado="disponible"
-        ).exclude(
-            Q(reservas__fecha_inicio__lt=fecha_fin) & Q(reservas__fecha_fin__gt=fecha_inicio)
-        ).distinct()
+        disponibles_ids = habitaciones_disponibles_ids(fecha_inicio, fecha_fin)
+        habitaciones_disponibles = Habitacion.objects.filter(pk__in=disponibles_ids)
 
     if request.method == "POST":
         form = ReservaForm(request.POST)
         if habitaciones_disponibles is not None:
             form.fields['habitacion'].queryset = habitaciones_disponibles
         if form.is_valid():
-            fecha_inicio_dt = form.cleaned_data['fecha_inicio']
-            fecha_fin_dt = form.cleaned_data['fecha_fin']
-            rut = form.cleaned_data['rut']
-            cliente, _ = Cliente.objects.get_or_create(
-                rut=rut,
-                defaults={
-                    'nombre': form.cleaned_data['nombre'],
-                    'email': form.cleaned_data['email'],
-                    'telefono': form.cleaned_data['telefono'],
-                }
-            )
-            habitacion = form.cleaned_data['habitacion']
-            reserva = Reserva.objects.create(
-                cliente=cliente,
-                habitacion=habitacion,
-                fecha_inicio=fecha_inicio_dt,
-                fecha_fin=fecha_fin_dt,
-                precio_total=habitacion.precio,
-            )
+            try:
+                reserva = crear_reserva(
+                    habitacion=form.cleaned_data['habitacion'],
+                    fecha_inicio=form.cleaned_data['fecha_inicio'],
+                    fecha_fin=form.cleaned_data['fecha_fin'],
+                    rut=form.cleaned_data['rut'],
+                    nombre=form.cleaned_data['nombre'],
+                    email=form.cleaned_data['email'],
+                    telefono=form.cleaned_data['telefono'],
+                )
+            except ReservaConflicto as e:
+                messages.error(request, str(e))
+                disponibles_ids = habitaciones_disponibles_ids(fecha_inicio, fecha_fin) if fecha_inicio else []
+                return render(request, "reservar.html", {
+                    "form": form,
+                    "fecha_inicio": fecha_inicio,
+                    "fecha_fin": fecha_fin,
+                    "busqueda": buscar(disponibles_ids, fecha_inicio, fecha_fin, request.GET) if disponibles_ids else None,
+                }, status=409)
             messages.success(request, f"Reserva creada. Código: {reserva.codigo}")
             return redirect('simular_pago', codigo=reserva.codigo)
     else:
-        if habitaciones_disponibles is not None and habitaciones_disponibles.exists():
+        if habitaciones_disponibles is not None and disponibles_ids:
             form = ReservaForm(initial={
                 "fecha_inicio": fecha_inicio,
                 "fecha_fin": fecha_fin
             })
-            form.fields['habitacion'].queryset = habitaciones_disponibles
         else:
             form = None
 
+    # Solo se muestra la pagina de resultados filtrada; la validacion del POST
+    # usa el queryset completo de habitaciones libres
     return render(request, "reservar.html", {
         "form": form,
         "fecha_inicio": fecha_inicio,
         "fecha_fin": fecha_fin,
+        "busqueda": buscar(disponibles_ids, fecha_inicio, fecha_fin, request.GET) if disponibles_ids else None,
     })
 
+def reservar_grupo(request):
+    tipos = Habitacion.objects.filter(estado="disponible").order_by("tipo").values_list("tipo", flat=True).distinct()
+    form = ReservaGrupoForm(request.POST or None, tipos=list(tipos))
+
+    if request.method == "POST" and form.is_valid():
+        try:
+            grupo = crear_reserva_grupo(
+                form.cleaned_data['solicitud'],
+                fecha_inicio=form.cleaned_data['fecha_inicio'],
+                fecha_fin=form.cleaned_data['fecha_fin'],
+                rut=form.cleaned_data['rut'],
+                nombre=form.cleaned_data['nombre'],
+                email=form.cleaned_data['email'],
+                telefono=form.cleaned_data['telefono'],
+                metodo=form.cleaned_data['metodo'],
+                referencia=form.cleaned_data['referencia'],
+                clave_idempotencia=form.cleaned_data['clave_idempotencia'],
+            )
+        except ReservaConflicto as e:
+            messages.error(request, str(e))
+            return render(request, "reservar_grupo.html", {"form": form}, status=409)
+        reservas = grupo.reservas.select_related("habitacion").order_by("habitacion__tipo", "habitacion__id_habitacion")
+        deposito = grupo.pagos.get()
+        messages.success(request, f"Reserva grupal creada. Código: {grupo.codigo}")
+        return render(request, "reservar_grupo.html", {"form": None, "grupo": grupo, "reservas": reservas, "deposito": deposito})
+
+    return render(request, "reservar_grupo.html", {"form": form})
+
+def calendario_disponibilidad(request):
+    try:
+        desde = parse_date(request.GET.get('desde', '')) or timezone.localdate()
+        dias = int(request.GET.get('dias', 30))
+    except ValueError:
+        return JsonResponse({"error": "Parámetros inválidos."}, status=400)
+    if not 1 <= dias <= 365:
+        return JsonResponse({"error": "dias debe estar entre 1 y 365."}, status=400)
+
+    contenido = json.dumps(matriz_ocupacion(desde, dias), separators=(",", ":")).encode()
+    etag = quote_etag(hashlib.md5(contenido).hexdigest())
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(contenido, content_type="application/json")
+    respuesta["ETag"] = etag
+    return respuesta
+
+def cambios_disponibilidad(request):
+    # Feed incremental: sin cursor devuelve el cursor actual para empezar a seguir
+    # los cambios (pedirlo antes de descargar el calendario completo)
+    try:
+        limite = int(request.GET.get('limite', 500))
+    except ValueError:
+        return JsonResponse({"error": "Parámetros inválidos."}, status=400)
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        return JsonResponse({"error": f"limite debe estar entre 1 y {LIMITE_MAXIMO}."}, status=400)
+
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        datos = {"cursor": cursor_actual(), "hay_mas": False, "leyenda": LEYENDA, "cambios": []}
+    else:
+        try:
+            datos = cambios_desde(cursor, limite)
+        except CursorInvalido:
+            return JsonResponse({"error": "Cursor inválido."}, status=400)
+        except CursorVencido:
+            return JsonResponse({"error": "Cursor vencido: vuelve a descargar el calendario y pide un cursor nuevo."}, status=410)
+    return JsonResponse(datos, json_dumps_params={"separators": (",", ":")})
+
 def mis_reservas(request):
     reserva = None
     if request.method == "POST":
@@ -96,26 +180,32 @@ def mis_reservas(request):
 def simular_pago(request, codigo):
     reserva = get_object_or_404(Reserva, codigo=codigo)
 
-    if reserva.estado != "pendiente":
-        messages.info(request, "Esta reserva ya fue pagada o no está disponible para pago.")
-        return render(request, "simular_pago.html", {"reserva": reserva, "form": None})
-    
     if request.method == "POST":
         form = PagoSimuladoForm(request.POST)
         if form.is_valid():
-            Pago.objects.create(
-                reserva=reserva,
-                monto=reserva.deposito_requerido(),
-                metodo=form.cleaned_data['metodo'],
-                referencia=form.cleaned_data['referencia']
-            )
-            reserva.estado = "confirmada"
-            reserva.save()
-            messages.success(request, "Pago simulado exitosamente. ¡Reserva confirmada!")
-            return render(request, "simular_pago.html", {"reserva": reserva, "form": None})
+            # El comprobante se encola en la misma transaccion y lo envia el worker (procesar_tareas)
+            try:
+                pago = registrar_pago(
+                    reserva,
+                    metodo=form.cleaned_data['metodo'],
+                    referencia=form.cleaned_data['referencia'],
+                    clave_idempotencia=form.cleaned_data['clave_idempotencia'],
+                )
+            except ReservaConflicto as e:
+                messages.error(request, str(e))
+                return render(request, "simular_pago.html", {"reserva": reserva, "form": form}, status=409)
+            if pago is not None:
+                # Un reenvio con la misma clave muestra el mismo resultado que el primero
+                reserva.refresh_from_db()
+                messages.success(request, "Pago simulado exitosamente. ¡Reserva confirmada!")
+                return render(request, "simular_pago.html", {"reserva": reserva, "form": None})
     else:
         form = PagoSimuladoForm()
 
+    if reserva.estado != "pendiente":
+        messages.info(request, "Esta reserva ya fue pagada o no está disponible para pago.")
+        return render(request, "simular_pago.html", {"reserva": reserva, "form": None})
+
     return render(request, "simular_pago.html", {"reserva": reserva, "form": form})
 
 # ---------------------- Admin ----------------------
@@ -127,8 +217,7 @@ def login_admin(request):
             email = form.cleaned_data['email']
             try:
                 admin = Administrador.objects.get(id_admin=id_admin, email=email)
-                request.session['admin_id'] = admin.id_admin
-                return redirect('gestion_reservas')
+                return iniciar_sesion(redirect('gestion_reservas'), admin)
             except Administrador.DoesNotExist:
                 messages.error(request, "Credenciales incorrectas.")
     else:
@@ -136,10 +225,112 @@ def login_admin(request):
     return render(request, "login_admin.html", {"form": form})
 
 
+HABITACIONES_POR_PAGINA = 25
+
 @admin_required
 def gestion_reservas(request):
     habitaciones = Habitacion.objects.all()
-    return render(request, "gestion_reservas.html", {"habitaciones": habitaciones})
+    estado = request.GET.get('estado')
+    tipo = request.GET.get('tipo')
+    capacidad = request.GET.get('capacidad')
+    if estado:
+        habitaciones = habitaciones.filter(estado=estado)
+    if tipo:
+        habitaciones = habitaciones.filter(tipo=tipo)
+    if capacidad:
+        # isdecimal y no isdigit: "²" es digito pero int() lo rechaza
+        if capacidad.isdecimal():
+            habitaciones = habitaciones.filter(capacidad__gte=int(capacidad))
+        else:
+            messages.error(request, "La capacidad debe ser un número entero.")
+
+    # Paginacion por clave (id_habitacion): el costo no crece con el numero de pagina
+    despues = request.GET.get('despues')
+    antes = request.GET.get('antes')
+    if antes:
+        pagina = habitaciones.filter(id_habitacion__lt=antes).order_by('-id_habitacion')
+    else:
+        if despues:
+            habitaciones = habitaciones.filter(id_habitacion__gt=despues)
+        pagina = habitaciones.order_by('id_habitacion')
+    pagina = list(pagina.con_resumen(timezone.localdate())[:HABITACIONES_POR_PAGINA + 1])
+    hay_mas = len(pagina) > HABITACIONES_POR_PAGINA
+    pagina = pagina[:HABITACIONES_POR_PAGINA]
+    if antes:
+        pagina.reverse()
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, bool(despues)
+
+    for habitacion in pagina:
+        noches = habitacion.ocupacion_mes.days if habitacion.ocupacion_mes else 0
+        habitacion.porcentaje_ocupacion = round(100 * noches / habitacion.dias_mes)
+
+    filtros = request.GET.copy()
+    filtros.pop('despues', None)
+    filtros.pop('antes', None)
+    return render(request, "gestion_reservas.html", {
+        "habitaciones": pagina,
+        "filtros": filtros.urlencode(),
+        "estados": Habitacion.ESTADO_CHOICES,
+        "tipos": Habitacion.objects.order_by('tipo').values_list('tipo', flat=True).distinct(),
+        "estado": estado,
+        "tipo": tipo,
+        "capacidad": capacidad,
+        "siguiente": pagina[-1].id_habitacion if pagina and hay_siguiente else None,
+        "anterior": pagina[0].id_habitacion if pagina and hay_anterior else None,
+    })
+
+@admin_required
+def estadisticas_cache(request):
+    return JsonResponse({"disponibilidad": estadisticas()})
+
+@admin_required
+def metricas(request):
+    return HttpResponse(registro.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@admin_required
+def exportar_reservas(request):
+    formato = request.GET.get('formato', 'csv')
+    estado = request.GET.get('estado') or None
+    try:
+        desde = parse_date(request.GET.get('desde', ''))
+        hasta = parse_date(request.GET.get('hasta', ''))
+    except ValueError:
+        return JsonResponse({"error": "Parámetros inválidos."}, status=400)
+    if formato not in ('csv', 'jsonl') or (estado and estado not in dict(Reserva.ESTADO_RESERVA)):
+        return JsonResponse({"error": "Parámetros inválidos."}, status=400)
+
+    reservas = reservas_exportables(desde=desde, hasta=hasta, estado=estado)
+    if formato == 'csv':
+        respuesta = StreamingHttpResponse(filas_csv(reservas), content_type="text/csv; charset=utf-8")
+    else:
+        respuesta = StreamingHttpResponse(lineas_jsonl(reservas), content_type="application/x-ndjson")
+    respuesta["Content-Disposition"] = f'attachment; filename="reservas.{formato}"'
+    return respuesta
+
+@admin_required
+def reporte_ocupacion(request):
+    # Lee solo los resumenes diarios: el costo depende del rango pedido, no del historial
+    try:
+        hasta = parse_date(request.GET.get('hasta', '')) or timezone.localdate()
+        desde = parse_date(request.GET.get('desde', '')) or hasta - timedelta(days=29)
+    except ValueError:
+        # Formato correcto pero fecha inexistente (2025-02-30)
+        messages.error(request, "Fecha inválida.")
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=29)
+    tipo = request.GET.get('tipo') or None
+    if desde > hasta or (hasta - desde).days >= MAXIMO_DIAS_REPORTE:
+        messages.error(request, f"El rango debe ir de menor a mayor y abarcar hasta {MAXIMO_DIAS_REPORTE} días.")
+        desde = hasta - timedelta(days=29)
+    return render(request, "reporte_ocupacion.html", {
+        **reporte(desde, hasta, tipo),
+        "desde": desde,
+        "hasta": hasta,
+        "tipo": tipo,
+        "tipos": Habitacion.objects.order_by('tipo').values_list('tipo', flat=True).distinct(),
+    })
 
 @admin_required
 def agregar_habitacion(request):
@@ -173,15 +364,13 @@ def eliminar_habitacion(request, id_habitacion):
     return render(request, "habitacion_confirm_delete.html", {"habitacion": habitacion})
 
 def logout_admin(request):
-    request.session.flush()
-    return render(request, "logout_admin.html")
+    return cerrar_sesion(request, render(request, "logout_admin.html"))
 
 @admin_required
 def eliminar_admin(request):
-    admin_id = request.session.get('admin_id')
-    admin = get_object_or_404(Administrador, id_admin=admin_id)
+    admin = request.administrador
     if request.method == "POST":
-        admin.delete()
-        request.session.flush()
-        return redirect('login_admin')
+        respuesta = cerrar_sesion(request, redirect('login_admin'))
+        Administrador.objects.filter(pk=admin.pk).delete()
+        return respuesta
     return render(request, "sesion_admin.html", {"admin": admin})
\ No newline at end of file
@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.shortcuts import render
+from django.utils.dateparse import parse_date
+
+from . import views
+from .busqueda import abuscar
+from .cache_paginas import cache_pagina_publica
+from .disponibilidad import ahabitaciones_disponibles_ids
+from .forms import ReservaForm, ConsultaReservaForm
+from .models import Reserva
+
+# Variantes async de las vistas publicas de lectura, servidas por hotel.asgi.
+# Las escrituras siguen en las vistas sync de views.py. El render pasa por
+# sync_to_async porque el context processor de mensajes lee la sesion.
+arender = sync_to_async(render)
+
+# ---------------------- Index ----------------------
+@cache_pagina_publica()
+async def landing_page(request):
+    return await arender(request, 'landing_page.html')
+
+# ---------------------- Reservas ----------------------
+@cache_pagina_publica()
+async def reservar(request):
+    if request.method != "GET":
+        return await sync_to_async(views.reservar)(request)
+
+    fecha_inicio = request.GET.get('fecha_inicio')
+    fecha_fin = request.GET.get('fecha_fin')
+    form = busqueda = None
+
+    if fecha_inicio and fecha_fin:
+        fecha_inicio = parse_date(fecha_inicio)
+        fecha_fin = parse_date(fecha_fin)
+
+        if fecha_inicio >= fecha_fin:
+            messages.error(request, "La fecha de inicio debe ser anterior a la fecha de fin.")
+            return await arender(request, "reservar.html", {
+                "form": None,
+                "fecha_inicio": None,
+                "fecha_fin": None,
+            })
+
+        disponibles_ids = await ahabitaciones_disponibles_ids(fecha_inicio, fecha_fin)
+        if disponibles_ids:
+            form = ReservaForm(initial={
+                "fecha_inicio": fecha_inicio,
+                "fecha_fin": fecha_fin
+            })
+            busqueda = await abuscar(disponibles_ids, fecha_inicio, fecha_fin, request.GET)
+
+    return await arender(request, "reservar.html", {
+        "form": form,
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "busqueda": busqueda,
+    })
+
+async def mis_reservas(request):
+    reserva = None
+    if request.method == "POST":
+        form = ConsultaReservaForm(request.POST)
+        if form.is_valid():
+            try:
+                reserva = await Reserva.objects.select_related('habitacion').aget(
+                    codigo=form.cleaned_data['codigo'],
+                    cliente__rut=form.cleaned_data['rut'],
+                )
+            except Reserva.DoesNotExist:
+                messages.error(request, "Reserva no encontrada.")
+    else:
+        form = ConsultaReservaForm()
+    return await arender(request, "mis_reservas.html", {"form": form, "reserva": reserva})
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from . import sqlite
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricasMiddleware',
+    'core.middleware.FijacionPrimariaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,8 +62,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'core', 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una sola vez por proceso
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -78,9 +88,101 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Pragmas y BEGIN IMMEDIATE: ver hotel/sqlite.py
+        'OPTIONS': sqlite.opciones({
+            **sqlite.PRAGMAS_ESCRITURA,
+            'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+            'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+            'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        }, transaction_mode='IMMEDIATE'),
+        # Conexiones persistentes por worker, verificadas antes de reutilizarse
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Replica de solo lectura (opcional). Con SQLite es una copia del archivo
+# principal que mantiene al dia `python manage.py sincronizar_replica`.
+REPLICA_RUTA = os.environ.get('DB_REPLICA_NAME')
+if REPLICA_RUTA:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{REPLICA_RUTA}?mode=ro',
+        'OPTIONS': sqlite.opciones(sqlite.PRAGMAS_LECTURA),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.RouterLecturaEscritura']
+
+# Segundos que un cliente lee de la primaria despues de escribir; debe superar
+# el intervalo de sincronizacion de la replica
+REPLICA_FIJACION = int(os.environ.get('REPLICA_FIJACION', 30))
+
+
+# Cache
+# Las invalidaciones de la cache de disponibilidad vienen tambien de otros
+# procesos (barrer_reservas, procesar_tareas, cargar_datos), un cambio de
+# habitacion en un worker debe vencer las paginas cacheadas de todos y un logout
+# debe valer en todos los workers, asi que estas caches viven por defecto en
+# archivos compartidos; cada variable *_CACHE_BACKEND permite cambiarlo. Los
+# tests las reemplazan por caches locales (ver core/tests.py).
+CACHE_COMPARTIDA = 'django.core.cache.backends.filebased.FileBasedCache'
+CACHE_LOCAL = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'disponibilidad': {
+        'BACKEND': os.environ.get('DISPONIBILIDAD_CACHE_BACKEND', CACHE_COMPARTIDA),
+        'LOCATION': os.environ.get('DISPONIBILIDAD_CACHE_LOCATION', os.path.join(CACHE_DIR, 'disponibilidad')),
+        'TIMEOUT': int(os.environ.get('DISPONIBILIDAD_CACHE_TTL', 60)),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Paginas publicas completas y la version del catalogo (ver core/cache_paginas.py)
+    'paginas': {
+        'BACKEND': os.environ.get('PAGINAS_CACHE_BACKEND', CACHE_COMPARTIDA),
+        'LOCATION': os.environ.get('PAGINAS_CACHE_LOCATION', os.path.join(CACHE_DIR, 'paginas')),
+        'TIMEOUT': int(os.environ.get('PAGINAS_CACHE_TTL', 300)),
+    },
+    # Sesiones de administrador (ver core/sesion_admin.py). Compartida entre
+    # procesos: un logout o la baja de un administrador borra la entrada para
+    # todos los workers, no solo para el que atendio la peticion.
+    'sesiones_admin': {
+        'BACKEND': os.environ.get('SESIONES_ADMIN_CACHE_BACKEND', CACHE_COMPARTIDA),
+        'LOCATION': os.environ.get('SESIONES_ADMIN_CACHE_LOCATION', os.path.join(CACHE_DIR, 'sesiones_admin')),
+        'TIMEOUT': int(os.environ.get('SESIONES_ADMIN_CACHE_TTL', 60)),
+    },
+}
+
+# Duracion maxima (segundos) de la cookie firmada de sesion de administrador
+ADMIN_SESION_DURACION = int(os.environ.get('ADMIN_SESION_DURACION', 8 * 60 * 60))
+
+# Recargo de fin de semana (fraccion) para noches sin temporada definida
+TARIFA_RECARGO_FIN_DE_SEMANA = os.environ.get('TARIFA_RECARGO_FIN_DE_SEMANA', '0')
+
+# Minutos que una reserva puede quedar pendiente de pago antes de que
+# barrer_reservas la cancele y libere sus noches
+RESERVA_PENDIENTE_TTL = int(os.environ.get('RESERVA_PENDIENTE_TTL', 60))
+
+# Dias que se conserva el registro de cambios de disponibilidad (feed del
+# channel manager); barrer_reservas poda lo anterior
+CAMBIOS_RETENCION = int(os.environ.get('CAMBIOS_RETENCION', 30))
+
+# Los mensajes viajan en cookie para que las vistas no consulten django_session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Correos de confirmacion, enviados por el worker de tareas (python manage.py procesar_tareas)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'reservas@pacificreef.cl')
+
+
+# Metricas por vista, compartidas entre workers a traves de un archivo SQLite
+METRICAS_DB = os.environ.get('METRICAS_DB', BASE_DIR / 'metricas.sqlite3')
+METRICAS_INTERVALO = int(os.environ.get('METRICAS_INTERVALO', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -118,7 +220,17 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'core', 'static')]
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Django 5.x solo lee STORAGES; STATICFILES_STORAGE ya no tiene efecto
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.storage.ImagenesResponsivasStorage'},
+}
+
+# Variantes responsivas de las imagenes generadas en collectstatic (ver core/storage.py)
+IMAGENES_ANCHOS = (480, 960, 1600)
+IMAGENES_FORMATOS = ('avif', 'webp')
+IMAGENES_CALIDAD = 70
+IMAGENES_CACHE_DIR = os.environ.get('IMAGENES_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'imagenes'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
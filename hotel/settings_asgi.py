@@ -0,0 +1,17 @@
+"""
+Django settings for the ASGI entry point (hotel.asgi).
+
+Same as hotel.settings, but routes through hotel.urls_asgi and swaps
+WhiteNoise for an async-capable subclass so no request is forced through
+a sync middleware thread.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE
+
+ROOT_URLCONF = 'hotel.urls_asgi'
+
+MIDDLEWARE = [
+    'core.middleware.WhiteNoiseAsyncMiddleware' if m == 'whitenoise.middleware.WhiteNoiseMiddleware' else m
+    for m in MIDDLEWARE
+]
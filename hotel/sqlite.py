@@ -0,0 +1,38 @@
+"""
+Ajustes de conexion para las bases SQLite.
+
+Arma DATABASES[...]['OPTIONS'] a partir de un perfil de pragmas: Django
+ejecuta cada PRAGMA de init_command al abrir una conexion, y transaction_mode
+hace que todo bloque atomic empiece con BEGIN IMMEDIATE, asi quien escribe
+toma el lock de escritura al principio (y lo espera hasta busy_timeout) en vez
+de fallar con "database is locked" al pasar de una transaccion de lectura a
+una de escritura.
+"""
+
+# Perfil para la base principal con varios workers de gunicorn
+PRAGMAS_ESCRITURA = {
+    'journal_mode': 'wal',         # lectores y un escritor en paralelo
+    'synchronous': 'normal',       # con WAL, durable salvo corte de energia
+    'busy_timeout': 5000,          # ms esperando el lock antes de fallar
+    'cache_size': -20000,          # KiB por conexion (negativo = KiB)
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+# Para la replica de solo lectura: sin pragmas que escriban el archivo
+PRAGMAS_LECTURA = {
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+
+def opciones(pragmas, transaction_mode=None):
+    resultado = {'init_command': ';'.join(f'PRAGMA {nombre}={valor}' for nombre, valor in pragmas.items())}
+    if 'busy_timeout' in pragmas:
+        # sqlite3.connect(timeout=...) fija el mismo busy timeout en segundos
+        resultado['timeout'] = pragmas['busy_timeout'] / 1000
+    if transaction_mode:
+        resultado['transaction_mode'] = transaction_mode
+    return resultado
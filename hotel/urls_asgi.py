@@ -0,0 +1,17 @@
+"""
+URL configuration for the ASGI entry point (hotel.asgi).
+
+Same routes as hotel.urls, except that the public read paths are served by
+the async views in core.views_async.
+"""
+from django.urls import path
+
+from core import views_async
+from .urls import urlpatterns as urlpatterns_wsgi
+
+
+urlpatterns = [
+    path('', views_async.landing_page, name='landing_page'),
+    path('reservar/', views_async.reservar, name='reservar'),
+    path('mis_reservas/', views_async.mis_reservas, name='mis_reservas'),
+] + urlpatterns_wsgi